@@ -4,6 +4,7 @@ Django Admin pages
 # pylint: disable=no-self-argument, no-member
 
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from django.utils.translation import ugettext_lazy as _
 from django import forms
 from edx_proctoring.models import (
@@ -67,6 +68,21 @@ class ProctoredExamSoftwareSecureReviewForm(forms.ModelForm):
     video_url = forms.URLField()
     raw_data = forms.CharField(widget=forms.Textarea, label='Reviewer Notes')
 
+    def __init__(self, *args, **kwargs):
+        """
+        The raw_data is not a model field (it is stored compressed), so fill it in ourselves
+        """
+        super(ProctoredExamSoftwareSecureReviewForm, self).__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.initial.setdefault('raw_data', self.instance.raw_data)
+
+    def save(self, commit=True):
+        """
+        Stores the raw_data along with the model fields
+        """
+        self.instance.raw_data = self.cleaned_data['raw_data']
+        return super(ProctoredExamSoftwareSecureReviewForm, self).save(commit=commit)
+
 
 def video_url_for_review(obj):
     """Return hyperlink to review video url"""
@@ -107,6 +123,18 @@ class ReviewListFilter(admin.SimpleListFilter):
             return queryset
 
 
+class ReviewChangeList(ChangeList):
+    """
+    The list of reviews doesn't show their payloads, so it doesn't load them
+    """
+
+    def get_query_set(self, request):
+        """
+        Leave out the compressed payloads
+        """
+        return super(ReviewChangeList, self).get_query_set(request).defer('raw_data_compressed', 'legacy_raw_data')
+
+
 class ProctoredExamSoftwareSecureReviewAdmin(admin.ModelAdmin):
     """
     The admin panel for SoftwareSecure Review records
@@ -118,9 +146,14 @@ class ProctoredExamSoftwareSecureReviewAdmin(admin.ModelAdmin):
     search_fields = ['student__username', 'attempt_code']
     form = ProctoredExamSoftwareSecureReviewForm
 
+    def _get_attempt_from_attempt_code(self, code):
+        """Get attempt from attempt code. Note that the attempt code could be an archived one"""
+        attempt, __ = locate_attempt_by_attempt_code(code)
+        return attempt
+
     def _get_exam_from_attempt_code(self, code):
         """Get exam from attempt code. Note that the attempt code could be an archived one"""
-        attempt = locate_attempt_by_attempt_code(code)
+        attempt = self._get_attempt_from_attempt_code(code)
         return attempt.proctored_exam if attempt else None
 
     def course_id_for_review(self, obj):
@@ -129,7 +162,7 @@ class ProctoredExamSoftwareSecureReviewAdmin(admin.ModelAdmin):
             return obj.exam.course_id
         else:
             exam = self._get_exam_from_attempt_code(obj.attempt_code)
-            return exam.exam_name if exam else '(none)'
+            return exam.course_id if exam else '(none)'
 
     def exam_name_for_review(self, obj):
         """Return course_id associated with review"""
@@ -144,7 +177,7 @@ class ProctoredExamSoftwareSecureReviewAdmin(admin.ModelAdmin):
         if obj.student:
             return obj.student.username
         else:
-            attempt = locate_attempt_by_attempt_code(obj.attempt_code)
+            attempt = self._get_attempt_from_attempt_code(obj.attempt_code)
             return attempt.user.username if attempt else '(None)'
 
     list_display = [
@@ -179,6 +212,13 @@ class ProctoredExamSoftwareSecureReviewAdmin(admin.ModelAdmin):
         provider_name = course.proctoring_service
         get_backend_provider(provider_name).on_review_saved(review, allow_status_update_on_fail=True)
 
+    def get_changelist(self, request, **kwargs):
+        """
+        Only the list defers the payloads, the change page shows the payload of
+        its review
+        """
+        return ReviewChangeList
+
     def get_form(self, request, obj=None, **kwargs):
         form = super(ProctoredExamSoftwareSecureReviewAdmin, self).get_form(request, obj, **kwargs)
         del form.base_fields['video_url']
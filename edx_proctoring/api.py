@@ -5,19 +5,25 @@ In-Proc API (aka Library) for the edx_proctoring subsystem. This is not to be co
 API which is in the views.py file, per edX coding standards
 """
 import pytz
+import time
 import uuid
 import logging
 
+from collections import OrderedDict, defaultdict
+from multiprocessing.pool import ThreadPool
 from datetime import datetime, timedelta
 
 from django.utils.translation import ugettext as _
 from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
 from django.template import Context, loader
 from django.core.urlresolvers import reverse, NoReverseMatch
 from django.core.mail.message import EmailMessage
 
-from edx_proctoring import constants
+from edx_proctoring import constants, rendering
 from edx_proctoring.exceptions import (
+    BackendProviderUnavailable,
     ProctoredExamAlreadyExists,
     ProctoredExamNotFoundException,
     StudentExamAttemptAlreadyExistsException,
@@ -48,6 +54,13 @@ from django.contrib.auth.models import User
 
 log = logging.getLogger(__name__)
 
+# how many attempts preprovision_exam_attempts() registers with the provider at once
+DEFAULT_PREPROVISION_WORKERS = 10
+
+# how long a worker may take to register an attempt it has claimed, before
+# somebody else may claim it again
+DEFAULT_REGISTRATION_CLAIM_SECONDS = 300
+
 
 def is_feature_enabled():
     """
@@ -135,9 +148,124 @@ def update_exam(exam_id, exam_name=None, time_limit_mins=None,
     if is_active is not None:
         proctored_exam.is_active = is_active
     proctored_exam.save()
+
+    # the pages rendered for this exam might be stale now
+    rendering.invalidate_exam_fragments(proctored_exam.id)
+
     return proctored_exam.id
 
 
+# The optional exam fields which sync_exams_for_course manages,
+# and their defaults for exams which get created
+SYNCED_EXAM_FIELDS = {
+    'is_proctored': True,
+    'is_practice_exam': False,
+    'external_id': None,
+    'is_active': True,
+}
+
+
+def sync_exams_for_course(course_id, exam_specs, deactivate_missing=True):
+    """
+    Makes the exams of a course match the course structure, so that exams don't
+    have to be created on the fly when students first load them. exam_specs is a list
+    of dictionaries, each with the content_id, exam_name and time_limit_mins of an
+    exam, and optionally any of is_proctored, is_practice_exam, external_id and is_active.
+    For existing exams only the optional fields given in the spec are updated, except
+    for is_active, which defaults to True, so that an exam which an earlier sync
+    deactivated comes back when it reappears in the course structure.
+
+    Exams which are not in exam_specs are deactivated (we never hard delete exams,
+    since we need to retain data), unless deactivate_missing is False.
+
+    All of the changes are applied in a single transaction.
+
+    Returns a dictionary with the lists of content_ids which got 'created',
+    'updated' and 'deactivated'
+    """
+
+    desired = {}
+    for spec in exam_specs:
+        fields = {
+            'exam_name': spec['exam_name'],
+            'time_limit_mins': spec['time_limit_mins'],
+            'is_active': SYNCED_EXAM_FIELDS['is_active'],
+        }
+        fields.update(
+            (field, spec[field]) for field in SYNCED_EXAM_FIELDS if field in spec
+        )
+        desired[unicode(spec['content_id'])] = fields
+
+    result = {
+        'created': [],
+        'updated': [],
+        'deactivated': [],
+    }
+    changed_exam_ids = []
+
+    with transaction.commit_on_success():
+        existing = dict(
+            (exam.content_id, exam) for exam in ProctoredExam.get_all_exams_for_course(course_id)
+        )
+
+        new_exams = []
+        # group the exams by the changes they need, so that
+        # every distinct change is a single UPDATE
+        updates = defaultdict(list)
+
+        for content_id, fields in desired.iteritems():
+            exam = existing.get(content_id)
+            if exam is None:
+                exam_fields = dict(SYNCED_EXAM_FIELDS)
+                exam_fields.update(fields)
+                new_exams.append(
+                    ProctoredExam(course_id=course_id, content_id=content_id, **exam_fields)
+                )
+                result['created'].append(content_id)
+                continue
+
+            changes = tuple(sorted(
+                (field, value) for field, value in fields.iteritems()
+                if getattr(exam, field) != value
+            ))
+            if changes:
+                updates[changes].append(exam.id)
+                changed_exam_ids.append(exam.id)
+                result['updated'].append(content_id)
+
+        if deactivate_missing:
+            for content_id, exam in existing.iteritems():
+                if content_id not in desired and exam.is_active:
+                    updates[(('is_active', False),)].append(exam.id)
+                    changed_exam_ids.append(exam.id)
+                    result['deactivated'].append(content_id)
+
+        if new_exams:
+            ProctoredExam.objects.bulk_create(new_exams)
+
+        # update() bypasses save(), so we have to keep the timestamp current ourselves
+        now = datetime.now(pytz.UTC)
+        for changes, exam_ids in updates.iteritems():
+            ProctoredExam.objects.filter(id__in=exam_ids).update(modified=now, **dict(changes))
+
+    # the pages rendered for these exams might be stale now
+    for exam_id in changed_exam_ids:
+        rendering.invalidate_exam_fragments(exam_id)
+
+    log_msg = (
+        u'Synced exams for course_id {course_id}: created={created}, '
+        u'updated={updated}, deactivated={deactivated}'.format(
+            course_id=course_id,
+            created=result['created'],
+            updated=result['updated'],
+            deactivated=result['deactivated']
+        )
+    )
+    log.info(log_msg)
+
+    return result
+
+
 def get_exam_by_id(exam_id):
     """
     Looks up exam by the Primary Key. Raises exception if not found.
@@ -202,6 +330,38 @@ def add_allowance_for_user(exam_id, user_info, key, value):
     ProctoredExamStudentAllowance.add_allowance_for_user(exam_id, user_info, key, value)
 
 
+def add_allowances_for_users(allowances):
+    """
+    Adds (or updates) many allowances at once, e.g. when importing the extra time
+    accommodations of a whole course. Each allowance is a dictionary with the
+    same exam_id, user_info, key and value as add_allowance_for_user takes.
+
+    Returns the number of allowances 'added' and 'updated', and the 'errors' of the
+    allowances which were skipped, referring to them by their index in the list
+    e.g.
+    {
+        "added": 1998,
+        "updated": 1,
+        "errors": [{"index": 12, "detail": "Cannot find user against foo"}]
+    }
+    """
+
+    added, updated, errors = ProctoredExamStudentAllowance.add_allowances_for_users(allowances)
+
+    log_msg = (
+        'Added {added} and updated {updated} allowances, skipped {skipped}'.format(
+            added=added, updated=updated, skipped=len(errors)
+        )
+    )
+    log.info(log_msg)
+
+    return {
+        'added': added,
+        'updated': updated,
+        'errors': [{'index': index, 'detail': detail} for index, detail in errors],
+    }
+
+
 def get_allowances_for_course(course_id):
     """
     Get all the allowances for the course.
@@ -317,11 +477,17 @@ def update_exam_attempt(attempt_id, **kwargs):
     exam_attempt_obj.save()
 
 
-def create_exam_attempt(exam_id, user_id, taking_as_proctored=False):
+def create_exam_attempt(exam_id, user_id, taking_as_proctored=False, defer_registration=None):
     """
     Creates an exam attempt for user_id against exam_id. There should only be
     one exam_attempt per user per exam. Multiple attempts by user will be archived
     in a separate table
+
+    Unless defer_registration is given, the DEFER_ATTEMPT_REGISTRATION setting
+    decides whether a proctored attempt is registered with the backend provider
+    right away or by register_pending_exam_attempts(). With the
+    DEFER_REGISTRATION_WHEN_UNAVAILABLE setting the registration is also deferred
+    while the backend provider is unavailable, instead of failing
     """
     # for now the student is allowed the exam default
 
@@ -348,70 +514,41 @@ def create_exam_attempt(exam_id, user_id, taking_as_proctored=False):
 
             raise StudentExamAttemptAlreadyExistsException(err_msg)
 
-    allowed_time_limit_mins = exam['time_limit_mins']
-
-    # add in the allowed additional time
-    allowance_extra_mins = ProctoredExamStudentAllowance.get_additional_time_granted(exam_id, user_id)
-    if allowance_extra_mins:
-        allowed_time_limit_mins += allowance_extra_mins
+    allowances = ProctoredExamStudentAllowance.get_allowance_bundle(exam_id, user_id)
+    allowed_time_limit_mins = _get_allowed_time_limit_mins(exam, allowances)
 
     attempt_code = unicode(uuid.uuid4()).upper()
 
     external_id = None
     review_policy = ProctoredExamReviewPolicy.get_review_policy_for_exam(exam_id)
-    review_policy_exception = ProctoredExamStudentAllowance.get_review_policy_exception(exam_id, user_id)
-
-    if taking_as_proctored:
-        content_id = exam['content_id'].split('@')[-1]  # get hash
-        scheme = 'https' if getattr(settings, 'HTTPS', 'on') == 'on' else 'http'
-        callback_url = '{scheme}://{hostname}{path}'.format(
-            scheme=scheme,
-            hostname=settings.SITE_NAME,
-            path=reverse(
-                'jump_to_id', 
-                kwargs={'course_id': exam['course_id'], 'module_id': content_id}
-            )
-        )
+    review_policy_exception = allowances.review_policy_exception
 
-        # get the name of the user, if the service is available
-        full_name = None
+    # registering the attempt with the backend provider can be left to a background
+    # worker, see register_pending_exam_attempts()
+    if defer_registration is None:
+        defer_registration = settings.PROCTORING_SETTINGS.get('DEFER_ATTEMPT_REGISTRATION', False)
+    registration_pending = taking_as_proctored and defer_registration
 
-        credit_service = get_runtime_service('credit')
-        user = User.objects.get(pk=user_id)
-
-
-        context = {
-            'time_limit_mins': allowed_time_limit_mins,
-            'attempt_code': attempt_code,
-            'is_sample_attempt': exam['is_practice_exam'],
-            'callback_url': callback_url,
-            'user_id': user_id,
-            'full_name': " ".join((user.first_name,user.last_name)),
-            'username': user.username,
-            'email': user.email
-        }
+    if taking_as_proctored and not registration_pending:
+        try:
+            external_id = _register_exam_attempt_with_provider(
+                exam,
+                User.objects.get(pk=user_id),
+                attempt_code,
+                allowed_time_limit_mins,
+                review_policy,
+                review_policy_exception
+            )
+        except BackendProviderUnavailable:
+            if not settings.PROCTORING_SETTINGS.get('DEFER_REGISTRATION_WHEN_UNAVAILABLE', False):
+                raise
 
-        # see if there is an exam review policy for this exam
-        # if so, then pass it into the provider
-        if review_policy:
-            context.update({
-                'review_policy': review_policy.review_policy
-            })
-
-        # see if there is a review policy exception for this *user*
-        # exceptions are granted on a individual basis as an
-        # allowance
-        if review_policy_exception:
-            context.update({
-                'review_policy_exception': review_policy_exception
-            })
-
-        # now call into the backend provider to register exam attempt
-        provider_name = get_provider_name_by_course_id(exam['course_id'])
-        external_id = get_backend_provider(provider_name).register_exam_attempt(
-            exam,
-            context=context,
-        )
+            log_msg = (
+                'The backend provider is unavailable, deferring the registration of the attempt of '
+                'user_id {user_id} for exam_id {exam_id}'.format(user_id=user_id, exam_id=exam_id)
+            )
+            log.warning(log_msg)
+            registration_pending = True
 
     attempt = ProctoredExamStudentAttempt.create_exam_attempt(
         exam_id,
@@ -423,6 +560,7 @@ def create_exam_attempt(exam_id, user_id, taking_as_proctored=False):
         exam['is_practice_exam'],
         external_id,
         review_policy_id=review_policy.id if review_policy else None,
+        registration_pending=registration_pending,
     )
 
     log_msg = (
@@ -445,6 +583,340 @@ def create_exam_attempt(exam_id, user_id, taking_as_proctored=False):
     return attempt.id
 
 
+def _get_allowed_time_limit_mins(exam, allowances):
+    """
+    The time limit of the exam, plus the additional time granted in the allowance bundle
+    """
+
+    allowed_time_limit_mins = exam['time_limit_mins']
+
+    # add in the allowed additional time
+    allowance_extra_mins = allowances.additional_time_granted
+    if allowance_extra_mins:
+        allowed_time_limit_mins += allowance_extra_mins
+    return allowed_time_limit_mins
+
+
+def _register_exam_attempt_with_provider(exam, user, attempt_code, allowed_time_limit_mins,
+                                         review_policy, review_policy_exception):
+    """
+    Registers the exam attempt with the backend provider of the course,
+    returns the external_id the provider has assigned to it. This doesn't
+    touch the database, so preprovision_exam_attempts() can run it in threads
+    """
+
+    content_id = exam['content_id'].split('@')[-1]  # get hash
+    scheme = 'https' if getattr(settings, 'HTTPS', 'on') == 'on' else 'http'
+    callback_url = '{scheme}://{hostname}{path}'.format(
+        scheme=scheme,
+        hostname=settings.SITE_NAME,
+        path=reverse(
+            'jump_to_id',
+            kwargs={'course_id': exam['course_id'], 'module_id': content_id}
+        )
+    )
+
+    context = {
+        'time_limit_mins': allowed_time_limit_mins,
+        'attempt_code': attempt_code,
+        'is_sample_attempt': exam['is_practice_exam'],
+        'callback_url': callback_url,
+        'user_id': user.id,
+        'full_name': " ".join((user.first_name, user.last_name)),
+        'username': user.username,
+        'email': user.email
+    }
+
+    # see if there is an exam review policy for this exam
+    # if so, then pass it into the provider
+    if review_policy:
+        context.update({
+            'review_policy': review_policy.review_policy
+        })
+
+    # see if there is a review policy exception for this *user*
+    # exceptions are granted on a individual basis as an
+    # allowance
+    if review_policy_exception:
+        context.update({
+            'review_policy_exception': review_policy_exception
+        })
+
+    # now call into the backend provider to register exam attempt
+    provider_name = get_provider_name_by_course_id(exam['course_id'])
+    return get_backend_provider(provider_name, emphemeral=False).register_exam_attempt(
+        exam,
+        context=context,
+    )
+
+
+def register_pending_exam_attempt(attempt_id):
+    """
+    Registers an attempt which was created with DEFER_ATTEMPT_REGISTRATION with
+    the backend provider, and fills in its external_id. Returns the external_id,
+    or None if the attempt no longer needs to be registered or somebody else
+    is registering it.
+
+    Failures are counted, once there have been MAX_REGISTRATION_FAILURES of
+    them the attempt is put into the error status. Calls which were not made
+    because the backend provider is unavailable don't count
+    """
+
+    attempt_obj = ProctoredExamStudentAttempt.objects.get_exam_attempt_by_id(attempt_id)
+    if not attempt_obj or not attempt_obj.registration_pending:
+        return None
+
+    # registering is not idempotent, so only the worker which claimed the attempt may do it
+    if not _claim_registration(attempt_obj.id):
+        log_msg = (
+            'Not registering attempt_id {attempt_id}, somebody else is registering it'.format(
+                attempt_id=attempt_obj.id
+            )
+        )
+        log.info(log_msg)
+        return None
+
+    exam = get_exam_by_id(attempt_obj.proctored_exam_id)
+    allowances = ProctoredExamStudentAllowance.get_allowance_bundle(exam['id'], attempt_obj.user_id)
+    review_policy = ProctoredExamReviewPolicy.get_review_policy_for_exam(exam['id'])
+
+    try:
+        external_id = _register_exam_attempt_with_provider(
+            exam,
+            attempt_obj.user,
+            attempt_obj.attempt_code,
+            attempt_obj.allowed_time_limit_mins,
+            review_policy,
+            allowances.review_policy_exception
+        )
+    except BackendProviderUnavailable:
+        log_msg = (
+            'Not registering attempt_id {attempt_id}, the backend provider is unavailable'.format(
+                attempt_id=attempt_obj.id
+            )
+        )
+        log.warning(log_msg)
+        _release_registration(attempt_obj.id)
+        raise
+    except Exception:  # pylint: disable=broad-except
+        log_msg = (
+            'Could not register attempt_id {attempt_id} with the backend provider'.format(attempt_id=attempt_obj.id)
+        )
+        log.exception(log_msg)
+        _record_registration_failure(exam, attempt_obj)
+        raise
+
+    _record_registration(attempt_obj, external_id)
+    return external_id
+
+
+def _claim_registration(attempt_id):
+    """
+    Claims the pending registration of an attempt for REGISTRATION_CLAIM_SECONDS,
+    returns whether we got it. The conditional UPDATE makes sure that only one
+    worker at a time registers the attempt with the backend provider
+    """
+
+    now = datetime.now(pytz.UTC)
+    claim_seconds = settings.PROCTORING_SETTINGS.get('REGISTRATION_CLAIM_SECONDS', DEFAULT_REGISTRATION_CLAIM_SECONDS)
+    claimed = ProctoredExamStudentAttempt.objects.filter(
+        Q(registration_claimed_until__isnull=True) | Q(registration_claimed_until__lt=now),
+        id=attempt_id,
+        registration_pending=True
+    ).update(registration_claimed_until=now + timedelta(seconds=claim_seconds))
+    return claimed == 1
+
+
+def _release_registration(attempt_id):
+    """
+    Gives up the claim on the registration of an attempt which was not tried
+    """
+
+    ProctoredExamStudentAttempt.objects.filter(id=attempt_id).update(registration_claimed_until=None)
+
+
+def _record_registration(attempt_obj, external_id):
+    """
+    Stores the external_id of a pending attempt, unless somebody else got there first
+    """
+
+    ProctoredExamStudentAttempt.objects.filter(id=attempt_obj.id, registration_pending=True).update(
+        external_id=external_id,
+        registration_pending=False,
+        registration_claimed_until=None,
+        modified=datetime.now(pytz.UTC)
+    )
+
+
+def _record_registration_failure(exam, attempt_obj):
+    """
+    Counts a failed registration of a pending attempt. After MAX_REGISTRATION_FAILURES
+    of them the attempt is no longer retried and put into the error status instead
+    """
+
+    attempts = ProctoredExamStudentAttempt.objects.filter(id=attempt_obj.id)
+    attempts.update(registration_failures=F('registration_failures') + 1, registration_claimed_until=None)
+    failures = attempts.values_list('registration_failures', flat=True)[0]
+
+    log_msg = (
+        'Registering attempt_id {attempt_id} with the backend provider '
+        'failed {failures} times'.format(attempt_id=attempt_obj.id, failures=failures)
+    )
+    log.warning(log_msg)
+
+    if failures >= settings.PROCTORING_SETTINGS.get('MAX_REGISTRATION_FAILURES', 5):
+        ProctoredExamStudentAttempt.objects.filter(id=attempt_obj.id).update(registration_pending=False)
+        update_attempt_status(exam['id'], attempt_obj.user_id, ProctoredExamStudentAttemptStatus.error)
+
+
+def register_pending_exam_attempts():
+    """
+    Registers all of the attempts which are waiting for it with the backend
+    provider, oldest first. Returns a dict with the registered and failed attempt ids
+    """
+
+    result = {'registered': [], 'failed': []}
+    attempt_ids = ProctoredExamStudentAttempt.objects.filter(
+        registration_pending=True
+    ).order_by('id').values_list('id', flat=True)
+
+    for attempt_id in attempt_ids:
+        try:
+            if register_pending_exam_attempt(attempt_id):
+                result['registered'].append(attempt_id)
+        except Exception:  # pylint: disable=broad-except
+            # already logged, the next run will try again
+            result['failed'].append(attempt_id)
+
+    return result
+
+
+def _provision_exam_attempt(registration):
+    """
+    Runs in the thread pool of preprovision_exam_attempts(), registers one attempt
+    with the backend provider. Returns the attempt, either the external_id or None,
+    and whether a failure counts against the attempt
+    """
+
+    attempt_obj, provider_args = registration
+    try:
+        return attempt_obj, _register_exam_attempt_with_provider(*provider_args), False
+    except BackendProviderUnavailable:
+        # it was not even tried
+        return attempt_obj, None, False
+    except Exception:  # pylint: disable=broad-except
+        log_msg = (
+            'Could not register attempt_id {attempt_id} with the backend provider'.format(attempt_id=attempt_obj.id)
+        )
+        log.exception(log_msg)
+        return attempt_obj, None, True
+
+
+def preprovision_exam_attempts(exam_id, user_ids, workers=None):
+    """
+    Creates the proctored exam attempts of a known roster ahead of the exam, and
+    registers them with the backend provider using a pool of (at most
+    PREPROVISION_WORKERS) threads, so that opening the exam is only a lookup for
+    the students. Attempts which could not be registered are left to
+    register_pending_exam_attempts().
+
+    Returns a dict with the registered, skipped (they already have an attempt)
+    and failed user ids, the elapsed seconds and the registrations per second
+    """
+
+    started = time.time()
+    exam = get_exam_by_id(exam_id)
+    review_policy = ProctoredExamReviewPolicy.get_review_policy_for_exam(exam_id)
+    users = User.objects.in_bulk(user_ids)
+
+    result = {'registered': [], 'skipped': [], 'failed': []}
+
+    # the database work is all done here, the threads only talk to the provider.
+    # The existing attempts and the allowances of the roster are read in one query each
+    existing_user_ids = set(ProctoredExamStudentAttempt.objects.filter(
+        proctored_exam_id=exam_id,
+        user_id__in=users.keys()
+    ).values_list('user_id', flat=True))
+    new_user_ids = [user_id for user_id in users if user_id not in existing_user_ids]
+    allowances = ProctoredExamStudentAllowance.get_allowance_bundles(exam_id, new_user_ids)
+
+    # the attempts are claimed as they are created, so that register_pending_exam_attempts()
+    # leaves them to us, for as long as it takes the pool to get through them
+    workers = workers or settings.PROCTORING_SETTINGS.get('PREPROVISION_WORKERS', DEFAULT_PREPROVISION_WORKERS)
+    claim_seconds = settings.PROCTORING_SETTINGS.get('REGISTRATION_CLAIM_SECONDS', DEFAULT_REGISTRATION_CLAIM_SECONDS)
+    registration_claimed_until = datetime.now(pytz.UTC) + timedelta(
+        seconds=claim_seconds * (1 + len(new_user_ids) // workers)
+    )
+
+    registrations = []
+    for user_id in user_ids:
+        if user_id not in users:
+            result['failed'].append(user_id)
+            continue
+        if user_id in existing_user_ids:
+            result['skipped'].append(user_id)
+            continue
+
+        allowed_time_limit_mins = _get_allowed_time_limit_mins(exam, allowances[user_id])
+        attempt_obj = ProctoredExamStudentAttempt.create_exam_attempt(
+            exam_id,
+            user_id,
+            '',  # student name is TBD
+            allowed_time_limit_mins,
+            unicode(uuid.uuid4()).upper(),
+            True,
+            exam['is_practice_exam'],
+            None,
+            review_policy_id=review_policy.id if review_policy else None,
+            registration_pending=True,
+            registration_claimed_until=registration_claimed_until
+        )
+        existing_user_ids.add(user_id)
+        registrations.append((attempt_obj, (
+            exam,
+            users[user_id],
+            attempt_obj.attempt_code,
+            allowed_time_limit_mins,
+            review_policy,
+            allowances[user_id].review_policy_exception
+        )))
+
+    pool = ThreadPool(max(1, min(workers, len(registrations))))
+    try:
+        provisioned = pool.map(_provision_exam_attempt, registrations)
+    finally:
+        pool.close()
+        pool.join()
+
+    for attempt_obj, external_id, is_failure in provisioned:
+        if external_id:
+            _record_registration(attempt_obj, external_id)
+            result['registered'].append(attempt_obj.user_id)
+        else:
+            if is_failure:
+                _record_registration_failure(exam, attempt_obj)
+            else:
+                _release_registration(attempt_obj.id)
+            result['failed'].append(attempt_obj.user_id)
+
+    result['elapsed'] = time.time() - started
+    result['per_second'] = len(result['registered']) / result['elapsed'] if result['elapsed'] else 0.0
+
+    log_msg = (
+        'Preprovisioned exam_id {exam_id}: {registered} attempts registered, {skipped} skipped, '
+        '{failed} failed in {elapsed:.2f} seconds ({per_second:.1f} per second)'.format(
+            exam_id=exam_id,
+            registered=len(result['registered']),
+            skipped=len(result['skipped']),
+            failed=len(result['failed']),
+            elapsed=result['elapsed'],
+            per_second=result['per_second']
+        )
+    )
+    log.info(log_msg)
+    return result
+
+
 def start_exam_attempt(exam_id, user_id):
     """
     Signals the beginning of an exam attempt for a given
@@ -529,6 +1001,104 @@ def mark_exam_attempt_as_ready(exam_id, user_id):
     return update_attempt_status(exam_id, user_id, ProctoredExamStudentAttemptStatus.ready_to_start)
 
 
+def mark_exam_attempts_as_ready(attempt_codes):
+    """
+    Marks the exam attempts with the given attempt codes as ready to start, with one
+    query to load them all and one conditional UPDATE. Only the attempts which have
+    not gotten past the proctoring setup yet (eligible or created) are moved, the
+    status transitions of all others would go backwards. Attempts which already are
+    ready to start, e.g. from a repeated callback, count as marked.
+
+    The attempts of one proctoring session are all in the same course, the one of
+    the first code which is found. The codes of attempts in other courses are left
+    alone.
+
+    Returns a tuple (attempts, skipped) of the attempts which were found in that
+    course, in the order of the codes, and an OrderedDict of attempt code -> the
+    reason the code was skipped: 'not_found', 'other_course' or the status the
+    attempt is in
+    """
+
+    # the codes come from an URL, drop the blanks and the repeats
+    attempt_codes = [code for code in OrderedDict.fromkeys(attempt_codes) if code]
+
+    attempts_by_code = dict(
+        (attempt_obj.attempt_code, attempt_obj)
+        for attempt_obj in ProctoredExamStudentAttempt.objects.filter(
+            attempt_code__in=attempt_codes
+        ).select_related('proctored_exam', 'user')
+    )
+
+    # the course of the session, see above
+    course_id = None
+    for attempt_code in attempt_codes:
+        if attempt_code in attempts_by_code:
+            course_id = attempts_by_code[attempt_code].proctored_exam.course_id
+            break
+    other_course_codes = set(
+        attempt_code for attempt_code, attempt_obj in attempts_by_code.iteritems()
+        if attempt_obj.proctored_exam.course_id != course_id
+    )
+
+    from_statuses = [ProctoredExamStudentAttemptStatus.eligible, ProctoredExamStudentAttemptStatus.created]
+    eligible_ids = [
+        attempt_obj.id for attempt_code, attempt_obj in attempts_by_code.iteritems()
+        if attempt_obj.status in from_statuses and attempt_code not in other_course_codes
+    ]
+
+    updated_ids = set()
+    if eligible_ids:
+        now = datetime.now(pytz.UTC)
+        # the status is checked again by the UPDATE itself, in case any of them
+        # has moved on since they were loaded
+        updated = ProctoredExamStudentAttempt.objects.filter(
+            id__in=eligible_ids,
+            status__in=from_statuses
+        ).update(status=ProctoredExamStudentAttemptStatus.ready_to_start, modified=now)
+
+        if updated == len(eligible_ids):
+            updated_ids = set(eligible_ids)
+        else:
+            updated_ids = set(
+                ProctoredExamStudentAttempt.objects.filter(
+                    id__in=eligible_ids,
+                    status=ProctoredExamStudentAttemptStatus.ready_to_start
+                ).values_list('id', flat=True)
+            )
+
+        for attempt_obj in attempts_by_code.itervalues():
+            if attempt_obj.id in updated_ids:
+                attempt_obj.status = ProctoredExamStudentAttemptStatus.ready_to_start
+                attempt_obj.modified = now
+
+    attempts = []
+    skipped = OrderedDict()
+    for attempt_code in attempt_codes:
+        attempt_obj = attempts_by_code.get(attempt_code)
+        if attempt_obj is None:
+            skipped[attempt_code] = 'not_found'
+            continue
+        if attempt_code in other_course_codes:
+            skipped[attempt_code] = 'other_course'
+            continue
+        attempts.append(attempt_obj)
+        if attempt_obj.status != ProctoredExamStudentAttemptStatus.ready_to_start:
+            skipped[attempt_code] = attempt_obj.status
+
+    log_msg = (
+        'Marked {ready} of {count} exam attempts as ready to start, skipped {skipped}'.format(
+            ready=len(attempt_codes) - len(skipped),
+            count=len(attempt_codes),
+            skipped=', '.join(
+                '{code} ({reason})'.format(code=code, reason=reason) for code, reason in skipped.iteritems()
+            ) or 'none'
+        )
+    )
+    log.info(log_msg)
+
+    return attempts, skipped
+
+
 def update_attempt_status(exam_id, user_id, to_status, raise_if_not_found=True, cascade_effects=True):
     """
     Internal helper to handle state transitions of attempt status
@@ -922,9 +1492,13 @@ def get_active_exams_for_user(user_id, course_id=None):
         # into the serialized form.
         exam_serialized_data = ProctoredExamSerializer(active_exam.proctored_exam).data
         active_exam_serialized_data = ProctoredExamStudentAttemptSerializer(active_exam).data
-        student_allowances = ProctoredExamStudentAllowance.get_allowances_for_user(
+        student_allowances = ProctoredExamStudentAllowance.get_allowance_bundle(
             active_exam.proctored_exam.id, user_id
-        )
+        ).allowances
+        for allowance in student_allowances:
+            # the bundle might have been cached a while ago, so use the current exam and user
+            allowance.proctored_exam = active_exam.proctored_exam
+            allowance.user = active_exam.user
         allowance_serialized_data = [ProctoredExamStudentAllowanceSerializer(allowance).data for allowance in
                                      student_allowances]
         result.append({
@@ -1074,7 +1648,7 @@ def get_attempt_status_summary(user_id, course_id, content_id):
 
     # check if the exam is not proctored
     if not exam['is_proctored']:
-        return TIMED_EXAM_STATUS_SUMMARY_MAP['_default']
+        return dict(TIMED_EXAM_STATUS_SUMMARY_MAP['_default'])
 
     # let's check credit eligibility
     credit_service = get_runtime_service('credit')
@@ -1086,28 +1660,129 @@ def get_attempt_status_summary(user_id, course_id, content_id):
             return None
 
     attempt = get_exam_attempt(exam['id'], user_id)
+    return _get_status_summary(exam, attempt)
+
+
+def get_attempt_status_summaries(user_id, course_id, content_ids):
+    """
+    Bulk version of get_attempt_status_summary, which returns the summaries
+    for all of the passed in content_ids of a course in a constant number of
+    database queries and at most one call into the credit service
+
+    Return will be a dictionary keyed by content_id, where each value
+    is what get_attempt_status_summary would return for that content_id:
+    {
+        <content_id>: None (not applicable) or {
+            'status': ['eligible', 'declined', 'submitted', 'verified', 'rejected'],
+            'short_description': <short description of status>,
+            'suggested_icon': <recommended font-awesome icon to use>,
+            'in_completed_state': <if the status is considered in a 'completed' state>
+        },
+        ...
+    }
+    """
+
+    # the caller might pass in opaque keys, so map the stored (string)
+    # version back to what we have been given
+    content_id_map = dict((unicode(content_id), content_id) for content_id in content_ids)
+    summaries = dict((content_id, None) for content_id in content_ids)
+
+    exams = ProctoredExam.get_exams_by_content_ids(course_id, content_id_map.keys())
+    exams = [ProctoredExamSerializer(exam).data for exam in exams]
+
+    if len(exams) < len(content_id_map):
+        # this really shouldn't happen, but log it at least
+        log_msg = (
+            'Could not locate all exams for course_id {course_id}. '
+            'Found {found} out of {expected}'.format(
+                course_id=course_id,
+                found=len(exams),
+                expected=len(content_id_map)
+            )
+        )
+        log.warn(log_msg)
+
+    # only proctored, non practice exams depend on the credit eligibility
+    # so only ask for the credit state once and only if we need it
+    is_eligible = True
+    credit_service = get_runtime_service('credit')
+    needs_credit_state = any(
+        exam['is_proctored'] and not exam['is_practice_exam']
+        for exam in exams
+    )
+    if credit_service and needs_credit_state:
+        credit_state = credit_service.get_credit_state(user_id, unicode(course_id))
+        is_eligible = _check_credit_eligibility(credit_state)
+
+    attempt_objs = ProctoredExamStudentAttempt.objects.get_exam_attempts_for_user(
+        user_id,
+        [exam['id'] for exam in exams if exam['is_proctored']]
+    )
+    attempts = dict(
+        (attempt_obj.proctored_exam_id, _get_exam_attempt(attempt_obj))
+        for attempt_obj in attempt_objs
+    )
+
+    for exam in exams:
+        content_id = content_id_map[exam['content_id']]
+        if not exam['is_proctored']:
+            summaries[content_id] = dict(TIMED_EXAM_STATUS_SUMMARY_MAP['_default'])
+        elif exam['is_practice_exam'] or is_eligible:
+            summaries[content_id] = _get_status_summary(exam, attempts.get(exam['id']))
+
+    return summaries
+
+
+def _get_status_summary(exam, attempt):
+    """
+    Helper method to build the status summary of a proctored exam
+    given the (possibly None) attempt on it
+    """
+
     status = attempt['status'] if attempt else ProctoredExamStudentAttemptStatus.eligible
 
     status_map = STATUS_SUMMARY_MAP if not exam['is_practice_exam'] else PRACTICE_STATUS_SUMMARY_MAP
 
-    summary = None
-    if status in status_map:
-        summary = status_map[status]
-    else:
-        summary = status_map['_default']
-
+    # make a copy, so that we don't change the shared status maps
+    summary = dict(status_map.get(status, status_map['_default']))
     summary.update({"status": status})
 
     return summary
 
 
-def get_student_view(user_id, course_id, content_id,
-                     context, user_role='student'):
+def get_student_view_state(user_id, course_id, content_id,
+                           context, user_role='student'):
     """
-    Helper method that will return the view HTML related to the exam control
-    flow (i.e. entering, expired, completed, etc.) If there is no specific
-    content to display, then None will be returned and the caller should
-    render it's own view
+    Returns a compact, JSON serializable description of the view related to the
+    exam control flow (i.e. entering, expired, completed, etc.), which can either be
+    rendered server side (see get_student_view) or client side with the proctoring
+    static bundle. If there is no specific content to display, then None will be
+    returned and the caller should render it's own view
+
+    e.g.
+    {
+        "template": "seq_proctored_exam_instructions",
+        "client_renderable": false,
+        "exam_id": 1,
+        "display_name": "Midterm",
+        "attempt_status": "created",
+        "is_proctored": true,
+        "is_practice_exam": false,
+        "is_sample_attempt": false,
+        "does_time_remain": false,
+        "time_limit_mins": 90,
+        "total_time": "1 hour and 30 minutes",
+        "exam_code": "4E1A9E5C-...",
+        "software_download_url": "http://...",
+        "platform_name": "Open edX",
+        "urls": {
+            "progress_page_url": "/courses/.../progress",
+            "enter_exam_endpoint": "/api/edx_proctoring/v1/proctored_exam/attempt",
+            "exam_started_poll_url": "/api/edx_proctoring/v1/proctored_exam/attempt/1",
+            "change_state_url": "/api/edx_proctoring/v1/proctored_exam/attempt/1"
+        },
+        "link_urls": {...}
+    }
     """
 
     # non-student roles should never see any proctoring related
@@ -1116,6 +1791,7 @@ def get_student_view(user_id, course_id, content_id,
         return None
 
     student_view_template = None
+    extra_state = {}
 
     exam_id = None
     try:
@@ -1130,15 +1806,25 @@ def get_student_view(user_id, course_id, content_id,
     except ProctoredExamNotFoundException:
         # This really shouldn't happen
         # as Studio will be setting this up
-        exam_id = create_exam(
-            course_id=course_id,
-            content_id=unicode(content_id),
-            exam_name=context['display_name'],
-            time_limit_mins=context['default_time_limit_mins'],
-            is_proctored=context.get('is_proctored', False),
-            is_practice_exam=context.get('is_practice_exam', False)
-        )
+        if not settings.PROCTORING_SETTINGS.get('CREATE_EXAMS_ON_VIEW', True):
+            # exams are provisioned up front with sync_exams_for_course,
+            # so the courseware never writes here
+            return None
+
+        try:
+            create_exam(
+                course_id=course_id,
+                content_id=unicode(content_id),
+                exam_name=context['display_name'],
+                time_limit_mins=context['default_time_limit_mins'],
+                is_proctored=context.get('is_proctored', False),
+                is_practice_exam=context.get('is_practice_exam', False)
+            )
+        except ProctoredExamAlreadyExists:
+            # another student got here first
+            pass
         exam = get_exam_by_content_id(course_id, content_id)
+        exam_id = exam['id']
 
     is_proctored = exam['is_proctored']
 
@@ -1202,82 +1888,99 @@ def get_student_view(user_id, course_id, content_id,
 
         if is_proctored:
             if exam['is_practice_exam']:
-                student_view_template = 'proctoring/seq_proctored_practice_exam_entrance.html'
+                student_view_template = 'seq_proctored_practice_exam_entrance'
             else:
-                student_view_template = 'proctoring/seq_proctored_exam_entrance.html'
+                student_view_template = 'seq_proctored_exam_entrance'
         else:
-            student_view_template = 'proctoring/seq_timed_exam_entrance.html'
+            student_view_template = 'seq_timed_exam_entrance'
 
     elif attempt['status'] == ProctoredExamStudentAttemptStatus.created:
-        provider_name = get_provider_name_by_course_id(exam['course_id'])
         provider = get_backend_provider(provider_name)
-        student_view_template = 'proctoring/seq_proctored_exam_instructions.html'
-        context.update({
+        student_view_template = 'seq_proctored_exam_instructions'
+        extra_state = {
             'exam_code': attempt['attempt_code'],
             'software_download_url': provider.get_software_download_url(),
-        })
+            'registration_pending': attempt['registration_pending'],
+        }
     elif attempt['status'] == ProctoredExamStudentAttemptStatus.ready_to_start:
-        student_view_template = 'proctoring/seq_proctored_exam_ready_to_start.html'
+        student_view_template = 'seq_proctored_exam_ready_to_start'
     elif attempt['status'] == ProctoredExamStudentAttemptStatus.error:
         if attempt['is_sample_attempt']:
-            student_view_template = 'proctoring/seq_proctored_practice_exam_error.html'
+            student_view_template = 'seq_proctored_practice_exam_error'
         else:
-            student_view_template = 'proctoring/seq_proctored_exam_error.html'
+            student_view_template = 'seq_proctored_exam_error'
     elif attempt['status'] == ProctoredExamStudentAttemptStatus.timed_out:
-        student_view_template = 'proctoring/seq_timed_exam_expired.html'
+        student_view_template = 'seq_timed_exam_expired'
     elif attempt['status'] == ProctoredExamStudentAttemptStatus.submitted:
         if attempt['is_sample_attempt']:
-            student_view_template = 'proctoring/seq_proctored_practice_exam_submitted.html'
+            student_view_template = 'seq_proctored_practice_exam_submitted'
         else:
-            student_view_template = 'proctoring/seq_proctored_exam_submitted.html'
+            student_view_template = 'seq_proctored_exam_submitted'
     elif attempt['status'] == ProctoredExamStudentAttemptStatus.verified:
-        student_view_template = 'proctoring/seq_proctored_exam_verified.html'
+        student_view_template = 'seq_proctored_exam_verified'
     elif attempt['status'] == ProctoredExamStudentAttemptStatus.rejected:
-        student_view_template = 'proctoring/seq_proctored_exam_rejected.html'
+        student_view_template = 'seq_proctored_exam_rejected'
     elif attempt['status'] == ProctoredExamStudentAttemptStatus.ready_to_submit:
         if is_proctored:
-            student_view_template = 'proctoring/seq_proctored_exam_ready_to_submit.html'
+            student_view_template = 'seq_proctored_exam_ready_to_submit'
         else:
-            student_view_template = 'proctoring/seq_timed_exam_ready_to_submit.html'
-
-    if student_view_template:
-        template = loader.get_template(student_view_template)
-        django_context = Context(context)
-        attempt_time = attempt['allowed_time_limit_mins'] if attempt else exam['time_limit_mins']
-        total_time = humanized_time(attempt_time)
-        progress_page_url = ''
-        try:
-            progress_page_url = reverse(
-                'courseware.views.progress',
-                args=[course_id]
-            )
-        except NoReverseMatch:
-            # we are allowing a failure here since we can't guarantee
-            # that we are running in-proc with the edx-platform LMS
-            # (for example unit tests)
-            pass
+            student_view_template = 'seq_timed_exam_ready_to_submit'
 
-        provider_name = get_provider_name_by_course_id(exam['course_id'])
-        proctoring_settings = get_proctoring_settings(provider_name)
+    if not student_view_template:
+        return None
 
-        django_context.update({
-            'platform_name': settings.PLATFORM_NAME,
-            'total_time': total_time,
-            'exam_id': exam_id,
+    attempt_time = attempt['allowed_time_limit_mins'] if attempt else exam['time_limit_mins']
+
+    # we are allowing a failure here since we can't guarantee
+    # that we are running in-proc with the edx-platform LMS
+    # (for example unit tests)
+    progress_page_url = rendering.memoized_reverse(
+        'courseware.views.progress',
+        args=[course_id],
+        fail_silently=True
+    )
+
+    attempt_url = rendering.memoized_reverse(
+        'edx_proctoring.proctored_exam.attempt',
+        args=[attempt['id']]
+    ) if attempt else ''
+
+    state = {
+        'template': student_view_template,
+        'client_renderable': student_view_template in rendering.CLIENT_RENDERABLE_TEMPLATES,
+        'exam_id': exam_id,
+        'display_name': context.get('display_name', exam['exam_name']),
+        'attempt_status': attempt['status'] if attempt else None,
+        'is_proctored': is_proctored,
+        'is_practice_exam': exam['is_practice_exam'],
+        'is_sample_attempt': attempt['is_sample_attempt'] if attempt else False,
+        'does_time_remain': does_time_remain,
+        'time_limit_mins': attempt_time,
+        'total_time': humanized_time(attempt_time),
+        'platform_name': settings.PLATFORM_NAME,
+        'urls': {
             'progress_page_url': progress_page_url,
-            'is_sample_attempt': attempt['is_sample_attempt'] if attempt else False,
-            'does_time_remain': does_time_remain,
-            'enter_exam_endpoint': reverse('edx_proctoring.proctored_exam.attempt.collection'),
-            'exam_started_poll_url': reverse(
-                'edx_proctoring.proctored_exam.attempt',
-                args=[attempt['id']]
-            ) if attempt else '',
-            'change_state_url': reverse(
-                'edx_proctoring.proctored_exam.attempt',
-                args=[attempt['id']]
-            ) if attempt else '',
-            'link_urls': proctoring_settings.get('LINK_URLS', {}),
-        })
-        return template.render(django_context)
+            'enter_exam_endpoint': rendering.memoized_reverse('edx_proctoring.proctored_exam.attempt.collection'),
+            'exam_started_poll_url': attempt_url,
+            'change_state_url': attempt_url,
+        },
+        'link_urls': proctoring_settings.get('LINK_URLS', {}),
+    }
+    state.update(extra_state)
+    return state
+
+
+def get_student_view(user_id, course_id, content_id,
+                     context, user_role='student'):
+    """
+    Helper method that will return the view HTML related to the exam control
+    flow (i.e. entering, expired, completed, etc.) If there is no specific
+    content to display, then None will be returned and the caller should
+    render it's own view
+    """
+
+    state = get_student_view_state(user_id, course_id, content_id, context, user_role=user_role)
+    if state is None:
+        return None
 
-    return None
+    return rendering.render_student_view(state, context)
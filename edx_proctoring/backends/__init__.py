@@ -2,6 +2,7 @@
 All supporting Proctoring backends
 """
 
+import copy
 from importlib import import_module
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
@@ -9,8 +10,8 @@ from django.core.exceptions import ImproperlyConfigured
 from xmodule.modulestore.django import modulestore
 from opaque_keys.edx.keys import CourseKey
 
-# Cached instance of backend provider
-_BACKEND_PROVIDER = None
+# Cached instances of the backend providers, provider name -> (config, provider)
+_BACKEND_PROVIDERS = {}
 
 def get_provider_name_by_course_id(course_id):
     course_key = CourseKey.from_string(course_id)
@@ -35,15 +36,14 @@ def _get_proctoring_config(provider_name):
 def get_backend_provider(provider_name, emphemeral=True):
     """
     Returns an instance of the configured backend provider that is configured
-    via the settings file
+    via the settings file. Unless emphemeral, the instance is kept around (and
+    with it e.g. its HTTP connections) for as long as its configuration doesn't change
     """
 
-    global _BACKEND_PROVIDER  # pylint: disable=global-statement
-
-    provider = _BACKEND_PROVIDER
-    if not _BACKEND_PROVIDER or emphemeral:
-        config = _get_proctoring_config(provider_name)
+    config = _get_proctoring_config(provider_name)
 
+    cached_config, provider = _BACKEND_PROVIDERS.get(provider_name, (None, None))
+    if not provider or cached_config != config or emphemeral:
         if 'class' not in config or 'options' not in config:
             msg = (
                 "Misconfigured PROCTORING_BACKEND_PROVIDERS settings, "
@@ -57,7 +57,7 @@ def get_backend_provider(provider_name, emphemeral=True):
         provider = class_(**config['options'])
 
         if not emphemeral:
-            _BACKEND_PROVIDER = provider
+            _BACKEND_PROVIDERS[provider_name] = (copy.deepcopy(config), provider)
 
     return provider
 
@@ -51,6 +51,14 @@ class ProctoringBackendProvider(object):
         """
         raise NotImplementedError()
 
+    def on_located_review_callback(self, payload, attempt_obj, is_archived_attempt):  # pylint: disable=unused-argument
+        """
+        Same as on_review_callback(), for a review whose attempt has already been
+        looked up, e.g. along with the other reviews of a bulk callback. Providers
+        which can make use of that override this
+        """
+        return self.on_review_callback(payload)
+
     @abc.abstractmethod
     def on_review_saved(self, review):
         """
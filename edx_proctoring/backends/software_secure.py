@@ -6,24 +6,31 @@ from Crypto.Cipher import DES3
 import base64
 from hashlib import sha256
 import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.exceptions import NewConnectionError
 import hmac
 import binascii
 import datetime
 import json
 import logging
+import random
+import time
 
 from django.conf import settings
+from django.db import transaction
 
 from edx_proctoring.backends.backend import ProctoringBackendProvider
 from edx_proctoring import constants
+from edx_proctoring.circuit_breaker import CircuitBreaker
 from edx_proctoring.exceptions import (
     BackendProvideCannotRegisterAttempt,
+    BackendProviderUnavailable,
     StudentExamAttemptDoesNotExistsException,
     ProctoredExamSuspiciousLookup,
     ProctoredExamReviewAlreadyExists,
     ProctoredExamBadReviewStatus,
 )
-from edx_proctoring.utils import locate_attempt_by_attempt_code
+from edx_proctoring.utils import get_payload_fingerprint, locate_attempt_by_attempt_code, review_callback_lock
 from edx_proctoring. models import (
     ProctoredExamSoftwareSecureReview,
     ProctoredExamSoftwareSecureComment,
@@ -32,6 +39,23 @@ from edx_proctoring. models import (
 
 log = logging.getLogger(__name__)
 
+# defaults of the HTTP client options, which can be overridden in the provider's 'options'
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 10
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_RETRY_BACKOFF = 0.5
+DEFAULT_LATENCY_BUDGET = 15
+DEFAULT_CIRCUIT_BREAKER_THRESHOLD = 5
+DEFAULT_CIRCUIT_BREAKER_RECOVERY = 30
+
+# these mean the registration was not processed, so it is safe to send it again. Not
+# so a 504, SoftwareSecure might have registered the exam and just been slow to answer
+RETRYABLE_STATUS_CODES = (502, 503)
+
+# upper bound on the number of exams we keep the payload templates of
+MAX_CACHED_PAYLOAD_TEMPLATES = 1000
+
 
 class SoftwareSecureBackendProvider(ProctoringBackendProvider):
     """
@@ -39,10 +63,39 @@ class SoftwareSecureBackendProvider(ProctoringBackendProvider):
     RPNow product
     """
 
+    # HTTP client defaults, for subclasses which have an initializer of their own
+    pool_size = DEFAULT_POOL_SIZE
+    timeout = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+    max_retries = DEFAULT_MAX_RETRIES
+    retry_backoff = DEFAULT_RETRY_BACKOFF
+    latency_budget = DEFAULT_LATENCY_BUDGET
+    circuit_breaker_threshold = DEFAULT_CIRCUIT_BREAKER_THRESHOLD
+    circuit_breaker_recovery = DEFAULT_CIRCUIT_BREAKER_RECOVERY
+    _session = None
+    _circuit_breaker = None
+    _hmac_key = None
+    _cipher = None
+    _payload_templates = None
+
     def __init__(self, organization, exam_sponsor, exam_register_endpoint,
-                 secret_key_id, secret_key, crypto_key, software_download_url):
+                 secret_key_id, secret_key, crypto_key, software_download_url,
+                 pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                 retry_backoff=DEFAULT_RETRY_BACKOFF, latency_budget=DEFAULT_LATENCY_BUDGET,
+                 circuit_breaker_threshold=DEFAULT_CIRCUIT_BREAKER_THRESHOLD,
+                 circuit_breaker_recovery=DEFAULT_CIRCUIT_BREAKER_RECOVERY):
         """
-        Class initializer
+        Class initializer, the HTTP client options are:
+
+            pool_size: how many keep-alive connections to SoftwareSecure to hold on to
+            connect_timeout, read_timeout: in seconds
+            max_retries: how many times to resend a registration which could not be processed
+            retry_backoff: in seconds, the retries wait a random time up to this, doubled every retry
+            latency_budget: in seconds, how long a registration may take with all of its retries,
+                None for no limit
+            circuit_breaker_threshold: after how many failed registrations in a row to stop
+                calling SoftwareSecure
+            circuit_breaker_recovery: in seconds, how long to wait before trying again
         """
 
         self.organization = organization
@@ -51,8 +104,14 @@ class SoftwareSecureBackendProvider(ProctoringBackendProvider):
         self.secret_key_id = secret_key_id
         self.secret_key = secret_key
         self.crypto_key = crypto_key
-        self.timeout = 10
         self.software_download_url = software_download_url
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.latency_budget = latency_budget
+        self.circuit_breaker_threshold = circuit_breaker_threshold
+        self.circuit_breaker_recovery = circuit_breaker_recovery
 
     def register_exam_attempt(self, exam, context):
         """
@@ -119,6 +178,19 @@ class SoftwareSecureBackendProvider(ProctoringBackendProvider):
         Documentation on the data format can be found from SoftwareSecure's
         documentation named "Reviewer Data Transfer"
         """
+        self._on_review_callback(payload)
+
+    def on_located_review_callback(self, payload, attempt_obj, is_archived_attempt):
+        """
+        Same as on_review_callback(), without looking up the attempt again
+        """
+        self._on_review_callback(payload, located_attempt=(attempt_obj, is_archived_attempt))
+
+    def _on_review_callback(self, payload, located_attempt=None):
+        """
+        Handles a review, located_attempt is the (attempt, is_archived_attempt)
+        of its attempt code, if it has already been looked up
+        """
 
         log_msg = (
             'Received callback from SoftwareSecure with review data: {payload}'.format(
@@ -127,6 +199,31 @@ class SoftwareSecureBackendProvider(ProctoringBackendProvider):
         )
         log.info(log_msg)
 
+        attempt_code = payload['examMetaData']['examCode']
+        payload_fingerprint = get_payload_fingerprint(payload)
+
+        # SoftwareSecure retries its callbacks, so the same review can come in
+        # more than once, and even at the same time. The review is committed before
+        # the lock is released, so that whoever waited for it sees the review
+        with review_callback_lock(attempt_code):
+            with transaction.commit_on_success():
+                if ProctoredExamSoftwareSecureReview.is_redelivery(attempt_code, payload_fingerprint):
+                    log_msg = (
+                        'Ignoring the redelivered review of attempt_code {attempt_code}'.format(
+                            attempt_code=attempt_code
+                        )
+                    )
+                    log.info(log_msg)
+                    return
+
+                self._save_review(payload, payload_fingerprint, located_attempt)
+
+    def _save_review(self, payload, payload_fingerprint, located_attempt=None):
+        """
+        Checks and stores the review in the payload, and updates the attempt accordingly.
+        The caller runs this in a transaction, so that it is all or nothing
+        """
+
         # what we consider the external_id is SoftwareSecure's 'ssiRecordLocator'
         external_id = payload['examMetaData']['ssiRecordLocator']
 
@@ -152,7 +249,7 @@ class SoftwareSecureBackendProvider(ProctoringBackendProvider):
         # what we recorded as the external_id. We need to look in both
         # the attempt table as well as the archive table
 
-        (attempt_obj, is_archived_attempt) = locate_attempt_by_attempt_code(attempt_code)
+        (attempt_obj, is_archived_attempt) = located_attempt or locate_attempt_by_attempt_code(attempt_code)
         if not attempt_obj:
             # still can't find, error out
             err_msg = (
@@ -213,6 +310,7 @@ class SoftwareSecureBackendProvider(ProctoringBackendProvider):
 
         review.attempt_code = attempt_code
         review.raw_data = json.dumps(payload)
+        review.payload_fingerprint = payload_fingerprint
         review.review_status = review_status
         review.video_url = video_review_link
         review.student = attempt_obj.user
@@ -221,14 +319,7 @@ class SoftwareSecureBackendProvider(ProctoringBackendProvider):
         # service provider, not a user in our database
         review.reviewed_by = None
 
-        review.save()
-
-        # go through and populate all of the specific comments
-        for comment in payload.get('webCamComments', []):
-            self._save_review_comment(review, comment)
-
-        for comment in payload.get('desktopComments', []):
-            self._save_review_comment(review, comment)
+        self._store_review(review, payload)
 
         # we could have gotten a review for an archived attempt
         # this should *not* cause an update in our credit
@@ -239,15 +330,41 @@ class SoftwareSecureBackendProvider(ProctoringBackendProvider):
 
             allow_status_update_on_fail = not constants.REQUIRE_FAILURE_SECOND_REVIEWS
 
-            self.on_review_saved(review, allow_status_update_on_fail=allow_status_update_on_fail)
+            self.on_review_saved(
+                review,
+                allow_status_update_on_fail=allow_status_update_on_fail,
+                located_attempt=(attempt_obj, is_archived_attempt)
+            )
 
-    def on_review_saved(self, review, allow_status_update_on_fail=False):  # pylint: disable=arguments-differ
+    def _store_review(self, review, payload):
+        """
+        Saves the review, along with the comments in its payload
+        """
+
+        is_update = review.id is not None
+        review.save()
+
+        if is_update:
+            # the comments of the updated review replace the previous ones
+            ProctoredExamSoftwareSecureComment.objects.filter(review_id=review.id).delete()
+
+        # go through and populate all of the specific comments
+        comments = [
+            self._build_review_comment(review, comment)
+            for comment in payload.get('webCamComments', []) + payload.get('desktopComments', [])
+        ]
+        if comments:
+            ProctoredExamSoftwareSecureComment.objects.bulk_create(comments)
+
+    def on_review_saved(self, review, allow_status_update_on_fail=False,
+                        located_attempt=None):  # pylint: disable=arguments-differ
         """
         called when a review has been save - either through API (on_review_callback) or via Django Admin panel
-        in order to trigger any workflow associated with proctoring review results
+        in order to trigger any workflow associated with proctoring review results.
+        located_attempt is the (attempt, is_archived_attempt) of the review, if it is already known
         """
 
-        (attempt_obj, is_archived_attempt) = locate_attempt_by_attempt_code(review.attempt_code)
+        (attempt_obj, is_archived_attempt) = located_attempt or locate_attempt_by_attempt_code(review.attempt_code)
 
         if not attempt_obj:
             # This should not happen, but it is logged in the help
@@ -285,11 +402,11 @@ class SoftwareSecureBackendProvider(ProctoringBackendProvider):
                 status
             )
 
-    def _save_review_comment(self, review, comment):
+    def _build_review_comment(self, review, comment):
         """
-        Helper method to save a review comment
+        Helper method to build (but not save) a review comment
         """
-        comment = ProctoredExamSoftwareSecureComment(
+        return ProctoredExamSoftwareSecureComment(
             review=review,
             start_time=comment['eventStart'],
             stop_time=comment['eventFinish'],
@@ -297,7 +414,6 @@ class SoftwareSecureBackendProvider(ProctoringBackendProvider):
             comment=comment['comments'],
             status=comment['eventStatus']
         )
-        comment.save()
 
     def _encrypt_password(self, key, pwd):
         """
@@ -310,10 +426,18 @@ class SoftwareSecureBackendProvider(ProctoringBackendProvider):
             Apply padding
             """
             return text + (block_size - len(text) % block_size) * chr(block_size - len(text) % block_size)
-        cipher = DES3.new(key, DES3.MODE_ECB)
-        encrypted_text = cipher.encrypt(pad(pwd))
+        encrypted_text = self._get_cipher(key).encrypt(pad(pwd))
         return base64.b64encode(encrypted_text)
 
+    def _get_cipher(self, key):
+        """
+        Returns the cipher for the key, which is only set up once. ECB encrypts
+        every block on its own, so the cipher can be used again and again
+        """
+        if self._cipher is None or self._cipher[0] != key:
+            self._cipher = (key, DES3.new(key, DES3.MODE_ECB))
+        return self._cipher[1]
+
     def _split_fullname(self, full_name):
         """
         Utility to break Full Name to first and last name
@@ -327,6 +451,37 @@ class SoftwareSecureBackendProvider(ProctoringBackendProvider):
 
         return (first_name, last_name)
 
+    def _get_payload_template(self, exam, is_sample_attempt):
+        """
+        Returns the part of the payload which is the same for every attempt of
+        the exam, building it only the first time it is asked for
+        """
+        key = (exam['id'], exam['exam_name'], exam['course_id'], is_sample_attempt)
+
+        if self._payload_templates is None:
+            self._payload_templates = {}
+
+        template = self._payload_templates.get(key)
+        if template is None:
+            if len(self._payload_templates) >= MAX_CACHED_PAYLOAD_TEMPLATES:
+                self._payload_templates.clear()
+
+            template = {
+                "organization": self.organization,
+                "reviewedExam": not is_sample_attempt,
+                "examSponsor": self.exam_sponsor,
+                "examName": exam['exam_name'],
+                "ssiProduct": 'rp-now',
+                "orgExtra": {
+                    "noOfStudents": 1,
+                    "examID": exam['id'],
+                    "courseID": exam['course_id'],
+                }
+            }
+            self._payload_templates[key] = template
+
+        return template
+
     def _get_payload(self, exam, context):
         """
         Constructs the data payload that Software Secure expects
@@ -355,30 +510,28 @@ class SoftwareSecureBackendProvider(ProctoringBackendProvider):
         now = datetime.datetime.utcnow()
         start_time_str = now.strftime("%a, %d %b %Y %H:%M:%S GMT")
         end_time_str = (now + datetime.timedelta(minutes=time_limit_mins)).strftime("%a, %d %b %Y %H:%M:%S GMT")
-        return {
+
+        # the template is shared, so only ever add to copies of it
+        template = self._get_payload_template(exam, is_sample_attempt)
+        payload = dict(template)
+        payload.update({
             "examCode": attempt_code,
-            "organization": self.organization,
             "duration": time_limit_mins,
-            "reviewedExam": not is_sample_attempt,
             # NOTE: we will have to allow these notes to be authorable in Studio
             # and then we will pull this from the exam database model
             "reviewerNotes": reviewer_notes,
             "examPassword": self._encrypt_password(self.crypto_key, attempt_code),
-            "examSponsor": self.exam_sponsor,
-            "examName": exam['exam_name'],
-            "ssiProduct": 'rp-now',
             # need to pass in a URL to the LMS?
             "examUrl": callback_url,
-            "orgExtra": {
-                "examStartDate": start_time_str,
-                "examEndDate": end_time_str,
-                "noOfStudents": 1,
-                "examID": exam['id'],
-                "courseID": exam['course_id'],
-                "firstName": first_name,
-                "lastName": last_name,
-            }
-        }
+        })
+        payload["orgExtra"] = dict(template["orgExtra"])
+        payload["orgExtra"].update({
+            "examStartDate": start_time_str,
+            "examEndDate": end_time_str,
+            "firstName": first_name,
+            "lastName": last_name,
+        })
+        return payload
 
     def _header_string(self, headers, date):
         """
@@ -400,30 +553,40 @@ class SoftwareSecureBackendProvider(ProctoringBackendProvider):
         """
         Serializes out the HTTP body that SoftwareSecure expects
         """
-        keys = body_json.keys()
-        keys.sort()
-        string = ""
-        for key in keys:
+        parts = []
+        self._append_body_parts(parts, body_json, prefix)
+        return ''.join(parts)
+
+    def _append_body_parts(self, parts, body_json, prefix):
+        """
+        Appends the lines of the body string to parts, nested objects go into the
+        same list so that the string is only joined up once at the end
+        """
+        for key in sorted(body_json):
             value = body_json[key]
             if isinstance(value, bool):
-                if value:
-                    value = 'true'
-                else:
-                    value = 'false'
+                value = 'true' if value else 'false'
             if isinstance(value, (list, tuple)):
                 for idx, arr in enumerate(value):
                     if isinstance(arr, dict):
-                        string += self._body_string(arr, key + '.' + str(idx) + '.')
+                        self._append_body_parts(parts, arr, key + '.' + str(idx) + '.')
                     else:
-                        string += key + '.' + str(idx) + ':' + arr + '\n'
+                        parts.append(key + '.' + str(idx) + ':' + arr + '\n')
             elif isinstance(value, dict):
-                string += self._body_string(value, key + '.')
+                self._append_body_parts(parts, value, key + '.')
             else:
                 if value != "" and not value:
                     value = "null"
-                string += str(prefix) + str(key) + ":" + unicode(value).encode('utf-8') + '\n'
+                parts.append(str(prefix) + str(key) + ":" + unicode(value).encode('utf-8') + '\n')
 
-        return string
+    def _get_hmac(self):
+        """
+        Returns a new HMAC for signing a message, copied from one which has
+        been prepared with the secret key, so that the key is only set up once
+        """
+        if self._hmac_key is None:
+            self._hmac_key = hmac.new(str(self.secret_key), digestmod=sha256)
+        return self._hmac_key.copy()
 
     def _sign_doc(self, body_json, method, headers, date):
         """
@@ -439,29 +602,139 @@ class SoftwareSecureBackendProvider(ProctoringBackendProvider):
         # HMAC requires a string not a unicode
         message = str(message)
 
-        log_msg = (
-            'About to send payload to SoftwareSecure:\n{message}'.format(message=message)
-        )
-        log.info(log_msg)
+        if log.isEnabledFor(logging.DEBUG):
+            log_msg = (
+                'About to send payload to SoftwareSecure:\n{message}'.format(message=message)
+            )
+            log.debug(log_msg)
 
-        hashed = hmac.new(str(self.secret_key), str(message), sha256)
+        hashed = self._get_hmac()
+        hashed.update(message)
         computed = binascii.b2a_base64(hashed.digest()).rstrip('\n')
 
         return 'SSI ' + self.secret_key_id + ':' + computed
 
+    def _get_session(self):
+        """
+        Returns the HTTP session of this provider, which keeps the connections
+        to SoftwareSecure alive in between requests
+        """
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._session = session
+        return self._session
+
+    def get_circuit_breaker(self):
+        """
+        Returns the circuit breaker of the calls to SoftwareSecure, its state is
+        shared by all of the providers with the same exam_register_endpoint
+        """
+        if self._circuit_breaker is None:
+            self._circuit_breaker = CircuitBreaker(
+                self.exam_register_endpoint,
+                failure_threshold=self.circuit_breaker_threshold,
+                recovery_timeout=self.circuit_breaker_recovery
+            )
+        return self._circuit_breaker
+
+    def _get_request_timeout(self, deadline):
+        """
+        Returns the timeout of the next request, which is cut short so that it
+        ends before the deadline of the latency budget
+        """
+        if deadline is None:
+            return self.timeout
+
+        # requests doesn't take a timeout of 0
+        remaining = max(deadline - time.time(), 0.1)
+        return tuple(min(timeout, remaining) for timeout in self.timeout)
+
+    def _may_retry(self, retries, deadline):
+        """
+        Returns whether there are retries left, and the time to wait for the next one
+        """
+        if retries >= self.max_retries:
+            return False
+        return deadline is None or time.time() + self.retry_backoff * 2 ** retries < deadline
+
+    @staticmethod
+    def _is_connect_failure(error):
+        """
+        Returns whether the ConnectionError happened before the registration was
+        sent. Registering is not idempotent, so only these can be retried, unlike
+        e.g. a connection which was dropped while we waited for the response
+        """
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        reason = error.args[0] if error.args else None
+        # requests wraps the error of urllib3 in the error its retries gave up with
+        return isinstance(getattr(reason, 'reason', reason), NewConnectionError)
+
     def _send_request_to_ssi(self, data, sig, date):
         """
-        Performs the webservice call to SoftwareSecure
-        """
-        response = requests.post(
-            self.exam_register_endpoint,
-            headers={
-                'Content-Type': 'application/json',
-                "Authorization": sig,
-                "Date": date
-            },
-            data=json.dumps(data),
-            timeout=self.timeout
+        Performs the webservice call to SoftwareSecure. Requests which were not
+        processed, because we could not connect or SoftwareSecure was unavailable,
+        are retried with a jittered exponential backoff, for as long as the latency
+        budget allows. While SoftwareSecure keeps failing, the circuit breaker makes
+        the calls fail fast with BackendProviderUnavailable instead
+        """
+        circuit_breaker = self.get_circuit_breaker()
+        if not circuit_breaker.allow_request():
+            raise BackendProviderUnavailable(
+                'Not calling SoftwareSecure at {endpoint}, it has been failing'.format(
+                    endpoint=self.exam_register_endpoint
+                )
+            )
+
+        session = self._get_session()
+        body = json.dumps(data)
+        headers = {
+            'Content-Type': 'application/json',
+            "Authorization": sig,
+            "Date": date
+        }
+
+        start = time.time()
+        deadline = start + self.latency_budget if self.latency_budget else None
+        retries = 0
+        try:
+            while True:
+                try:
+                    response = session.post(
+                        self.exam_register_endpoint,
+                        headers=headers,
+                        data=body,
+                        timeout=self._get_request_timeout(deadline)
+                    )
+                except requests.exceptions.ConnectionError as error:
+                    if not self._is_connect_failure(error) or not self._may_retry(retries, deadline):
+                        raise
+                else:
+                    if response.status_code not in RETRYABLE_STATUS_CODES or not self._may_retry(retries, deadline):
+                        break
+
+                retries += 1
+                time.sleep(random.uniform(0, self.retry_backoff * 2 ** (retries - 1)))
+        except requests.exceptions.RequestException:
+            circuit_breaker.record_failure()
+            raise
+
+        if response.status_code >= 500:
+            circuit_breaker.record_failure()
+        else:
+            circuit_breaker.record_success()
+
+        log_msg = (
+            'Request to SoftwareSecure took {elapsed:.0f}ms, with {retries} retries. '
+            'HTTP Status code was {status_code}.'.format(
+                elapsed=(time.time() - start) * 1000,
+                retries=retries,
+                status_code=response.status_code
+            )
         )
+        log.info(log_msg)
 
         return response.status_code, response.text
@@ -2,7 +2,9 @@
 Tests for backend.py
 """
 
+from django.conf import settings
 from django.test import TestCase
+from edx_proctoring.backends import get_backend_provider
 from edx_proctoring.backends.backend import ProctoringBackendProvider
 from edx_proctoring.backends.null import NullBackendProvider
 
@@ -149,3 +151,25 @@ class TestBackends(TestCase):
         self.assertIsNone(provider.get_software_download_url())
         self.assertIsNone(provider.on_review_callback(None))
         self.assertIsNone(provider.on_review_saved(None))
+
+    def test_provider_cache(self):
+        """
+        Providers are kept around per name, until their configuration changes
+        """
+
+        provider = get_backend_provider('TEST', emphemeral=False)
+        self.assertIsInstance(provider, TestBackendProvider)
+        self.assertIs(get_backend_provider('TEST', emphemeral=False), provider)
+        self.assertIsNot(get_backend_provider('TEST'), provider)
+
+        providers = dict(
+            settings.PROCTORING_BACKEND_PROVIDERS,
+            OTHER={'class': 'edx_proctoring.backends.null.NullBackendProvider', 'options': {}}
+        )
+        with self.settings(PROCTORING_BACKEND_PROVIDERS=providers):
+            self.assertIsInstance(get_backend_provider('OTHER', emphemeral=False), NullBackendProvider)
+            self.assertIs(get_backend_provider('TEST', emphemeral=False), provider)
+
+        providers = {'TEST': {'class': 'edx_proctoring.backends.null.NullBackendProvider', 'options': {}}}
+        with self.settings(PROCTORING_BACKEND_PROVIDERS=providers):
+            self.assertIsInstance(get_backend_provider('TEST', emphemeral=False), NullBackendProvider)
@@ -4,19 +4,35 @@
 Tests for the software_secure module
 """
 
+import base64
 import json
+import random
+import time
+import uuid
 import ddt
+import requests
 from string import Template  # pylint: disable=deprecated-module
-from mock import patch
+from mock import Mock, patch
+from freezegun import freeze_time
+from Crypto.Cipher import DES3
 from httmock import all_requests, HTTMock
+from requests.packages.urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.client import Client
 from django.contrib.auth.models import User
 from edx_proctoring.runtime import set_runtime_service, get_runtime_service
 
 from edx_proctoring.backends import get_backend_provider
-from edx_proctoring.exceptions import BackendProvideCannotRegisterAttempt
+from edx_proctoring.backends.software_secure import SoftwareSecureBackendProvider
+from edx_proctoring.callbacks import _process_review_group, _process_review_group_in_thread
+from edx_proctoring.circuit_breaker import CIRCUIT_CLOSED, CIRCUIT_OPEN
+from edx_proctoring.exceptions import BackendProvideCannotRegisterAttempt, BackendProviderUnavailable
 from edx_proctoring import constants
+from edx_proctoring.benchmarks import legacy_body_string, legacy_sign_doc, run_benchmark
 
 from edx_proctoring.api import (
     get_exam_attempt_by_id,
@@ -38,6 +54,7 @@ from edx_proctoring.models import (
     ProctoredExamStudentAttemptStatus,
     ProctoredExamSoftwareSecureReviewHistory,
     ProctoredExamReviewPolicy,
+    ProctoredExamStudentAttempt,
     ProctoredExamStudentAttemptHistory,
     ProctoredExamStudentAllowance
 )
@@ -629,9 +646,12 @@ class SoftwareSecureTests(TestCase):
 
         provider.on_review_callback(json.loads(test_payload))
 
-        # now call again
+        # a redelivery of the same review is fine
+        provider.on_review_callback(json.loads(test_payload))
+
+        # but not another review
         with self.assertRaises(ProctoredExamReviewAlreadyExists):
-            provider.on_review_callback(json.loads(test_payload))
+            provider.on_review_callback(json.loads(test_payload.replace('Clean', 'Suspicious')))
 
     @patch('edx_proctoring.constants.ALLOW_REVIEW_UPDATES', True)
     def test_allow_review_resubmission(self):
@@ -686,6 +706,10 @@ class SoftwareSecureTests(TestCase):
         )
         self.assertIsNotNone(review.raw_data)
 
+        # the comments of the first review have been replaced
+        comments = ProctoredExamSoftwareSecureComment.objects.filter(review_id=review.id)
+        self.assertEqual(len(comments), 6)
+
         # make sure history table is no longer empty
         records = ProctoredExamSoftwareSecureReviewHistory.objects.filter(attempt_code=attempt['attempt_code'])
         self.assertEqual(len(records), 1)
@@ -841,3 +865,679 @@ class SoftwareSecureTests(TestCase):
         (first_name, last_name) = provider._split_fullname(u'अआईउऊऋऌ अआईउऊऋऌ')
         self.assertEqual(first_name, u'अआईउऊऋऌ')
         self.assertEqual(last_name, u'अआईउऊऋऌ')
+
+
+SOFTWARE_SECURE_OPTIONS = {
+    "secret_key_id": "foo",
+    "secret_key": "4B230FA45A6EC5AE8FDE2AFFACFABAA16D8A3D0B",
+    "crypto_key": "123456789123456712345678",
+    "exam_register_endpoint": "http://test",
+    "organization": "edx",
+    "exam_sponsor": "edX LMS",
+    "software_download_url": "http://example.com"
+}
+
+
+@patch('edx_proctoring.backends.software_secure.time.sleep')
+class SoftwareSecureHttpClientTests(TestCase):
+    """
+    Tests for the HTTP client of the SoftwareSecure provider
+    """
+
+    def setUp(self):
+        """
+        Initialize
+        """
+        super(SoftwareSecureHttpClientTests, self).setUp()
+        # the state of the circuit breaker is in the cache
+        cache.clear()
+        self.provider = SoftwareSecureBackendProvider(max_retries=2, **SOFTWARE_SECURE_OPTIONS)
+        self.status_codes = []
+
+    def _send(self):
+        """
+        Sends a request, the mocked responses come from self.status_codes
+        """
+
+        @all_requests
+        def mock_response(url, request):  # pylint: disable=unused-argument
+            """
+            Returns the next status code
+            """
+            return {
+                'status_code': self.status_codes.pop(0),
+                'content': json.dumps({'ssiRecordLocator': 'foobar'})
+            }
+
+        with HTTMock(mock_response):
+            return self.provider._send_request_to_ssi({}, 'SSI foo:bar', 'now')  # pylint: disable=protected-access
+
+    def test_session_reused(self, mock_sleep):
+        """
+        All requests go through the same session
+        """
+        self.status_codes = [200, 200]
+        self._send()
+        session = self.provider._get_session()  # pylint: disable=protected-access
+        self._send()
+        self.assertIs(self.provider._get_session(), session)  # pylint: disable=protected-access
+        self.assertEqual(self.provider.timeout, (5, 10))
+        self.assertFalse(mock_sleep.called)
+
+    def test_retry_unavailable(self, mock_sleep):
+        """
+        Requests which SoftwareSecure could not process are retried
+        """
+        self.status_codes = [503, 502, 200]
+        status, __ = self._send()
+        self.assertEqual(status, 200)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    def test_retries_bounded(self, mock_sleep):
+        """
+        We give up after max_retries
+        """
+        self.status_codes = [503, 503, 503, 200]
+        status, __ = self._send()
+        self.assertEqual(status, 503)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    def test_no_retry_on_errors(self, mock_sleep):
+        """
+        Other errors are not retried, the request might have been processed
+        """
+        self.status_codes = [500, 200]
+        status, __ = self._send()
+        self.assertEqual(status, 500)
+
+        # it might just have taken SoftwareSecure too long to answer
+        self.status_codes = [504, 200]
+        status, __ = self._send()
+        self.assertEqual(status, 504)
+        self.assertFalse(mock_sleep.called)
+
+    def _assert_retried(self, error, mock_sleep):
+        """
+        Registrations which could not be sent are retried, and raised when we run out of retries
+        """
+
+        @all_requests
+        def mock_connect_failure(url, request):  # pylint: disable=unused-argument
+            """
+            Can't connect
+            """
+            raise error
+
+        with HTTMock(mock_connect_failure):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.provider._send_request_to_ssi({}, 'SSI foo:bar', 'now')  # pylint: disable=protected-access
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    def test_retry_connect_timeouts(self, mock_sleep):
+        """
+        Connect timeouts are retried
+        """
+        self._assert_retried(requests.exceptions.ConnectTimeout(), mock_sleep)
+
+    def test_retry_refused_connections(self, mock_sleep):
+        """
+        Refused connections are retried
+        """
+        error = MaxRetryError(None, '/', NewConnectionError(None, 'refused'))
+        self._assert_retried(requests.exceptions.ConnectionError(error), mock_sleep)
+
+    def test_no_retry_on_dropped_connections(self, mock_sleep):
+        """
+        A connection which was dropped after the registration was sent is not retried
+        """
+
+        @all_requests
+        def mock_connection_aborted(url, request):  # pylint: disable=unused-argument
+            """
+            SoftwareSecure hangs up on us
+            """
+            raise requests.exceptions.ConnectionError(ProtocolError('Connection aborted.'))
+
+        with HTTMock(mock_connection_aborted):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.provider._send_request_to_ssi({}, 'SSI foo:bar', 'now')  # pylint: disable=protected-access
+        self.assertFalse(mock_sleep.called)
+
+    def test_latency_budget(self, mock_sleep):
+        """
+        There are no retries which don't fit in the latency budget, and the
+        timeouts are cut short to fit
+        """
+        self.provider.latency_budget = 0.5
+        self.provider.retry_backoff = 1
+        self.status_codes = [503, 200]
+        status, __ = self._send()
+        self.assertEqual(status, 503)
+        self.assertFalse(mock_sleep.called)
+
+        timeout = self.provider._get_request_timeout(time.time() + 3)  # pylint: disable=protected-access
+        self.assertTrue(all(2 < value <= 3 for value in timeout))
+
+    def test_circuit_breaker(self, mock_sleep):  # pylint: disable=unused-argument
+        """
+        Once SoftwareSecure has kept on failing the calls fail fast, until a probe
+        gets through again
+        """
+        self.provider.max_retries = 0
+        self.provider.circuit_breaker_threshold = 2
+        self.status_codes = [500, 503, 200]
+        self._send()
+        self._send()
+
+        with self.assertRaises(BackendProviderUnavailable):
+            self._send()
+        self.assertEqual(self.status_codes, [200])
+        self.assertEqual(self.provider.get_circuit_breaker().get_metrics()['state'], CIRCUIT_OPEN)
+
+        with patch('edx_proctoring.circuit_breaker.time.time', return_value=time.time() + 31):
+            status, __ = self._send()
+        self.assertEqual(status, 200)
+        self.assertEqual(self.provider.get_circuit_breaker().get_metrics()['state'], CIRCUIT_CLOSED)
+
+
+class SoftwareSecureSigningTests(TestCase):
+    """
+    Tests for the request signing of the SoftwareSecure provider
+    """
+
+    def setUp(self):
+        """
+        Initialize
+        """
+        super(SoftwareSecureSigningTests, self).setUp()
+        self.provider = SoftwareSecureBackendProvider(**SOFTWARE_SECURE_OPTIONS)
+        self.random = random.Random(1234)
+
+    def _random_key(self):
+        """
+        Keys are always ascii
+        """
+        return ''.join(self.random.choice('abcdefghijXYZ_') for __ in xrange(self.random.randint(1, 6)))
+
+    def _random_scalar(self):
+        """
+        All of the kinds of values a payload holds
+        """
+        return self.random.choice([
+            lambda: None,
+            lambda: True,
+            lambda: False,
+            lambda: 0,
+            lambda: '',
+            lambda: self.random.randint(-1000, 1000),
+            lambda: self.random.random() * 100,
+            lambda: self._random_key(),
+            lambda: u'\u0905\u0906 {key} é'.format(key=self._random_key()),
+        ])()
+
+    def _random_payload(self, depth=0):
+        """
+        Builds a payload with nested objects and lists
+        """
+        payload = {}
+        for __ in xrange(self.random.randint(0, 8)):
+            kind = self.random.randint(0, 9) if depth < 3 else 0
+            if kind == 8:
+                payload[self._random_key()] = self._random_payload(depth + 1)
+            elif kind == 9:
+                payload[self._random_key()] = [
+                    self._random_payload(depth + 1) if self.random.randint(0, 1) else self._random_key()
+                    for __ in xrange(self.random.randint(0, 4))
+                ]
+            else:
+                payload[self._random_key()] = self._random_scalar()
+        return payload
+
+    def test_body_string_fuzzed(self):
+        """
+        The canonical string is the very same as the one which used to be built
+        """
+        for __ in xrange(500):
+            payload = self._random_payload()
+            self.assertEqual(
+                self.provider._body_string(payload),
+                legacy_body_string(payload)
+            )
+
+    def test_sign_doc_fuzzed(self):
+        """
+        And so are the signatures, with the prepared HMAC key being reused
+        """
+        headers = {'Content-Type': 'application/json'}
+        for __ in xrange(100):
+            payload = self._random_payload()
+            self.assertEqual(
+                self.provider._sign_doc(payload, 'POST', headers, 'now'),
+                legacy_sign_doc(self.provider, payload, 'POST', headers, 'now')
+            )
+
+    def test_registration_payload(self):
+        """
+        An actual registration payload
+        """
+        payload = self.provider._get_payload(
+            {'id': 1, 'exam_name': u'अआईउऊऋऌ', 'course_id': 'a/b/c'},
+            {
+                'attempt_code': '123',
+                'time_limit_mins': 90,
+                'is_sample_attempt': False,
+                'callback_url': 'http://localhost',
+                'full_name': u'Jöhn Døe',
+                'review_policy_exception': 'calculator allowed',
+            }
+        )
+        self.assertEqual(
+            self.provider._body_string(payload),
+            legacy_body_string(payload)
+        )
+
+    def test_sign_payload_benchmark(self):
+        """
+        Make sure the benchmark scenario runs
+        """
+        results = run_benchmark('sign_payload', 2)
+        self.assertEqual([label for label, __ in results], ['legacy', 'current'])
+
+
+class SoftwareSecurePayloadTests(TestCase):
+    """
+    Tests for the registration payloads of the SoftwareSecure provider
+    """
+
+    def setUp(self):
+        """
+        Initialize
+        """
+        super(SoftwareSecurePayloadTests, self).setUp()
+        self.provider = SoftwareSecureBackendProvider(**SOFTWARE_SECURE_OPTIONS)
+        self.exam = {'id': 1, 'exam_name': u'अआईउऊऋऌ', 'course_id': 'a/b/c'}
+
+    def _get_payload(self, attempt_code, full_name, is_sample_attempt=False):
+        """
+        Builds the payload of an attempt of the exam
+        """
+        return self.provider._get_payload(self.exam, {
+            'attempt_code': attempt_code,
+            'time_limit_mins': 90,
+            'is_sample_attempt': is_sample_attempt,
+            'callback_url': 'http://localhost',
+            'full_name': full_name,
+        })
+
+    @freeze_time('2015-09-01 10:00:00')
+    def test_payload(self):
+        """
+        The template and the attempt fields make up the whole payload
+        """
+        self.assertEqual(self._get_payload('123', u'Jöhn Døe'), {
+            'examCode': '123',
+            'organization': 'edx',
+            'duration': 90,
+            'reviewedExam': True,
+            'reviewerNotes': constants.DEFAULT_SOFTWARE_SECURE_REVIEW_POLICY,
+            'examPassword': self.provider._encrypt_password(SOFTWARE_SECURE_OPTIONS['crypto_key'], '123'),
+            'examSponsor': 'edX LMS',
+            'examName': u'अआईउऊऋऌ',
+            'ssiProduct': 'rp-now',
+            'examUrl': 'http://localhost',
+            'orgExtra': {
+                'examStartDate': 'Tue, 01 Sep 2015 10:00:00 GMT',
+                'examEndDate': 'Tue, 01 Sep 2015 11:30:00 GMT',
+                'noOfStudents': 1,
+                'examID': 1,
+                'courseID': 'a/b/c',
+                'firstName': u'Jöhn',
+                'lastName': u'Døe',
+            }
+        })
+
+    def test_template_shared(self):
+        """
+        The attempts of an exam share its template, without their fields leaking into it
+        """
+        first = self._get_payload('123', u'Jöhn Døe')
+        second = self._get_payload('456', u'Jane')
+        self.assertEqual(len(self.provider._payload_templates), 1)
+        self.assertEqual(second['examCode'], '456')
+        self.assertEqual(second['orgExtra']['firstName'], u'Jane')
+        self.assertEqual(second['orgExtra']['lastName'], '')
+        self.assertEqual(first['orgExtra']['firstName'], u'Jöhn')
+
+        practice = self._get_payload('789', u'Jane', is_sample_attempt=True)
+        self.assertFalse(practice['reviewedExam'])
+        self.assertEqual(len(self.provider._payload_templates), 2)
+
+    def test_templates_bounded(self):
+        """
+        The templates get dropped once there are too many of them
+        """
+        with patch('edx_proctoring.backends.software_secure.MAX_CACHED_PAYLOAD_TEMPLATES', 2):
+            for exam_id in range(3):
+                self.exam['id'] = exam_id
+                self._get_payload('123', u'Jane')
+            self.assertEqual(len(self.provider._payload_templates), 1)
+
+    def test_cipher_reused(self):
+        """
+        The passwords are the same as with a cipher of their own
+        """
+        key = SOFTWARE_SECURE_OPTIONS['crypto_key']
+        for attempt_code in ('123', unicode(uuid.uuid4()).upper(), 'A' * 24):
+            padding = 8 - len(attempt_code) % 8
+            self.assertEqual(
+                self.provider._encrypt_password(key, attempt_code),
+                base64.b64encode(DES3.new(key, DES3.MODE_ECB).encrypt(attempt_code + padding * chr(padding)))
+            )
+        cipher = self.provider._get_cipher(key)
+        self.assertIs(self.provider._get_cipher(key), cipher)
+
+    def test_registration_payload_benchmark(self):
+        """
+        Make sure the benchmark scenario runs
+        """
+        results = run_benchmark('registration_payload', 2)
+        self.assertEqual([label for label, __ in results], ['uncached', 'cached'])
+
+
+class ReviewCallbackMixin(object):
+    """
+    Sets up a registered attempt, and delivers reviews of it
+    """
+
+    def _create_attempt(self):
+        """
+        Creates an attempt which has been registered with SoftwareSecure
+        """
+        self.user = User.objects.create(username='foo', email='foo@bar.com')
+        set_runtime_service('credit', MockCreditService())
+        self.provider = SoftwareSecureBackendProvider(**SOFTWARE_SECURE_OPTIONS)
+
+        exam_id = create_exam(
+            course_id='foo/bar/baz',
+            content_id='content',
+            exam_name='Sample Exam',
+            time_limit_mins=10,
+            is_proctored=True
+        )
+        self.attempt = ProctoredExamStudentAttempt.create_exam_attempt(
+            exam_id, self.user.id, '', 10, 'ABCDEF', True, False, 'LOCATOR'
+        )
+
+    def _get_payload(self, review_status='Clean', comment_count=None):
+        """
+        The review payload of the attempt, with comment_count desktop comments if given
+        """
+        payload = json.loads(Template(TEST_REVIEW_PAYLOAD).substitute(
+            attempt_code=self.attempt.attempt_code,
+            external_id=self.attempt.external_id
+        ))
+        payload['reviewStatus'] = review_status
+        if comment_count is not None:
+            payload['webCamComments'] = []
+            payload['desktopComments'] = [
+                {
+                    'comments': 'Event {index}'.format(index=index),
+                    'duration': 1,
+                    'eventFinish': index + 1,
+                    'eventStart': index,
+                    'eventStatus': 'Suspicious',
+                }
+                for index in range(comment_count)
+            ]
+        return payload
+
+    def _get_comments(self):
+        """
+        The stored comments of the attempt's review
+        """
+        return ProctoredExamSoftwareSecureComment.objects.filter(
+            review__attempt_code=self.attempt.attempt_code
+        ).order_by('start_time')
+
+
+@patch('edx_proctoring.api.get_provider_name_by_course_id', return_value='TEST')
+class SoftwareSecureReviewTests(ReviewCallbackMixin, TestCase):
+    """
+    Tests for storing the reviews of the SoftwareSecure provider
+    """
+
+    def setUp(self):
+        """
+        Initialize
+        """
+        super(SoftwareSecureReviewTests, self).setUp()
+        self._create_attempt()
+
+    def test_comments_bulk_created(self, provider):  # pylint: disable=unused-argument
+        """
+        The comments are inserted all at once
+        """
+        with patch.object(ProctoredExamSoftwareSecureComment, 'save') as mock_save:
+            self.provider.on_review_callback(self._get_payload(comment_count=200))
+        self.assertFalse(mock_save.called)
+
+        comments = self._get_comments()
+        self.assertEqual(len(comments), 200)
+        self.assertEqual(comments[199].comment, 'Event 199')
+        self.assertEqual(comments[199].start_time, 199)
+
+    def test_no_comments(self, provider):  # pylint: disable=unused-argument
+        """
+        Reviews need not have any comments
+        """
+        self.provider.on_review_callback(self._get_payload(comment_count=0))
+        self.assertIsNotNone(ProctoredExamSoftwareSecureReview.get_review_by_attempt_code('ABCDEF'))
+        self.assertEqual(len(self._get_comments()), 0)
+
+    @patch('edx_proctoring.constants.ALLOW_REVIEW_UPDATES', True)
+    def test_update_replaces_comments(self, provider):  # pylint: disable=unused-argument
+        """
+        The comments of an updated review replace the previous ones
+        """
+        self.provider.on_review_callback(self._get_payload(comment_count=5))
+        self.provider.on_review_callback(self._get_payload(review_status='Suspicious', comment_count=2))
+
+        self.assertEqual([comment.comment for comment in self._get_comments()], ['Event 0', 'Event 1'])
+
+    def test_redelivery(self, provider):  # pylint: disable=unused-argument
+        """
+        Redeliveries of the same payload are recognized with a single query
+        """
+        self.provider.on_review_callback(self._get_payload())
+        review = ProctoredExamSoftwareSecureReview.get_review_by_attempt_code('ABCDEF')
+        self.assertEqual(len(review.payload_fingerprint), 64)
+
+        with patch('edx_proctoring.api.update_attempt_status') as mock_update:
+            with self.assertNumQueries(1):
+                self.provider.on_review_callback(self._get_payload())
+        self.assertFalse(mock_update.called)
+        self.assertEqual(ProctoredExamSoftwareSecureReviewHistory.objects.count(), 0)
+        self.assertEqual(len(self._get_comments()), 6)
+
+    def test_changed_payload(self, provider):  # pylint: disable=unused-argument
+        """
+        A different review of the same attempt is not a redelivery
+        """
+        self.provider.on_review_callback(self._get_payload())
+        with self.assertRaises(ProctoredExamReviewAlreadyExists):
+            self.provider.on_review_callback(self._get_payload(review_status='Suspicious'))
+
+    def test_locked(self, provider):  # pylint: disable=unused-argument
+        """
+        The deliveries for an attempt are handled one at a time
+        """
+        with patch('edx_proctoring.backends.software_secure.review_callback_lock') as mock_lock:
+            self.provider.on_review_callback(self._get_payload())
+        mock_lock.assert_called_once_with('ABCDEF')
+        self.assertTrue(mock_lock.return_value.__enter__.called)
+
+
+@patch.dict(
+    'django.conf.settings.PROCTORING_BACKEND_PROVIDERS',
+    {
+        'SOFTWARE_SECURE': {
+            'class': 'edx_proctoring.backends.software_secure.SoftwareSecureBackendProvider',
+            'options': SOFTWARE_SECURE_OPTIONS,
+            'settings': {},
+        },
+    }
+)
+@patch('edx_proctoring.callbacks.get_provider_name_by_course_id', return_value='SOFTWARE_SECURE')
+@patch('edx_proctoring.api.get_provider_name_by_course_id', return_value='TEST')
+class SoftwareSecureBulkReviewTests(ReviewCallbackMixin, TestCase):
+    """
+    Tests for the bulk review callback, with the SoftwareSecure provider
+    """
+
+    def setUp(self):
+        """
+        Initialize
+        """
+        super(SoftwareSecureBulkReviewTests, self).setUp()
+        self._create_attempt()
+
+    def _post(self, reviews):
+        """
+        Posts the reviews to the bulk review callback, returns the report
+        """
+        response = Client().post(
+            reverse('edx_proctoring.anonymous.proctoring_bulk_review_callback'),
+            data=json.dumps(reviews),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_report(self, provider, callbacks_provider):  # pylint: disable=unused-argument
+        """
+        Every review gets its status
+        """
+        unknown = self._get_payload()
+        unknown['examMetaData']['examCode'] = 'UNKNOWN'
+        bad_status = self._get_payload(review_status='Bogus')
+
+        report = self._post([{'examMetaData': {}}, unknown, bad_status, self._get_payload()])
+        self.assertEqual(
+            [(item['examCode'], item['status']) for item in report],
+            [(None, 'invalid'), ('UNKNOWN', 'not_found'), ('ABCDEF', 'failed'), ('ABCDEF', 'stored')]
+        )
+        self.assertIn('reason', report[2])
+        self.assertEqual(ProctoredExamStudentAttempt.objects.get(id=self.attempt.id).status, 'verified')
+
+        # and SoftwareSecure retries
+        self.assertEqual(self._post([self._get_payload()]), [{'examCode': 'ABCDEF', 'status': 'redelivered'}])
+
+    def test_located_once(self, provider, callbacks_provider):  # pylint: disable=unused-argument
+        """
+        The attempts are looked up all at once, the provider doesn't look them up again
+        """
+        with patch('edx_proctoring.backends.software_secure.locate_attempt_by_attempt_code') as mock_locate:
+            report = self._post([self._get_payload()])
+        self.assertEqual(report[0]['status'], 'stored')
+        self.assertFalse(mock_locate.called)
+
+    def test_not_a_list(self, provider, callbacks_provider):  # pylint: disable=unused-argument
+        """
+        The bulk callback takes a list
+        """
+        response = Client().post(
+            reverse('edx_proctoring.anonymous.proctoring_bulk_review_callback'),
+            data=json.dumps(self._get_payload()),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @patch.dict('django.conf.settings.PROCTORING_SETTINGS', {'BULK_REVIEW_CALLBACK_WORKERS': 4})
+    @patch('edx_proctoring.callbacks.ThreadPool')
+    def test_workers(self, mock_pool, provider, callbacks_provider):  # pylint: disable=unused-argument
+        """
+        The reviews are grouped by course, and the groups can be processed in parallel
+        """
+        exam_id = create_exam(
+            course_id='foo/bar/qux',
+            content_id='content',
+            exam_name='Other Exam',
+            time_limit_mins=10,
+            is_proctored=True
+        )
+        ProctoredExamStudentAttempt.create_exam_attempt(exam_id, self.user.id, '', 10, 'GHIJKL', True, False, 'OTHER')
+        other = self._get_payload()
+        other['examMetaData']['examCode'] = 'GHIJKL'
+        other['examMetaData']['ssiRecordLocator'] = 'OTHER'
+
+        # the threads would not see the test database
+        mock_pool.return_value.map.side_effect = lambda func, groups: [_process_review_group(group) for group in groups]
+        report = self._post([self._get_payload(), other])
+
+        self.assertEqual([item['status'] for item in report], ['stored', 'stored'])
+        mock_pool.assert_called_once_with(2)
+        self.assertIs(mock_pool.return_value.map.call_args[0][0], _process_review_group_in_thread)
+
+    def test_thread_flushes_history(self, provider, callbacks_provider):  # pylint: disable=unused-argument
+        """
+        The pool threads write the archive rows they staged before closing their connections
+        """
+        calls = Mock()
+        with patch('edx_proctoring.callbacks.history.flush', calls.flush):
+            with patch('edx_proctoring.callbacks.connection', calls.connection):
+                _process_review_group_in_thread((self.provider, []))
+        self.assertEqual([name for name, __, __ in calls.mock_calls], ['flush', 'connection.close'])
+
+
+@patch('edx_proctoring.api.get_provider_name_by_course_id', return_value='TEST')
+class SoftwareSecureReviewTransactionTests(ReviewCallbackMixin, TransactionTestCase):
+    """
+    Tests for the transaction around storing a review, which the TestCase turns off
+    """
+
+    def setUp(self):
+        """
+        Initialize
+        """
+        super(SoftwareSecureReviewTransactionTests, self).setUp()
+        self._create_attempt()
+
+    def test_review_atomic(self, provider):  # pylint: disable=unused-argument
+        """
+        A review whose comments can't be stored is not stored either
+        """
+        with patch.object(ProctoredExamSoftwareSecureComment.objects, 'bulk_create', side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                self.provider.on_review_callback(self._get_payload())
+
+        self.assertIsNone(ProctoredExamSoftwareSecureReview.get_review_by_attempt_code('ABCDEF'))
+        self.assertEqual(ProctoredExamSoftwareSecureReviewHistory.objects.count(), 0)
+
+        self.provider.on_review_callback(self._get_payload())
+        self.assertEqual(len(self._get_comments()), 6)
+
+    def test_committed_inside_lock(self, provider):  # pylint: disable=unused-argument
+        """
+        Every review of a group is committed on its own, before its lock is released
+        """
+        group = (self.provider, [
+            (0, self._get_payload(), self.attempt, False),
+            (1, self._get_payload(review_status='Bogus'), self.attempt, False),
+        ])
+        lock_key = 'edx_proctoring.review_callback_lock.{attempt_code}'.format(attempt_code=self.attempt.attempt_code)
+        locked_commits = []
+        original_commit = transaction.commit
+
+        def commit(*args, **kwargs):
+            """
+            Notes whether the lock is held while committing
+            """
+            locked_commits.append(cache.get(lock_key) is not None)
+            return original_commit(*args, **kwargs)
+
+        with patch('django.db.transaction.commit', side_effect=commit):
+            reports = _process_review_group(group)
+
+        self.assertEqual([report['status'] for __, report in reports], ['stored', 'failed'])
+        self.assertEqual(locked_commits, [True])
+        self.assertEqual(len(self._get_comments()), 6)
@@ -0,0 +1,332 @@
+# coding=utf-8
+"""
+Micro benchmarks for the hot paths of the proctoring subsystem. These can be run
+with the 'proctoring_benchmark' management command, e.g.
+
+    ./manage.py proctoring_benchmark --scenario=student_view --iterations=1000
+"""
+
+import binascii
+import hmac
+import time
+import uuid
+from hashlib import sha256
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.template import Context, loader
+from django.core.urlresolvers import reverse, NoReverseMatch
+
+from edx_proctoring import rendering
+from edx_proctoring.backends.software_secure import SoftwareSecureBackendProvider
+from edx_proctoring.models import ProctoredExam, ProctoredExamStudentAllowance
+
+
+# registry of scenario name -> function(iterations) which
+# returns a list of (label, seconds) tuples
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Decorator to register a benchmark scenario under the given name
+    """
+
+    def _register(func):
+        """
+        Adds the function to the registry
+        """
+        BENCHMARKS[name] = func
+        return func
+
+    return _register
+
+
+def time_it(func, iterations):
+    """
+    Calls func the given number of times and returns the elapsed wall clock time
+    """
+
+    start = time.time()
+    for __ in xrange(iterations):
+        func()
+    return time.time() - start
+
+
+def run_benchmark(name, iterations):
+    """
+    Runs the named scenario and returns a list of (label, seconds) tuples.
+    Raises KeyError if there is no such scenario
+    """
+
+    return BENCHMARKS[name](iterations)
+
+
+# a representative context, as built up by get_student_view
+STUDENT_VIEW_CONTEXT = {
+    'display_name': 'Midterm Exam',
+    'default_time_limit_mins': 90,
+    'exam_id': 1,
+    'total_time': '1 hour and 30 minutes',
+    'is_sample_attempt': False,
+    'does_time_remain': True,
+    'link_urls': {},
+}
+
+
+@benchmark('student_view')
+def student_view_benchmark(iterations):
+    """
+    Compares loading the student view template and reversing its urls on
+    every call, versus going through the rendering caches
+    """
+
+    template_name = 'proctoring/seq_proctored_exam_instructions.html'
+    course_id = 'edX/DemoX/Demo_Course'
+    attempt_id = 1
+
+    def _uncached():
+        """
+        What get_student_view used to do on every page view
+        """
+        template = loader.get_template(template_name)
+        try:
+            progress_page_url = reverse('courseware.views.progress', args=[course_id])
+        except NoReverseMatch:
+            progress_page_url = ''
+        context = Context(STUDENT_VIEW_CONTEXT)
+        context.update({
+            'platform_name': settings.PLATFORM_NAME,
+            'progress_page_url': progress_page_url,
+            'enter_exam_endpoint': reverse('edx_proctoring.proctored_exam.attempt.collection'),
+            'exam_started_poll_url': reverse('edx_proctoring.proctored_exam.attempt', args=[attempt_id]),
+            'change_state_url': reverse('edx_proctoring.proctored_exam.attempt', args=[attempt_id]),
+        })
+        return template.render(context)
+
+    def _cached():
+        """
+        What get_student_view does now
+        """
+        template = rendering.get_template(template_name)
+        attempt_url = rendering.memoized_reverse('edx_proctoring.proctored_exam.attempt', args=[attempt_id])
+        context = Context(STUDENT_VIEW_CONTEXT)
+        context.update({
+            'platform_name': settings.PLATFORM_NAME,
+            'progress_page_url': rendering.memoized_reverse(
+                'courseware.views.progress',
+                args=[course_id],
+                fail_silently=True
+            ),
+            'enter_exam_endpoint': rendering.memoized_reverse('edx_proctoring.proctored_exam.attempt.collection'),
+            'exam_started_poll_url': attempt_url,
+            'change_state_url': attempt_url,
+        })
+        return template.render(context)
+
+    rendering.clear_caches()
+    rendering.precompile_templates()
+
+    return [
+        ('uncached', time_it(_uncached, iterations)),
+        ('cached', time_it(_cached, iterations)),
+    ]
+
+
+@benchmark('allowance_archive')
+def allowance_archive_benchmark(iterations):
+    """
+    Compares updating allowances (and archiving their previous values) one row
+    at a time, versus a single queryset update. Here the iterations are the number
+    of allowance rows, e.g. --iterations=10000. The rows are written to the database
+    and deleted again afterwards
+    """
+
+    keys_per_user = 10
+    tag = uuid.uuid4().hex[:8]
+
+    exam = ProctoredExam.objects.create(
+        course_id='benchmark/{tag}/course'.format(tag=tag),
+        content_id='benchmark',
+        external_id='benchmark',
+        exam_name='Benchmark Exam',
+        time_limit_mins=90
+    )
+    User.objects.bulk_create([
+        User(username='bm_{tag}_{index}'.format(tag=tag, index=index))
+        for index in xrange((iterations + keys_per_user - 1) // keys_per_user)
+    ])
+    users = User.objects.filter(username__startswith='bm_{tag}_'.format(tag=tag))
+    try:
+        ProctoredExamStudentAllowance.objects.bulk_create([
+            ProctoredExamStudentAllowance(
+                proctored_exam=exam,
+                user=user,
+                key='key_{index}'.format(index=index),
+                value='0'
+            )
+            for user in users
+            for index in xrange(keys_per_user)
+        ][:iterations])
+        allowances = list(ProctoredExamStudentAllowance.objects.filter(proctored_exam=exam))
+
+        def _per_row():
+            """
+            What updating every allowance through save() costs
+            """
+            for allowance in allowances:
+                allowance.value = '1'
+                allowance.save()
+
+        def _bulk():
+            """
+            A single update of all of the rows
+            """
+            ProctoredExamStudentAllowance.objects.filter(proctored_exam=exam).update(value='2')
+
+        return [
+            ('per_row', time_it(_per_row, 1)),
+            ('bulk', time_it(_bulk, 1)),
+        ]
+    finally:
+        # the allowances and their history go along with the exam
+        exam.delete()
+        users.delete()
+
+
+def legacy_body_string(body_json, prefix=""):
+    """
+    How SoftwareSecureBackendProvider._body_string used to build the canonical string
+    of the payload, by concatenating as it recursed. The current one must give the
+    very same string
+    """
+    keys = body_json.keys()
+    keys.sort()
+    string = ""
+    for key in keys:
+        value = body_json[key]
+        if isinstance(value, bool):
+            if value:
+                value = 'true'
+            else:
+                value = 'false'
+        if isinstance(value, (list, tuple)):
+            for idx, arr in enumerate(value):
+                if isinstance(arr, dict):
+                    string += legacy_body_string(arr, key + '.' + str(idx) + '.')
+                else:
+                    string += key + '.' + str(idx) + ':' + arr + '\n'
+        elif isinstance(value, dict):
+            string += legacy_body_string(value, key + '.')
+        else:
+            if value != "" and not value:
+                value = "null"
+            string += str(prefix) + str(key) + ":" + unicode(value).encode('utf-8') + '\n'
+
+    return string
+
+
+def legacy_sign_doc(provider, body_json, method, headers, date):
+    """
+    How SoftwareSecureBackendProvider._sign_doc used to sign the payload
+    """
+    body_str = legacy_body_string(body_json)
+    message = str(method + '\n\n' + provider._header_string(headers, date) + body_str)  # pylint: disable=protected-access
+    hashed = hmac.new(str(provider.secret_key), str(message), sha256)
+    computed = binascii.b2a_base64(hashed.digest()).rstrip('\n')
+    return 'SSI ' + provider.secret_key_id + ':' + computed
+
+
+def _get_software_secure_provider():
+    """
+    A SoftwareSecure provider which is never going to send anything
+    """
+    return SoftwareSecureBackendProvider(
+        organization='edx',
+        exam_sponsor='edX LMS',
+        exam_register_endpoint='http://localhost',
+        secret_key_id='benchmark',
+        secret_key='4B230FA45A6EC5AE8FDE2AFFACFABAA16D8A3D0B',
+        crypto_key='123456789123456712345678',
+        software_download_url='http://localhost'
+    )
+
+
+@benchmark('sign_payload')
+def sign_payload_benchmark(iterations):
+    """
+    Compares signing a large SoftwareSecure payload the way it used to be done,
+    versus the current canonical string and prepared HMAC key
+    """
+
+    provider = _get_software_secure_provider()
+    payload = {
+        'examCode': unicode(uuid.uuid4()).upper(),
+        'organization': 'edx',
+        'duration': 90,
+        'reviewedExam': True,
+        'reviewerNotes': u'Closed book; no calculators. ' * 20,
+        'examName': u'Midterm Exam',
+        'orgExtra': {
+            'examStartDate': 'Mon, 01 Jan 2024 10:00:00 GMT',
+            'examEndDate': 'Mon, 01 Jan 2024 11:30:00 GMT',
+            'noOfStudents': 1,
+            'courseID': 'edX/DemoX/Demo_Course',
+            'firstName': u'Jöhn',
+            'lastName': u'Døe',
+        },
+        'students': [
+            {'studentId': index, 'name': u'student {index}'.format(index=index), 'active': index % 2 == 0}
+            for index in xrange(200)
+        ],
+    }
+    headers = {'Content-Type': 'application/json'}
+    date = 'Mon, 01 Jan 2024 10:00:00 GMT'
+
+    return [
+        ('legacy', time_it(lambda: legacy_sign_doc(provider, payload, 'POST', headers, date), iterations)),
+        ('current', time_it(lambda: provider._sign_doc(payload, 'POST', headers, date), iterations)),  # pylint: disable=protected-access
+    ]
+
+
+@benchmark('registration_payload')
+def registration_payload_benchmark(iterations):
+    """
+    Compares building the SoftwareSecure registration payloads of many attempts
+    of the same exam from scratch, versus from the exam's payload template
+    and with the cipher which is set up once
+    """
+
+    provider = _get_software_secure_provider()
+    exam = {
+        'id': 1,
+        'exam_name': u'Midterm Exam',
+        'course_id': 'edX/DemoX/Demo_Course',
+    }
+    context = {
+        'attempt_code': unicode(uuid.uuid4()).upper(),
+        'time_limit_mins': 90,
+        'is_sample_attempt': False,
+        'callback_url': 'http://localhost/courses/edX/DemoX/Demo_Course/jump_to_id/midterm',
+        'full_name': u'Jöhn Døe',
+        'review_policy': u'Closed book; no calculators.',
+    }
+
+    def _uncached():
+        """
+        What every registration used to cost
+        """
+        provider._payload_templates = None  # pylint: disable=protected-access
+        provider._cipher = None  # pylint: disable=protected-access
+        return provider._get_payload(exam, context)  # pylint: disable=protected-access
+
+    def _cached():
+        """
+        What it costs now
+        """
+        return provider._get_payload(exam, context)  # pylint: disable=protected-access
+
+    return [
+        ('uncached', time_it(_uncached, iterations)),
+        ('cached', time_it(_cached, iterations)),
+    ]
@@ -3,13 +3,17 @@ Various callback paths that support callbacks from SoftwareSecure
 """
 
 import logging
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 from django.template import Context, loader
 from django.conf import settings
+from django.db import connection, transaction
 from django.http import HttpResponse
 import pytz
 from datetime import datetime
 
-from edx_proctoring.models import ProctoredExamStudentAttempt
+from edx_proctoring import history
+from edx_proctoring.models import ProctoredExamStudentAttempt, ProctoredExamSoftwareSecureReview
 from ipware.ip import get_ip
 from django.core.urlresolvers import reverse
 
@@ -20,17 +24,31 @@ from rest_framework.negotiation import BaseContentNegotiation
 from edx_proctoring.api import (
     get_exam_attempt_by_code,
     mark_exam_attempt_as_ready,
-    update_exam_attempt,
-    _get_exam_attempt)
+    mark_exam_attempts_as_ready,
+    update_exam_attempt)
 
 from edx_proctoring.exceptions import ProctoredBaseException
-from edx_proctoring.utils import locate_attempt_by_attempt_code
+from edx_proctoring.utils import (
+    get_payload_fingerprint,
+    locate_attempt_by_attempt_code,
+    locate_attempts_by_attempt_codes,
+)
 
 from edx_proctoring.backends import get_backend_provider, get_proctoring_settings, get_provider_name_by_course_id
 
 
 log = logging.getLogger(__name__)
 
+# the statuses of the reviews in the report of the bulk review callback
+REVIEW_STORED = 'stored'
+REVIEW_REDELIVERED = 'redelivered'
+REVIEW_INVALID = 'invalid'
+REVIEW_NOT_FOUND = 'not_found'
+REVIEW_FAILED = 'failed'
+
+# how many groups of reviews the bulk review callback processes at the same time
+DEFAULT_BULK_REVIEW_CALLBACK_WORKERS = 1
+
 
 def start_exam_callback(request, attempt_code):  # pylint: disable=unused-argument
     """
@@ -88,23 +106,16 @@ def bulk_start_exams_callback(request, attempt_codes):
     IMPORTANT: This is an unauthenticated endpoint, so be VERY CAREFUL about extending
     this endpoint
     """
-    code_list = attempt_codes.split(',')
-
-    attempts = ProctoredExamStudentAttempt.objects.filter(
-         attempt_code__in=code_list
-    )
-    if len(attempts):
+    attempts, skipped = mark_exam_attempts_as_ready(attempt_codes.split(','))
+    if not attempts:
         return HttpResponse(
             content='You have entered an exam codes that are not valid.',
             status=404
         )
 
-
-    for attempt_obj in attempts:
-        attempt = _get_exam_attempt(attempt_obj)
-        mark_exam_attempt_as_ready(attempt['proctored_exam']['id'], attempt['user']['id'])
-        provider_name = get_provider_name_by_course_id(attempt['proctored_exam']['course_id'])
-        proctoring_settings = get_proctoring_settings(provider_name)
+    # mark_exam_attempts_as_ready only returns the attempts of a single course
+    provider_name = get_provider_name_by_course_id(attempts[0].proctored_exam.course_id)
+    proctoring_settings = get_proctoring_settings(provider_name)
 
     template = loader.get_template(
         'proctoring/proctoring_launch_callback.html'
@@ -114,7 +125,8 @@ def bulk_start_exams_callback(request, attempt_codes):
             Context({
                 'exam_attempt_status_url': '',
                 'platform_name': settings.PLATFORM_NAME,
-                'link_urls': proctoring_settings.get('LINK_URLS', {})
+                'link_urls': proctoring_settings.get('LINK_URLS', {}),
+                'skipped_attempt_codes': skipped,
             })
         )
     )
@@ -166,6 +178,14 @@ class ExamReviewCallback(APIView):
                 },
                 status=400
             )
+
+        # a retry of a callback which we have already handled
+        if ProctoredExamSoftwareSecureReview.is_redelivery(attempt_code, get_payload_fingerprint(request.DATA)):
+            return Response(
+                data='OK',
+                status=200
+            )
+
         attempt_obj, is_archived_attempt = locate_attempt_by_attempt_code(attempt_code)
         course_id = attempt_obj.proctored_exam.course_id
         provider_name = get_provider_name_by_course_id(course_id)
@@ -189,10 +209,66 @@ class ExamReviewCallback(APIView):
         )
 
 
+def _review_report(attempt_code, status, reason=None):
+    """
+    Returns the entry of a review in the report of the bulk review callback
+    """
+    report = {'examCode': attempt_code, 'status': status}
+    if reason:
+        report['reason'] = reason
+    return report
+
+
+def _process_review_group(group):
+    """
+    Hands a group of reviews, which all go to the same provider, to the provider.
+    Every review is committed on its own, while the provider holds its lock.
+    Returns a list of (index, report) of the reviews
+    """
+
+    provider, reviews = group
+    reports = []
+    for index, review, attempt_obj, is_archived_attempt in reviews:
+        try:
+            provider.on_located_review_callback(review, attempt_obj, is_archived_attempt)
+        except ProctoredBaseException, ex:
+            log.exception(ex)
+            reports.append((index, _review_report(attempt_obj.attempt_code, REVIEW_FAILED, unicode(ex))))
+        except Exception:  # pylint: disable=broad-except
+            log_msg = 'Could not process the review of attempt_code {attempt_code}'.format(
+                attempt_code=attempt_obj.attempt_code
+            )
+            log.exception(log_msg)
+            reports.append((index, _review_report(attempt_obj.attempt_code, REVIEW_FAILED)))
+        else:
+            reports.append((index, _review_report(attempt_obj.attempt_code, REVIEW_STORED)))
+    return reports
+
+
+def _process_review_group_in_thread(group):
+    """
+    Runs in the thread pool of the bulk review callback, which has connections of its own.
+    The archive rows the thread has staged are written before its connection goes away
+    """
+    try:
+        return _process_review_group(group)
+    finally:
+        try:
+            history.flush()
+        finally:
+            connection.close()
+
+
 class BulkExamReviewCallback(APIView):
     """
     This endpoint is called by a 3rd party proctoring review service when
-    there are results available for us to record
+    there are results available for us to record, with a list of reviews.
+
+    The attempts of all of the reviews are looked up at once, and the reviews
+    are handed to the providers grouped by course, each review is committed on its own.
+    With the BULK_REVIEW_CALLBACK_WORKERS setting the groups are processed by
+    that many threads. The response holds a report with the examCode, the
+    status and possibly the reason of every review, in the order they were posted
 
     IMPORTANT: This is an unauthenticated endpoint, so be VERY CAREFUL about extending
     this endpoint
@@ -205,26 +281,78 @@ class BulkExamReviewCallback(APIView):
         Post callback handler
         """
         data = request.DATA
-        course_id = ""
-        for review in data:
+        if not isinstance(data, list):
+            return Response(
+                data={
+                    'reason': 'Expected a list of reviews'
+                },
+                status=400
+            )
+
+        report = [None] * len(data)
+        reviews = []
+        for index, review in enumerate(data):
             try:
                 attempt_code = review['examMetaData']['examCode']
-            except KeyError, ex:
+            except (KeyError, TypeError):
+                attempt_code = None
+            if not isinstance(attempt_code, basestring):
+                report[index] = _review_report(None, REVIEW_INVALID, 'Missing examMetaData.examCode')
                 continue
-            attempt_obj, is_archived_attempt = locate_attempt_by_attempt_code(attempt_code)
-            if course_id != attempt_obj.proctored_exam.course_id:
-                course_id = attempt_obj.proctored_exam.course_id
-                provider_name = get_provider_name_by_course_id(course_id)
-                provider = get_backend_provider(provider_name)
+            reviews.append((index, attempt_code, review))
 
-            # call down into the underlying provider code
+        payload_fingerprints = ProctoredExamSoftwareSecureReview.get_payload_fingerprints(
+            set(attempt_code for __, attempt_code, __ in reviews)
+        )
+        new_reviews = []
+        for index, attempt_code, review in reviews:
+            if payload_fingerprints.get(attempt_code) == get_payload_fingerprint(review):
+                # a retry of a callback which we have already handled
+                report[index] = _review_report(attempt_code, REVIEW_REDELIVERED)
+            else:
+                new_reviews.append((index, attempt_code, review))
+
+        located = locate_attempts_by_attempt_codes(
+            set(attempt_code for __, attempt_code, __ in new_reviews)
+        ) if new_reviews else {}
+
+        # course_id -> the reviews of its attempts
+        by_course_id = OrderedDict()
+        for index, attempt_code, review in new_reviews:
+            if attempt_code not in located:
+                report[index] = _review_report(attempt_code, REVIEW_NOT_FOUND)
+                continue
+
+            attempt_obj, is_archived_attempt = located[attempt_code]
+            by_course_id.setdefault(attempt_obj.proctored_exam.course_id, []).append(
+                (index, review, attempt_obj, is_archived_attempt)
+            )
+
+        providers = {}
+        groups = []
+        for course_id, course_reviews in by_course_id.iteritems():
+            provider_name = get_provider_name_by_course_id(course_id)
+            if provider_name not in providers:
+                providers[provider_name] = get_backend_provider(provider_name)
+            groups.append((providers[provider_name], course_reviews))
+
+        workers = settings.PROCTORING_SETTINGS.get('BULK_REVIEW_CALLBACK_WORKERS', DEFAULT_BULK_REVIEW_CALLBACK_WORKERS)
+        if workers > 1 and len(groups) > 1:
+            pool = ThreadPool(min(workers, len(groups)))
             try:
-                provider.on_review_callback(review)
-            except ProctoredBaseException, ex:
-                log.exception(ex)
+                group_reports = pool.map(_process_review_group_in_thread, groups)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            group_reports = [_process_review_group(group) for group in groups]
+
+        for reports in group_reports:
+            for index, review_report in reports:
+                report[index] = review_report
 
         return Response(
-            data='OK',
+            data=report,
             status=200
         )
 
@@ -0,0 +1,193 @@
+"""
+A circuit breaker for the calls to the backend providers. When a provider is
+degraded, every call to it would wait for the full timeouts, which ties up the
+threads of the app servers right when an exam starts.
+
+After failure_threshold consecutive failures the breaker opens, and the calls
+fail fast for recovery_timeout seconds. It then is half open: a single probe
+call is let through, which closes the breaker again if it succeeds, and opens
+it for another recovery_timeout if it fails.
+
+The state lives in the Django cache, so all of the app servers share it.
+"""
+
+import hashlib
+import logging
+import time
+
+from django.core.cache import cache
+
+log = logging.getLogger(__name__)
+
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RECOVERY_TIMEOUT = 30
+
+# the counters of get_metrics(), they start over a day after they were first counted
+METRICS = ('successes', 'failures', 'rejections', 'trips')
+METRICS_TIMEOUT = 24 * 60 * 60
+
+# the state of a breaker is kept for as long as this, unless it changes
+STATE_TIMEOUT = 24 * 60 * 60
+
+
+class CircuitBreaker(object):
+    """
+    Guards the calls to one provider, e.g.
+
+        if not breaker.allow_request():
+            raise BackendProviderUnavailable(...)
+        try:
+            response = make_the_call()
+        except Exception:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+    """
+
+    def __init__(self, name, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 recovery_timeout=DEFAULT_RECOVERY_TIMEOUT):
+        """
+        Class initializer, the breakers with the same name share their state
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        # the name can be any string, e.g. an URL, which memcached doesn't take in keys
+        self._key_prefix = 'edx_proctoring.circuit_breaker.{digest}.'.format(
+            digest=hashlib.md5(name.encode('utf-8')).hexdigest()
+        )
+
+    def _key(self, suffix):
+        """
+        Returns the cache key of the given part of the state
+        """
+        return self._key_prefix + suffix
+
+    def _incr(self, suffix, timeout):
+        """
+        Increments a counter in the cache, returns its new value
+        """
+        key = self._key(suffix)
+        # incr() needs the key to exist, add() leaves it alone if it does
+        cache.add(key, 0, timeout)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # it expired in between
+            cache.set(key, 1, timeout)
+            return 1
+
+    def _get_state(self, opened_at):
+        """
+        Returns the state of the breaker, given the time it was opened at
+        """
+        if opened_at is None:
+            return CIRCUIT_CLOSED
+        if time.time() - opened_at < self.recovery_timeout:
+            return CIRCUIT_OPEN
+        return CIRCUIT_HALF_OPEN
+
+    @property
+    def state(self):
+        """
+        One of CIRCUIT_CLOSED, CIRCUIT_OPEN and CIRCUIT_HALF_OPEN
+        """
+        return self._get_state(cache.get(self._key('opened_at')))
+
+    def allow_request(self):
+        """
+        Returns whether the call may go ahead. In the half open state only
+        one of the callers gets to probe the provider
+        """
+
+        state = self.state
+        if state == CIRCUIT_CLOSED:
+            return True
+
+        # the probe is given up on after recovery_timeout, in case it never reports back
+        if state == CIRCUIT_HALF_OPEN and cache.add(self._key('probe'), True, self.recovery_timeout):
+            log_msg = 'Circuit breaker {name} is half open, probing'.format(name=self.name)
+            log.info(log_msg)
+            return True
+
+        self._incr('rejections', METRICS_TIMEOUT)
+        return False
+
+    def record_success(self):
+        """
+        Records a call which went through, this closes the breaker
+        """
+
+        self._incr('successes', METRICS_TIMEOUT)
+
+        state = cache.get_many([self._key('opened_at'), self._key('consecutive_failures')])
+        if not state:
+            return
+
+        cache.delete_many([self._key('opened_at'), self._key('consecutive_failures'), self._key('probe')])
+        if self._key('opened_at') in state:
+            log_msg = 'Circuit breaker {name} is closed again'.format(name=self.name)
+            log.info(log_msg)
+
+    def record_failure(self):
+        """
+        Records a call which failed, enough of them in a row open the breaker
+        """
+
+        self._incr('failures', METRICS_TIMEOUT)
+
+        if self.state == CIRCUIT_HALF_OPEN:
+            # the probe failed
+            self._open()
+            return
+
+        failures = self._incr('consecutive_failures', STATE_TIMEOUT)
+        if failures >= self.failure_threshold and self.state == CIRCUIT_CLOSED:
+            self._open()
+
+    def _open(self):
+        """
+        Makes the calls fail fast for the next recovery_timeout seconds
+        """
+
+        cache.set(self._key('opened_at'), time.time(), STATE_TIMEOUT)
+        cache.delete(self._key('probe'))
+        self._incr('trips', METRICS_TIMEOUT)
+
+        log_msg = (
+            'Circuit breaker {name} is open, calls will fail fast for {recovery_timeout} seconds'.format(
+                name=self.name,
+                recovery_timeout=self.recovery_timeout
+            )
+        )
+        log.warning(log_msg)
+
+    def reset(self):
+        """
+        Closes the breaker and clears its counters
+        """
+        cache.delete_many(
+            [self._key(suffix) for suffix in ('opened_at', 'consecutive_failures', 'probe') + METRICS]
+        )
+
+    def get_metrics(self):
+        """
+        Returns a dict with the state of the breaker, the number of consecutive
+        failures and the counters of the calls
+        """
+
+        keys = [self._key(suffix) for suffix in ('opened_at', 'consecutive_failures') + METRICS]
+        values = cache.get_many(keys)
+
+        metrics = dict(
+            (suffix, values.get(self._key(suffix), 0))
+            for suffix in ('consecutive_failures',) + METRICS
+        )
+        metrics['name'] = self.name
+        metrics['state'] = self._get_state(values.get(self._key('opened_at')))
+        metrics['opened_at'] = values.get(self._key('opened_at'))
+        return metrics
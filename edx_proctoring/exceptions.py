@@ -51,6 +51,13 @@ class BackendProvideCannotRegisterAttempt(ProctoredBaseException):
     """
 
 
+class BackendProviderUnavailable(BackendProvideCannotRegisterAttempt):
+    """
+    Raised instead of calling a back-end provider which is known to be degraded,
+    i.e. while its circuit breaker is open
+    """
+
+
 class ProctoredExamPermissionDenied(ProctoredBaseException):
     """
     Raised when the calling user does not have access to the requested object.
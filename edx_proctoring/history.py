@@ -0,0 +1,262 @@
+"""
+Writes the archive copies of deleted or updated rows into the history tables.
+
+By default every archive row is saved as soon as it is made, inside of the
+request which made the change. With
+
+    PROCTORING_SETTINGS['HISTORY_WRITE_MODE'] = 'buffered'
+
+the rows are staged in a buffer of the thread instead, and written with
+bulk_create when a request has finished (after its transaction has been
+committed), when a request fails, and when the process exits. A full batch of
+HISTORY_BATCH_SIZE rows is written right away, unless the thread is inside of a
+managed transaction, which could still roll back. Work which runs outside of a
+request, like management command loops and pool threads, calls flush() when it
+is done. Rows which could not be written stay in the buffer.
+
+With PROCTORING_SETTINGS['HISTORY_FORMAT'] = 'delta' the archive rows of models
+which have a history_key are stored delta encoded instead, see
+ProctoredExamHistoryDelta.
+"""
+
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.signals import request_finished, got_request_exception
+from django.db import IntegrityError, transaction
+
+log = logging.getLogger(__name__)
+
+# every row is saved right away, this is the default and what the tests run with
+HISTORY_WRITE_MODE_SYNC = 'sync'
+
+# rows are staged in memory and written in batches
+HISTORY_WRITE_MODE_BUFFERED = 'buffered'
+
+DEFAULT_HISTORY_BATCH_SIZE = 100
+
+# every archive row is a full copy in the history table of its model, the default
+HISTORY_FORMAT_FULL = 'full'
+
+# the archive rows are stored as snapshots and field level diffs
+HISTORY_FORMAT_DELTA = 'delta'
+
+# how often to try and write delta encoded rows, see _write()
+DELTA_WRITE_ATTEMPTS = 3
+
+# the staged rows, of every thread
+_LOCAL = threading.local()
+
+
+def _get_write_mode():
+    """
+    Returns the configured HISTORY_WRITE_MODE
+    """
+    return settings.PROCTORING_SETTINGS.get('HISTORY_WRITE_MODE', HISTORY_WRITE_MODE_SYNC)
+
+
+def _get_batch_size():
+    """
+    Returns the configured HISTORY_BATCH_SIZE
+    """
+    return settings.PROCTORING_SETTINGS.get('HISTORY_BATCH_SIZE', DEFAULT_HISTORY_BATCH_SIZE)
+
+
+def _get_history_format():
+    """
+    Returns the configured HISTORY_FORMAT
+    """
+    return settings.PROCTORING_SETTINGS.get('HISTORY_FORMAT', HISTORY_FORMAT_FULL)
+
+
+def archive(history_object):
+    """
+    Writes the (unsaved) history model instance, either right away or
+    as part of the next batch, depending on the HISTORY_WRITE_MODE
+    """
+    archive_many([history_object])
+
+
+def archive_many(history_objects):
+    """
+    Like archive(), for many history model instances at once, which are
+    written with one bulk insert per history table and batch
+    """
+
+    if not history_objects:
+        return
+
+    if _get_write_mode() != HISTORY_WRITE_MODE_BUFFERED:
+        _write(list(history_objects))
+        return
+
+    pending = _get_pending()
+    pending.extend(history_objects)
+    if len(pending) >= _get_batch_size() and not transaction.is_managed():
+        flush()
+
+
+def _get_pending():
+    """
+    Returns the buffer of the current thread
+    """
+    if not hasattr(_LOCAL, 'pending'):
+        _LOCAL.pending = []
+    return _LOCAL.pending
+
+
+def _take_pending():
+    """
+    Empties the buffer of the current thread, returns the rows which were in it
+    """
+    pending = _get_pending()
+    taken = pending[:]
+    del pending[:]
+    return taken
+
+
+def flush():
+    """
+    Writes all of the archive rows which the current thread has staged, with
+    one bulk insert per history table and batch. Returns the number of rows
+    written. If that fails, nothing is written and the rows stay staged
+    """
+
+    pending = _take_pending()
+    if not pending:
+        return 0
+
+    try:
+        _write_all_or_nothing(pending)
+    except Exception:
+        # put them back in front of whatever got staged in the meantime
+        _get_pending()[0:0] = pending
+        raise
+    return len(pending)
+
+
+def _write_all_or_nothing(history_objects):
+    """
+    Writes the archive rows in a transaction of their own, or under a
+    savepoint of the managed transaction we are in
+    """
+
+    if not transaction.is_managed():
+        with transaction.commit_on_success():
+            _write(history_objects)
+        return
+
+    savepoint_id = transaction.savepoint()
+    try:
+        _write(history_objects)
+    except Exception:
+        transaction.savepoint_rollback(savepoint_id)
+        raise
+    transaction.savepoint_commit(savepoint_id)
+
+
+def _write(history_objects):
+    """
+    Writes the archive rows with one bulk insert per table and batch
+    """
+
+    if _get_history_format() != HISTORY_FORMAT_DELTA:
+        _insert(history_objects)
+        return
+
+    # the models module uses this one, so import it lazily
+    from edx_proctoring.models import ProctoredExamHistoryDelta
+
+    _insert([
+        history_object for history_object in history_objects
+        if ProctoredExamHistoryDelta.get_original_key(history_object) is None
+    ])
+    keyed = [
+        history_object for history_object in history_objects
+        if ProctoredExamHistoryDelta.get_original_key(history_object) is not None
+    ]
+
+    # the versions are numbered after the most recent one which has been written, if
+    # somebody else writes a version of the same row in between, then ours clash
+    # with theirs, so start over from the versions as they are now
+    for attempt in range(1, DELTA_WRITE_ATTEMPTS + 1):
+        # outside of a managed transaction every insert is committed on its own,
+        # and there is nothing but the failed insert to roll back
+        savepoint_id = transaction.savepoint() if transaction.is_managed() else None
+        try:
+            _insert(ProctoredExamHistoryDelta.encode(keyed))
+        except IntegrityError:
+            if savepoint_id:
+                transaction.savepoint_rollback(savepoint_id)
+            else:
+                transaction.rollback_unless_managed()
+            if attempt == DELTA_WRITE_ATTEMPTS:
+                raise
+            log_msg = 'History versions were written concurrently, encoding them again'
+            log.info(log_msg)
+        else:
+            if savepoint_id:
+                transaction.savepoint_commit(savepoint_id)
+            return
+
+
+def _insert(history_objects):
+    """
+    Saves the model instances, with one bulk insert per table and batch
+    """
+
+    if not history_objects:
+        return
+
+    if len(history_objects) == 1:
+        history_objects[0].save()
+        return
+
+    by_model = OrderedDict()
+    for history_object in history_objects:
+        by_model.setdefault(history_object.__class__, []).append(history_object)
+
+    batch_size = _get_batch_size()
+    for model, model_objects in by_model.iteritems():
+        for index in xrange(0, len(model_objects), batch_size):
+            model.objects.bulk_create(model_objects[index:index + batch_size])
+
+
+def on_request_finished(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Writes whatever the request has staged, its transaction has been committed by now
+    """
+    try:
+        flush()
+    except Exception:  # pylint: disable=broad-except
+        log.exception('Could not write the pending history rows of the request')
+
+
+def on_request_exception(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Writes what the failed request has staged, along with its changes. If these
+    are rolled back, the rows are as well. This runs inside of the error handling
+    of Django, so it must not raise
+    """
+    try:
+        flush()
+    except Exception:  # pylint: disable=broad-except
+        log.exception('Could not write the pending history rows of the failed request')
+
+
+def on_exit():
+    """
+    Don't lose the staged rows of the main thread when the process shuts down
+    """
+    try:
+        flush()
+    except Exception:  # pylint: disable=broad-except
+        log.exception('Could not write the pending history rows on shutdown')
+
+
+request_finished.connect(on_request_finished, dispatch_uid='edx_proctoring.history.flush')
+got_request_exception.connect(on_request_exception, dispatch_uid='edx_proctoring.history.flush_on_exception')
+atexit.register(on_exit)
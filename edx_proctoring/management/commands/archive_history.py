@@ -0,0 +1,51 @@
+"""
+Django management command to move old rows out of the history tables
+"""
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Django Management command to move the history rows which are older than the
+    retention period into compressed archive files, see retention.py
+    """
+
+    option_list = BaseCommand.option_list + (
+        make_option('-d', '--days',
+                    metavar='DAYS',
+                    dest='retention_days',
+                    type='int',
+                    help='keep the rows of this many days, defaults to HISTORY_RETENTION_DAYS'),
+        make_option('-o', '--output-dir',
+                    metavar='DIR',
+                    dest='archive_dir',
+                    help='directory to write the archives to, defaults to HISTORY_ARCHIVE_DIR'),
+    )
+
+    def handle(self, *args, **options):
+        """
+        Management command entry point, simply call into the retention engine
+        """
+
+        from edx_proctoring.retention import archive_history, get_archive_dir
+
+        archive_dir = options['archive_dir'] or get_archive_dir()
+        if not archive_dir:
+            raise CommandError('Either --output-dir or the HISTORY_ARCHIVE_DIR setting is required')
+
+        print 'Running management command to archive the history tables into {archive_dir}'.format(
+            archive_dir=archive_dir
+        )
+
+        result = archive_history(
+            retention_days=options['retention_days'],
+            archive_dir=archive_dir
+        )
+
+        for table in sorted(result.keys()):
+            print '{table}: {moved}'.format(table=table, moved=result[table])
+
+        print 'Completed!'
@@ -0,0 +1,55 @@
+"""
+Django management command to show (or reset) the circuit breakers of the backend providers
+"""
+
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Django Management command to print the state and the counters of the circuit
+    breakers around the calls to the backend providers, for all of the configured
+    providers or just the given one. With --reset the breakers are closed again
+    """
+
+    option_list = BaseCommand.option_list + (
+        make_option('-p', '--provider',
+                    metavar='NAME',
+                    dest='provider',
+                    help='the name of the backend provider in PROCTORING_BACKEND_PROVIDERS'),
+        make_option('-r', '--reset',
+                    action='store_true',
+                    dest='reset',
+                    default=False,
+                    help='close the circuit breakers and clear their counters'),
+    )
+
+    def handle(self, *args, **options):
+        """
+        Management command entry point
+        """
+
+        from edx_proctoring.backends import get_backend_provider
+
+        print 'Running management command to show the circuit breakers of the backend providers'
+
+        provider_names = [options['provider']] if options['provider'] else sorted(settings.PROCTORING_BACKEND_PROVIDERS)
+        for provider_name in provider_names:
+            provider = get_backend_provider(provider_name)
+            if not hasattr(provider, 'get_circuit_breaker'):
+                print '{provider}: no circuit breaker'.format(provider=provider_name)
+                continue
+
+            circuit_breaker = provider.get_circuit_breaker()
+            if options['reset']:
+                circuit_breaker.reset()
+
+            metrics = circuit_breaker.get_metrics()
+            print '{provider}: {state}'.format(provider=provider_name, state=metrics['state'])
+            for metric in ('consecutive_failures', 'successes', 'failures', 'rejections', 'trips'):
+                print '    {metric}: {value}'.format(metric=metric, value=metrics[metric])
+
+        print 'Completed!'
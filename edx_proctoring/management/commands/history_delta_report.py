@@ -0,0 +1,56 @@
+"""
+Django management command to report how much space delta encoding the history would save
+"""
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Django Management command to compare the size of the full history rows with
+    their delta encoded size, see ProctoredExamHistoryDelta
+    """
+
+    option_list = BaseCommand.option_list + (
+        make_option('-i', '--interval',
+                    metavar='VERSIONS',
+                    dest='snapshot_interval',
+                    type='int',
+                    help='store a full snapshot every this many versions, defaults to HISTORY_SNAPSHOT_INTERVAL'),
+    )
+
+    def handle(self, *args, **options):
+        """
+        Management command entry point, works out the sizes of all of the history tables
+        """
+
+        from edx_proctoring.models import (
+            ProctoredExamHistoryDelta,
+            ProctoredExamReviewPolicyHistory,
+            ProctoredExamSoftwareSecureReviewHistory,
+            ProctoredExamStudentAllowanceHistory,
+        )
+
+        print 'Running management command to estimate the delta encoded size of the history tables'
+
+        for history_model in (
+                ProctoredExamStudentAllowanceHistory,
+                ProctoredExamReviewPolicyHistory,
+                ProctoredExamSoftwareSecureReviewHistory,
+        ):
+            result = ProctoredExamHistoryDelta.estimate_savings(
+                history_model,
+                snapshot_interval=options['snapshot_interval']
+            )
+            saved = result['full_bytes'] - result['delta_bytes']
+            print '{table}: {rows} rows, {full_bytes} bytes full, {delta_bytes} bytes delta encoded, ' \
+                  '{saved} bytes ({percent:.1f}%) saved'.format(
+                      table=history_model._meta.db_table,  # pylint: disable=protected-access
+                      saved=saved,
+                      percent=(saved * 100.0 / result['full_bytes']) if result['full_bytes'] else 0.0,
+                      **result
+                  )
+
+        print 'Completed!'
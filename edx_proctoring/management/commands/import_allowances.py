@@ -0,0 +1,61 @@
+"""
+Django management command to import allowances from a CSV file
+"""
+
+import csv
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Django Management command to add (or update) many allowances at once. The CSV file
+    must have a header row with the exam_id, user_info, key and value columns, e.g.
+
+        exam_id,user_info,key,value
+        533,student1,additional_time_granted,10
+        533,student2@example.com,additional_time_granted,30
+    """
+
+    option_list = BaseCommand.option_list + (
+        make_option('-f', '--file',
+                    metavar='FILE',
+                    dest='filename',
+                    help='CSV file with the allowances'),
+    )
+
+    def handle(self, *args, **options):
+        """
+        Management command entry point, simply call into the bulk allowance api
+        """
+
+        from edx_proctoring.api import add_allowances_for_users
+
+        filename = options['filename']
+        if not filename:
+            raise CommandError('--file is required')
+
+        with open(filename, 'rb') as allowances_file:
+            reader = csv.DictReader(allowances_file)
+            missing = set(('exam_id', 'user_info', 'key', 'value')) - set(reader.fieldnames or [])
+            if missing:
+                raise CommandError(
+                    'The CSV file is missing the {columns} columns'.format(columns=', '.join(sorted(missing)))
+                )
+            allowances = [
+                dict((field, (value or '').decode('utf-8')) for field, value in row.iteritems() if field)
+                for row in reader
+            ]
+
+        print 'Running management command to import {count} allowances'.format(count=len(allowances))
+
+        result = add_allowances_for_users(allowances)
+
+        print 'added: {added}'.format(added=result['added'])
+        print 'updated: {updated}'.format(updated=result['updated'])
+        for error in result['errors']:
+            # +2 for the header and since lines are numbered from 1
+            print 'line {line}: {detail}'.format(line=error['index'] + 2, detail=error['detail'])
+
+        print 'Completed!'
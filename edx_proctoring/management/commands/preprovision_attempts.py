@@ -0,0 +1,85 @@
+"""
+Django management command to create and register the exam attempts of a roster ahead of the exam
+"""
+
+from optparse import make_option
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Django Management command to preprovision the proctored attempts of a scheduled
+    exam. The roster file has one username (or user id) per line, e.g.
+
+        student1
+        student2
+        42
+    """
+
+    option_list = BaseCommand.option_list + (
+        make_option('-e', '--exam',
+                    metavar='EXAM_ID',
+                    dest='exam_id',
+                    type='int',
+                    help='exam_id to preprovision the attempts of'),
+        make_option('-f', '--file',
+                    metavar='FILE',
+                    dest='filename',
+                    help='file with the roster'),
+        make_option('-w', '--workers',
+                    metavar='WORKERS',
+                    dest='workers',
+                    type='int',
+                    help='how many attempts to register at once, defaults to PREPROVISION_WORKERS'),
+    )
+
+    def handle(self, *args, **options):
+        """
+        Management command entry point, simply call into the preprovisioning api
+        """
+
+        from edx_proctoring.api import preprovision_exam_attempts
+
+        exam_id = options['exam_id']
+        filename = options['filename']
+
+        if not exam_id or not filename:
+            raise CommandError('Both --exam and --file are required')
+
+        with open(filename) as roster_file:
+            roster = [line.strip().decode('utf-8') for line in roster_file if line.strip()]
+
+        usernames = [user_info for user_info in roster if not user_info.isdigit()]
+        user_ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+        unknown = [username for username in usernames if username not in user_ids]
+
+        msg = (
+            'Running management command to preprovision {count} attempts for exam_id {exam_id}'.format(
+                count=len(roster),
+                exam_id=exam_id
+            )
+        )
+        print msg
+
+        result = preprovision_exam_attempts(
+            exam_id,
+            [int(user_info) if user_info.isdigit() else user_ids[user_info]
+             for user_info in roster if user_info not in unknown],
+            workers=options['workers']
+        )
+
+        print 'registered: {count}'.format(count=len(result['registered']))
+        print 'skipped: {count}'.format(count=len(result['skipped']))
+        print 'failed: {count}'.format(count=len(result['failed']) + len(unknown))
+        for username in unknown:
+            print '    unknown user {username}'.format(username=username)
+        for user_id in result['failed']:
+            print '    user_id {user_id}'.format(user_id=user_id)
+        print 'elapsed: {elapsed:.2f} seconds ({per_second:.1f} registrations per second)'.format(
+            elapsed=result['elapsed'],
+            per_second=result['per_second']
+        )
+
+        print 'Completed!'
@@ -0,0 +1,54 @@
+"""
+Django management command to run the proctoring micro benchmarks
+"""
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from edx_proctoring.benchmarks import BENCHMARKS, run_benchmark
+
+
+class Command(BaseCommand):
+    """
+    Django Management command to time the hot paths of the proctoring subsystem
+    """
+
+    option_list = BaseCommand.option_list + (
+        make_option('-s', '--scenario',
+                    metavar='SCENARIO',
+                    dest='scenario',
+                    help='name of the benchmark to run, runs all of them if not given'),
+        make_option('-n', '--iterations',
+                    metavar='ITERATIONS',
+                    dest='iterations',
+                    type='int',
+                    default=1000,
+                    help='number of times to run each case'),
+    )
+
+    def handle(self, *args, **options):
+        """
+        Management command entry point, runs the benchmarks and prints the timings
+        """
+
+        scenario = options['scenario']
+        iterations = options['iterations']
+
+        if scenario and scenario not in BENCHMARKS:
+            raise CommandError(
+                '{scenario} is not a known benchmark, choose one of: {choices}'.format(
+                    scenario=scenario,
+                    choices=', '.join(sorted(BENCHMARKS.keys()))
+                )
+            )
+
+        scenarios = [scenario] if scenario else sorted(BENCHMARKS.keys())
+        for name in scenarios:
+            print '{name} ({iterations} iterations):'.format(name=name, iterations=iterations)
+            for label, elapsed in run_benchmark(name, iterations):
+                print '    {label}: {total:.3f}s total, {per_call:.3f}ms per call'.format(
+                    label=label,
+                    total=elapsed,
+                    per_call=(elapsed * 1000.0 / iterations) if iterations else 0.0
+                )
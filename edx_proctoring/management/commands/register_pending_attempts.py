@@ -0,0 +1,50 @@
+"""
+Django management command to register the pending exam attempts with the backend providers
+"""
+
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Django Management command to register the exam attempts which were created with
+    the DEFER_ATTEMPT_REGISTRATION setting with their backend provider. Run it once
+    (e.g. from cron) or keep it running as a worker with --loop
+    """
+
+    option_list = BaseCommand.option_list + (
+        make_option('-l', '--loop',
+                    metavar='SECONDS',
+                    dest='loop',
+                    type='float',
+                    help='keep on registering, waiting this many seconds in between runs'),
+    )
+
+    def handle(self, *args, **options):
+        """
+        Management command entry point, simply call into the api
+        """
+
+        from edx_proctoring import history
+        from edx_proctoring.api import register_pending_exam_attempts
+
+        print 'Running management command to register the pending exam attempts'
+
+        while True:
+            result = register_pending_exam_attempts()
+            # there is no end of a request to write the archived rows at
+            history.flush()
+
+            print 'registered: {count}'.format(count=len(result['registered']))
+            print 'failed: {count}'.format(count=len(result['failed']))
+            for attempt_id in result['failed']:
+                print '    attempt_id {attempt_id}'.format(attempt_id=attempt_id)
+
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
+
+        print 'Completed!'
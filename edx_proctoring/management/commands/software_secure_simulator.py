@@ -0,0 +1,117 @@
+"""
+Django management command to run a local stand-in for SoftwareSecure
+"""
+
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Django Management command to run the SoftwareSecure simulator, see simulator.py.
+    Point the exam_register_endpoint of the SoftwareSecure backend provider at
+    the endpoint it prints
+    """
+
+    option_list = BaseCommand.option_list + (
+        make_option('-p', '--port',
+                    metavar='PORT',
+                    dest='port',
+                    type='int',
+                    default=8088,
+                    help='port to listen on'),
+        make_option('-l', '--latency',
+                    metavar='SECONDS',
+                    dest='latency',
+                    type='float',
+                    default=0.0,
+                    help='how long every registration takes'),
+        make_option('-j', '--jitter',
+                    metavar='SECONDS',
+                    dest='latency_jitter',
+                    type='float',
+                    default=0.0,
+                    help='random extra time up to this, on top of the latency'),
+        make_option('-e', '--error-rate',
+                    metavar='RATE',
+                    dest='error_rate',
+                    type='float',
+                    default=0.0,
+                    help='fraction of the registrations to fail, e.g. 0.05'),
+        make_option('-s', '--error-status',
+                    metavar='STATUS,...',
+                    dest='error_statuses',
+                    default='503',
+                    help='HTTP status codes of the failed registrations'),
+        make_option('-r', '--review-url',
+                    metavar='URL',
+                    dest='review_url',
+                    help='review callback to post the reviews to'),
+        make_option('-b', '--bulk-review-url',
+                    metavar='URL',
+                    dest='bulk_review_url',
+                    help='bulk review callback to post the reviews to, in lists of --bulk-size'),
+        make_option('--bulk-size',
+                    metavar='SIZE',
+                    dest='bulk_size',
+                    type='int',
+                    default=50,
+                    help='number of reviews per bulk review callback'),
+        make_option('--review-status',
+                    metavar='STATUS',
+                    dest='review_status',
+                    default='Clean',
+                    help='status of the reviews, e.g. Suspicious'),
+        make_option('-i', '--interval',
+                    metavar='SECONDS',
+                    dest='interval',
+                    type='float',
+                    default=10.0,
+                    help='how often to post the reviews and print the counts'),
+        make_option('-d', '--duration',
+                    metavar='SECONDS',
+                    dest='duration',
+                    type='float',
+                    help='stop after this long, instead of running until interrupted'),
+    )
+
+    def handle(self, *args, **options):
+        """
+        Management command entry point, runs the simulator until it is stopped
+        """
+
+        from edx_proctoring.simulator import SoftwareSecureSimulator
+
+        simulator = SoftwareSecureSimulator(
+            host='localhost',
+            port=options['port'],
+            latency=options['latency'],
+            latency_jitter=options['latency_jitter'],
+            error_rate=options['error_rate'],
+            error_statuses=[int(status) for status in options['error_statuses'].split(',')],
+            review_url=options['review_url'],
+            bulk_review_url=options['bulk_review_url'],
+            bulk_size=options['bulk_size'],
+            review_status=options['review_status'],
+        )
+
+        endpoint = simulator.start()
+        print 'Running management command to simulate SoftwareSecure at {endpoint}'.format(endpoint=endpoint)
+
+        started = time.time()
+        try:
+            while options['duration'] is None or time.time() - started < options['duration']:
+                time.sleep(min(options['interval'], options['duration'] or options['interval']))
+                simulator.send_reviews()
+                print ', '.join(
+                    '{key}: {count}'.format(key=key, count=simulator.stats[key])
+                    for key in ('registered', 'errors', 'reviewed', 'review_errors')
+                )
+        except KeyboardInterrupt:
+            pass
+        finally:
+            simulator.stop()
+
+        print 'Completed!'
@@ -0,0 +1,72 @@
+"""
+Django management command to provision the exams of a course up front
+"""
+
+import json
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Django Management command to sync the exams of a course with its course structure.
+    The exams are read from a JSON file holding a list of objects, e.g.
+
+        [{"content_id": "i4x://...", "exam_name": "Midterm", "time_limit_mins": 90}]
+
+    see sync_exams_for_course() for all of the supported fields
+    """
+
+    option_list = BaseCommand.option_list + (
+        make_option('-c', '--course',
+                    metavar='COURSE_ID',
+                    dest='course_id',
+                    help='course_id to sync'),
+        make_option('-f', '--file',
+                    metavar='FILE',
+                    dest='filename',
+                    help='JSON file with the list of exams in the course'),
+        make_option('-k', '--keep-missing',
+                    action='store_true',
+                    dest='keep_missing',
+                    default=False,
+                    help="don't deactivate exams which are not in the file"),
+    )
+
+    def handle(self, *args, **options):
+        """
+        Management command entry point, simply call into the sync api
+        """
+
+        from edx_proctoring.api import sync_exams_for_course
+
+        course_id = options['course_id']
+        filename = options['filename']
+
+        if not course_id or not filename:
+            raise CommandError('Both --course and --file are required')
+
+        with open(filename) as exam_specs_file:
+            exam_specs = json.load(exam_specs_file)
+
+        msg = (
+            'Running management command to sync {count} exams for course_id {course_id}'.format(
+                count=len(exam_specs),
+                course_id=course_id
+            )
+        )
+        print msg
+
+        result = sync_exams_for_course(
+            course_id,
+            exam_specs,
+            deactivate_missing=not options['keep_missing']
+        )
+
+        for action in ('created', 'updated', 'deactivated'):
+            print '{action}: {count}'.format(action=action, count=len(result[action]))
+            for content_id in result[action]:
+                print '    {content_id}'.format(content_id=content_id)
+
+        print 'Completed!'
@@ -0,0 +1,63 @@
+"""
+Tests for the archive_history management command
+"""
+
+import shutil
+import tempfile
+
+from django.core.management.base import CommandError
+
+from edx_proctoring.tests.utils import LoggedInTestCase
+from edx_proctoring.management.commands import archive_history
+from edx_proctoring.models import ProctoredExam, ProctoredExamStudentAllowanceHistory
+
+
+class ArchiveHistoryTests(LoggedInTestCase):
+    """
+    Coverage of the archive_history.py file
+    """
+
+    def setUp(self):
+        """
+        Build up test data
+        """
+        super(ArchiveHistoryTests, self).setUp()
+        self.archive_dir = tempfile.mkdtemp()
+        proctored_exam = ProctoredExam.objects.create(
+            course_id='a/b/c',
+            content_id='test_content',
+            exam_name='Test Exam',
+            external_id='123aXqe3',
+            time_limit_mins=90
+        )
+        ProctoredExamStudentAllowanceHistory.objects.create(
+            allowance_id=1,
+            user=self.user,
+            proctored_exam=proctored_exam,
+            key='additional_time_granted',
+            value='30'
+        )
+
+    def tearDown(self):
+        """
+        Remove the archive files
+        """
+        super(ArchiveHistoryTests, self).tearDown()
+        shutil.rmtree(self.archive_dir)
+
+    def test_run_command(self):
+        """
+        Run the management command
+        """
+
+        archive_history.Command().handle(retention_days=0, archive_dir=self.archive_dir)
+
+        self.assertEqual(ProctoredExamStudentAllowanceHistory.objects.count(), 0)
+
+    def test_missing_args(self):
+        """
+        The output directory is required
+        """
+
+        with self.assertRaises(CommandError):
+            archive_history.Command().handle(retention_days=0, archive_dir=None)
@@ -0,0 +1,53 @@
+"""
+Tests for the circuit_breaker_status management command
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+from mock import patch
+
+from edx_proctoring.backends.tests.test_software_secure import SOFTWARE_SECURE_OPTIONS
+from edx_proctoring.circuit_breaker import CIRCUIT_CLOSED, CIRCUIT_OPEN, CircuitBreaker
+from edx_proctoring.management.commands import circuit_breaker_status
+
+
+@patch(
+    'django.conf.settings.PROCTORING_BACKEND_PROVIDERS',
+    {
+        'SOFTWARE_SECURE': {
+            'class': 'edx_proctoring.backends.software_secure.SoftwareSecureBackendProvider',
+            'options': SOFTWARE_SECURE_OPTIONS,
+        },
+        'TEST': {
+            'class': 'edx_proctoring.backends.tests.test_backend.TestBackendProvider',
+            'options': {},
+        },
+    }
+)
+class CircuitBreakerStatusTests(TestCase):
+    """
+    Coverage of the circuit_breaker_status.py file
+    """
+
+    def setUp(self):
+        """
+        Open the breaker of the SoftwareSecure endpoint
+        """
+        super(CircuitBreakerStatusTests, self).setUp()
+        cache.clear()
+        self.breaker = CircuitBreaker(SOFTWARE_SECURE_OPTIONS['exam_register_endpoint'], failure_threshold=1)
+        self.breaker.record_failure()
+
+    def test_run_command(self):
+        """
+        Run the management command
+        """
+        circuit_breaker_status.Command().handle(provider=None, reset=False)
+        self.assertEqual(self.breaker.state, CIRCUIT_OPEN)
+
+    def test_reset(self):
+        """
+        The breakers can be closed by hand
+        """
+        circuit_breaker_status.Command().handle(provider='SOFTWARE_SECURE', reset=True)
+        self.assertEqual(self.breaker.state, CIRCUIT_CLOSED)
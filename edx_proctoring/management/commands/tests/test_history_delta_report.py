@@ -0,0 +1,36 @@
+"""
+Tests for the history_delta_report management command
+"""
+
+from edx_proctoring.tests.utils import LoggedInTestCase
+from edx_proctoring.management.commands import history_delta_report
+from edx_proctoring.models import ProctoredExam, ProctoredExamStudentAllowanceHistory
+
+
+class HistoryDeltaReportTests(LoggedInTestCase):
+    """
+    Coverage of the history_delta_report.py file
+    """
+
+    def test_run_command(self):
+        """
+        Run the management command
+        """
+
+        proctored_exam = ProctoredExam.objects.create(
+            course_id='a/b/c',
+            content_id='test_content',
+            exam_name='Test Exam',
+            external_id='123aXqe3',
+            time_limit_mins=90
+        )
+        for value in ('10', '20'):
+            ProctoredExamStudentAllowanceHistory.objects.create(
+                allowance_id=1,
+                user=self.user,
+                proctored_exam=proctored_exam,
+                key='additional_time_granted',
+                value=value
+            )
+
+        history_delta_report.Command().handle(snapshot_interval=None)
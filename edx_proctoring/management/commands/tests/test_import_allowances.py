@@ -0,0 +1,73 @@
+"""
+Tests for the import_allowances management command
+"""
+
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management.base import CommandError
+
+from edx_proctoring.tests.utils import LoggedInTestCase
+from edx_proctoring.api import create_exam
+from edx_proctoring.management.commands import import_allowances
+from edx_proctoring.models import ProctoredExamStudentAllowance
+
+
+class ImportAllowancesTests(LoggedInTestCase):
+    """
+    Coverage of the import_allowances.py file
+    """
+
+    def setUp(self):
+        """
+        Build up test data
+        """
+        super(ImportAllowancesTests, self).setUp()
+        self.exam_id = create_exam(
+            course_id='foo',
+            content_id='bar',
+            exam_name='Test Exam',
+            time_limit_mins=90
+        )
+        self.student = User.objects.create(username='student', email='student@test.com')
+        self.allowances_file = tempfile.NamedTemporaryFile(suffix='.csv')
+
+    def tearDown(self):
+        """
+        Clean up the allowances file
+        """
+        super(ImportAllowancesTests, self).tearDown()
+        self.allowances_file.close()
+
+    def _write(self, content):
+        """
+        Fill the CSV file
+        """
+        self.allowances_file.write(content)
+        self.allowances_file.flush()
+
+    def test_run_command(self):
+        """
+        Run the management command
+        """
+        self._write(
+            'exam_id,user_info,key,value\n'
+            '{exam_id},student,additional_time_granted,10\n'
+            '{exam_id},nobody,additional_time_granted,10\n'.format(exam_id=self.exam_id)
+        )
+
+        import_allowances.Command().handle(filename=self.allowances_file.name)
+
+        allowance = ProctoredExamStudentAllowance.get_allowance_for_user(
+            self.exam_id, self.student.id, 'additional_time_granted'
+        )
+        self.assertEqual(allowance.value, '10')
+
+    def test_missing_columns(self):
+        """
+        The header has to have all of the columns
+        """
+        self._write('exam_id,user_info\n')
+
+        with self.assertRaises(CommandError):
+            import_allowances.Command().handle(filename=self.allowances_file.name)
@@ -0,0 +1,75 @@
+"""
+Tests for the preprovision_attempts management command
+"""
+
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management.base import CommandError
+from mock import patch
+
+from edx_proctoring.tests.utils import LoggedInTestCase
+from edx_proctoring.api import create_exam, get_exam_attempt
+from edx_proctoring.management.commands import preprovision_attempts
+
+
+@patch('edx_proctoring.api.get_provider_name_by_course_id', return_value="TEST")
+class PreprovisionAttemptsTests(LoggedInTestCase):
+    """
+    Coverage of the preprovision_attempts.py file
+    """
+
+    def setUp(self):
+        """
+        Build up test data
+        """
+        super(PreprovisionAttemptsTests, self).setUp()
+        self.exam_id = create_exam(
+            course_id='a/b/c',
+            content_id='test_content',
+            exam_name='Test Exam',
+            time_limit_mins=90
+        )
+        self.other_user = User.objects.create(username='student2', email='student2@test.com')
+
+        self.roster_file = tempfile.NamedTemporaryFile()
+        self.roster_file.write('{username}\n{user_id}\nnobody\n\n'.format(
+            username=self.user.username,
+            user_id=self.other_user.id
+        ))
+        self.roster_file.flush()
+
+    def tearDown(self):
+        """
+        Clean up the roster file
+        """
+        super(PreprovisionAttemptsTests, self).tearDown()
+        self.roster_file.close()
+
+    @patch('edx_proctoring.api._register_exam_attempt_with_provider', return_value='ssi-locator')
+    def test_run_command(self, mock_register, provider):  # pylint: disable=unused-argument
+        """
+        Run the management command
+        """
+
+        preprovision_attempts.Command().handle(
+            exam_id=self.exam_id,
+            filename=self.roster_file.name,
+            workers=2
+        )
+
+        self.assertEqual(mock_register.call_count, 2)
+        for user in (self.user, self.other_user):
+            self.assertEqual(get_exam_attempt(self.exam_id, user.id)['external_id'], 'ssi-locator')
+
+    def test_missing_args(self, provider):  # pylint: disable=unused-argument
+        """
+        Both the exam and the roster are required
+        """
+
+        with self.assertRaises(CommandError):
+            preprovision_attempts.Command().handle(
+                exam_id=self.exam_id,
+                filename=None,
+                workers=None
+            )
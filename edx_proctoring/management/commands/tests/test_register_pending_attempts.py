@@ -0,0 +1,43 @@
+"""
+Tests for the register_pending_attempts management command
+"""
+
+from mock import patch
+
+from edx_proctoring.tests.utils import LoggedInTestCase
+from edx_proctoring.api import create_exam, create_exam_attempt, get_exam_attempt_by_id
+from edx_proctoring.management.commands import register_pending_attempts
+
+
+@patch('edx_proctoring.api.get_provider_name_by_course_id', return_value="TEST")
+class RegisterPendingAttemptsTests(LoggedInTestCase):
+    """
+    Coverage of the register_pending_attempts.py file
+    """
+
+    def setUp(self):
+        """
+        Build up test data
+        """
+        super(RegisterPendingAttemptsTests, self).setUp()
+        self.exam_id = create_exam(
+            course_id='a/b/c',
+            content_id='test_content',
+            exam_name='Test Exam',
+            time_limit_mins=90
+        )
+
+    @patch.dict('django.conf.settings.PROCTORING_SETTINGS', {'DEFER_ATTEMPT_REGISTRATION': True})
+    @patch('edx_proctoring.api._register_exam_attempt_with_provider', return_value='ssi-locator')
+    def test_run_command(self, mock_register, provider):  # pylint: disable=unused-argument
+        """
+        Run the management command
+        """
+
+        attempt_id = create_exam_attempt(self.exam_id, self.user.id, taking_as_proctored=True)
+        self.assertTrue(get_exam_attempt_by_id(attempt_id)['registration_pending'])
+
+        register_pending_attempts.Command().handle(loop=None)
+
+        self.assertEqual(mock_register.call_count, 1)
+        self.assertEqual(get_exam_attempt_by_id(attempt_id)['external_id'], 'ssi-locator')
@@ -0,0 +1,64 @@
+"""
+Tests for the software_secure_simulator management command
+"""
+
+import json
+import socket
+
+import requests
+from django.test import TestCase
+from mock import patch
+
+from edx_proctoring.management.commands import software_secure_simulator
+
+
+class SoftwareSecureSimulatorCommandTests(TestCase):
+    """
+    Coverage of the software_secure_simulator.py file
+    """
+
+    def setUp(self):
+        """
+        Find a free port for the simulator
+        """
+        super(SoftwareSecureSimulatorCommandTests, self).setUp()
+        sock = socket.socket()
+        sock.bind(('localhost', 0))
+        self.port = sock.getsockname()[1]
+        sock.close()
+        self.statuses = []
+
+    def _register(self, seconds):  # pylint: disable=unused-argument
+        """
+        Registers an exam while the command waits for the next review run
+        """
+        response = requests.post(
+            'http://localhost:{port}/'.format(port=self.port),
+            data=json.dumps({'examCode': 'ABC'}),
+            headers={'Authorization': 'SSI foo:bar'}
+        )
+        self.statuses.append(response.status_code)
+
+    def test_run_command(self):
+        """
+        Run the management command for a little while
+        """
+
+        with patch('edx_proctoring.management.commands.software_secure_simulator.time.sleep', self._register):
+            software_secure_simulator.Command().handle(
+                port=self.port,
+                latency=0.0,
+                latency_jitter=0.0,
+                error_rate=1.0,
+                error_statuses='502,504',
+                review_url=None,
+                bulk_review_url=None,
+                bulk_size=50,
+                review_status='Clean',
+                interval=0.01,
+                duration=0.01,
+            )
+
+        self.assertTrue(self.statuses)
+        for status in self.statuses:
+            self.assertIn(status, (502, 504))
@@ -0,0 +1,83 @@
+"""
+Tests for the sync_exams management command
+"""
+
+import json
+import tempfile
+
+from django.core.management.base import CommandError
+
+from edx_proctoring.tests.utils import LoggedInTestCase
+from edx_proctoring.api import create_exam, get_exam_by_content_id
+from edx_proctoring.management.commands import sync_exams
+
+
+class SyncExamsTests(LoggedInTestCase):
+    """
+    Coverage of the sync_exams.py file
+    """
+
+    def setUp(self):
+        """
+        Build up test data
+        """
+        super(SyncExamsTests, self).setUp()
+        create_exam(
+            course_id='a/b/c',
+            content_id='old',
+            exam_name='Old Exam',
+            time_limit_mins=90
+        )
+
+        self.exam_specs_file = tempfile.NamedTemporaryFile(suffix='.json')
+        json.dump(
+            [{'content_id': 'new', 'exam_name': 'New Exam', 'time_limit_mins': 30}],
+            self.exam_specs_file
+        )
+        self.exam_specs_file.flush()
+
+    def tearDown(self):
+        """
+        Clean up the exams file
+        """
+        super(SyncExamsTests, self).tearDown()
+        self.exam_specs_file.close()
+
+    def test_run_command(self):
+        """
+        Run the management command
+        """
+
+        sync_exams.Command().handle(
+            course_id='a/b/c',
+            filename=self.exam_specs_file.name,
+            keep_missing=False
+        )
+
+        self.assertEqual(get_exam_by_content_id('a/b/c', 'new')['time_limit_mins'], 30)
+        self.assertFalse(get_exam_by_content_id('a/b/c', 'old')['is_active'])
+
+    def test_keep_missing(self):
+        """
+        Exams which are not in the file can be left alone
+        """
+
+        sync_exams.Command().handle(
+            course_id='a/b/c',
+            filename=self.exam_specs_file.name,
+            keep_missing=True
+        )
+
+        self.assertTrue(get_exam_by_content_id('a/b/c', 'old')['is_active'])
+
+    def test_missing_args(self):
+        """
+        Both the course and the file are required
+        """
+
+        with self.assertRaises(CommandError):
+            sync_exams.Command().handle(
+                course_id='a/b/c',
+                filename=None,
+                keep_missing=False
+            )
@@ -1,15 +1,30 @@
 """
 Data models for the proctoring subsystem
 """
+import base64
 import hashlib
-from django.db import models
-from django.db.models import Q
-from django.db.models.signals import pre_save, pre_delete
+import json
+import pytz
+import threading
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import request_finished
+from django.db import IntegrityError, models, transaction
+from django.db.models import Q, DateTimeField
+from django.db.models.signals import class_prepared, pre_save, pre_delete, post_save, post_delete
 from django.dispatch import receiver
+from django.utils.dateparse import parse_datetime
+from model_utils import FieldTracker
 from model_utils.models import TimeStampedModel
 from django.utils.translation import ugettext as _
 
 from django.contrib.auth.models import User
+from edx_proctoring import history
 from edx_proctoring.exceptions import UserNotFoundException
 from django.db.models.base import ObjectDoesNotExist
 
@@ -85,6 +100,14 @@ class ProctoredExam(TimeStampedModel):
             proctored_exam = None
         return proctored_exam
 
+    @classmethod
+    def get_exams_by_content_ids(cls, course_id, content_ids):
+        """
+        Returns all Proctored Exams in the given course_id whose
+        content_id is in the list of content_ids
+        """
+        return cls.objects.filter(course_id=course_id, content_id__in=content_ids)
+
     @classmethod
     def get_all_exams_for_course(cls, course_id, active_only=False):
         """
@@ -245,6 +268,9 @@ class ProctoredExamReviewPolicy(TimeStampedModel):
     # policy that will be passed to reviewers
     review_policy = models.TextField()
 
+    # remembers the values as loaded, so that we can archive them without a read
+    tracker = FieldTracker(fields=['set_by_user_id', 'proctored_exam_id', 'review_policy'])
+
     class Meta:
         """ Meta class for this Django model """
         db_table = 'proctoring_proctoredexamreviewpolicy'
@@ -281,6 +307,9 @@ class ProctoredExamReviewPolicyHistory(TimeStampedModel):
     # policy that will be passed to reviewers
     review_policy = models.TextField()
 
+    # which field identifies the versions of the same row, for the delta encoded history
+    history_key = 'original_id'
+
     class Meta:
         """ Meta class for this Django model """
         db_table = 'proctoring_proctoredexamreviewpolicyhistory'
@@ -293,6 +322,26 @@ class ProctoredExamReviewPolicyHistory(TimeStampedModel):
         raise NotImplementedError()
 
 
+def _get_archivable_original(instance):
+    """
+    Returns an unsaved copy of the instance, holding the field values as they were
+    loaded from (or last saved to) the database, as remembered by its tracker.
+    Returns None if none of the tracked fields have changed, as then there is
+    nothing to archive. We only go back to the database when the tracker doesn't
+    know the original values, e.g. for deferred fields
+    """
+
+    tracker = instance.tracker
+    # pylint: disable=protected-access
+    if not tracker.saved_data or instance._deferred_fields:
+        return instance.__class__.objects.get(id=instance.id)
+
+    if not tracker.changed():
+        return None
+
+    return instance.__class__(id=instance.id, **tracker.saved_data)
+
+
 # Hook up the post_save signal to record creations in the ProctoredExamReviewPolicyHistory table.
 @receiver(pre_save, sender=ProctoredExamReviewPolicy)
 def on_review_policy_saved(sender, instance, **kwargs):  # pylint: disable=unused-argument
@@ -303,8 +352,9 @@ def on_review_policy_saved(sender, instance, **kwargs):  # pylint: disable=unuse
 
     if instance.id:
         # only for update cases
-        original = ProctoredExamReviewPolicy.objects.get(id=instance.id)
-        _make_review_policy_archive_copy(original)
+        original = _get_archivable_original(instance)
+        if original:
+            _make_review_policy_archive_copy(original)
 
 
 # Hook up the pre_delete signal to record creations in the ProctoredExamReviewPolicyHistory table.
@@ -325,10 +375,10 @@ def _make_review_policy_archive_copy(instance):
     archive_object = ProctoredExamReviewPolicyHistory(
         original_id=instance.id,
         set_by_user_id=instance.set_by_user_id,
-        proctored_exam=instance.proctored_exam,
+        proctored_exam_id=instance.proctored_exam_id,
         review_policy=instance.review_policy,
     )
-    archive_object.save()
+    history.archive(archive_object)
 
 
 class ProctoredExamStudentAttemptManager(models.Manager):
@@ -346,6 +396,16 @@ class ProctoredExamStudentAttemptManager(models.Manager):
             exam_attempt_obj = None
         return exam_attempt_obj
 
+    def get_exam_attempts_for_user(self, user_id, exam_ids):
+        """
+        Returns all of the Student Exam Attempts for the user on
+        the given list of exam_ids
+        """
+        return self.filter(
+            user_id=user_id,
+            proctored_exam_id__in=exam_ids
+        ).select_related('proctored_exam', 'user')
+
     def get_exam_attempt_by_id(self, attempt_id):
         """
         Returns the Student Exam Attempt by the attempt_id else return None
@@ -393,7 +453,7 @@ class ProctoredExamStudentAttemptManager(models.Manager):
         if course_id is not None:
             filtered_query = filtered_query & Q(proctored_exam__course_id=course_id)
 
-        return self.filter(filtered_query).order_by('-created')
+        return self.filter(filtered_query).select_related('proctored_exam', 'user').order_by('-created')
 
 
 class ProctoredExamStudentAttempt(TimeStampedModel):
@@ -444,6 +504,17 @@ class ProctoredExamStudentAttempt(TimeStampedModel):
     # this ID might point to a record that is in the History table
     review_policy_id = models.IntegerField(null=True)
 
+    # whether the attempt still has to be registered with the backend provider,
+    # see the DEFER_ATTEMPT_REGISTRATION setting
+    registration_pending = models.BooleanField(default=False)
+
+    # how many times registering the attempt with the backend provider has failed
+    registration_failures = models.IntegerField(default=0)
+
+    # until when a worker has claimed the pending registration, so that the
+    # attempt is not registered twice with the backend provider
+    registration_claimed_until = models.DateTimeField(null=True)
+
     class Meta:
         """ Meta class for this Django model """
         db_table = 'proctoring_proctoredexamstudentattempt'
@@ -453,7 +524,7 @@ class ProctoredExamStudentAttempt(TimeStampedModel):
     @classmethod
     def create_exam_attempt(cls, exam_id, user_id, student_name, allowed_time_limit_mins,
                             attempt_code, taking_as_proctored, is_sample_attempt, external_id,
-                            review_policy_id=None):
+                            review_policy_id=None, registration_pending=False, registration_claimed_until=None):
         """
         Create a new exam attempt entry for a given exam_id and
         user_id.
@@ -469,7 +540,9 @@ class ProctoredExamStudentAttempt(TimeStampedModel):
             is_sample_attempt=is_sample_attempt,
             external_id=external_id,
             status=ProctoredExamStudentAttemptStatus.created,
-            review_policy_id=review_policy_id
+            review_policy_id=review_policy_id,
+            registration_pending=registration_pending,
+            registration_claimed_until=registration_claimed_until
         )
 
     def delete_exam_attempt(self):
@@ -536,6 +609,9 @@ class ProctoredExamStudentAttemptHistory(TimeStampedModel):
         # there are any
         exam_attempt_obj = None
 
+        # the attempt might have just been archived, make sure that it got written
+        history.flush()
+
         items = cls.objects.filter(attempt_code=attempt_code).order_by("-created")
         if items:
             exam_attempt_obj = items[0]
@@ -556,9 +632,9 @@ def on_attempt_deleted(sender, instance, **kwargs):  # pylint: disable=unused-ar
     """
 
     archive_object = ProctoredExamStudentAttemptHistory(
-        user=instance.user,
+        user_id=instance.user_id,
         attempt_id=instance.id,
-        proctored_exam=instance.proctored_exam,
+        proctored_exam_id=instance.proctored_exam_id,
         started_at=instance.started_at,
         completed_at=instance.completed_at,
         attempt_code=instance.attempt_code,
@@ -570,7 +646,225 @@ def on_attempt_deleted(sender, instance, **kwargs):  # pylint: disable=unused-ar
         student_name=instance.student_name,
         review_policy_id=instance.review_policy_id,
     )
-    archive_object.save()
+    history.archive(archive_object)
+    ProctoredExamAttemptCodeIndex.on_attempt_archived(instance.attempt_code, archive_object)
+
+
+class ProctoredExamAttemptCodeIndex(TimeStampedModel):
+    """
+    Maps every attempt code to where its attempt is: the live attempt, or once
+    the attempt has been deleted the archive copy of it. This way an attempt can
+    be looked up by its code with a single query, whichever table it is in.
+
+    The rows are written when the attempts are created and archived. An entry
+    which points at neither table is either retained, i.e. the history retention
+    has moved the archive copy into the archive files, or an attempt whose archive
+    copy has not been written yet (see HISTORY_WRITE_MODE).
+    """
+
+    attempt_code = models.CharField(max_length=255, unique=True)
+
+    attempt = models.ForeignKey(
+        ProctoredExamStudentAttempt, null=True, on_delete=models.SET_NULL, related_name='+'
+    )
+
+    history = models.ForeignKey(
+        ProctoredExamStudentAttemptHistory, null=True, on_delete=models.SET_NULL, related_name='+'
+    )
+
+    # whether the archive copy is only in the archive files of the history retention
+    retained = models.BooleanField(default=False)
+
+    class Meta:
+        """ Meta class for this Django model """
+        db_table = 'proctoring_proctoredexamattemptcodeindex'
+        verbose_name = 'proctored exam attempt code index'
+
+    @classmethod
+    def _get_cache_key(cls, attempt_code):
+        """
+        Cache key of the location of an attempt code
+        """
+        return 'edx_proctoring.attempt_code_index.{attempt_code}'.format(attempt_code=attempt_code)
+
+    @classmethod
+    def _get_cache_timeout(cls):
+        """
+        Returns the configured ATTEMPT_CODE_INDEX_CACHE_TIMEOUT
+        """
+        return settings.PROCTORING_SETTINGS.get('ATTEMPT_CODE_INDEX_CACHE_TIMEOUT', 3600)
+
+    @classmethod
+    def _cache_locations(cls, located, retained=()):
+        """
+        Caches where the attempts are, given a dict of attempt_code -> (attempt, is_archived_attempt),
+        and the attempt codes which are retained, as (True, None)
+        """
+        locations = dict(
+            (cls._get_cache_key(attempt_code), (is_archived_attempt, attempt_obj.id))
+            for attempt_code, (attempt_obj, is_archived_attempt) in located.iteritems()
+        )
+        locations.update((cls._get_cache_key(attempt_code), (True, None)) for attempt_code in retained)
+        cache.set_many(locations, cls._get_cache_timeout())
+
+    @classmethod
+    def on_attempt_created(cls, attempt_obj):
+        """
+        Points the attempt code at the new attempt
+        """
+
+        if not attempt_obj.attempt_code:
+            return
+
+        # the code might have been used before, by an attempt which has since been
+        # deleted, then the live attempt wins, like it always has
+        updated = cls.objects.filter(attempt_code=attempt_obj.attempt_code).update(
+            attempt=attempt_obj,
+            history=None,
+            retained=False,
+            modified=datetime.now(pytz.UTC)
+        )
+        if not updated:
+            cls.objects.create(attempt_code=attempt_obj.attempt_code, attempt=attempt_obj)
+        cls._cache_locations({attempt_obj.attempt_code: (attempt_obj, False)})
+
+    @classmethod
+    def on_attempt_archived(cls, attempt_code, archive_object):
+        """
+        Points the attempt code at the archive copy of its attempt. With buffered
+        history writes the copy has no id yet, then locate_many() looks it up by
+        the attempt code and fills it in. The live attempt gets unset when it is
+        deleted, by the foreign key
+        """
+
+        if not attempt_code:
+            return
+
+        cls.objects.filter(attempt_code=attempt_code).update(
+            history=archive_object.id,
+            retained=False,
+            modified=datetime.now(pytz.UTC)
+        )
+        if archive_object.id:
+            cls._cache_locations({attempt_code: (archive_object, True)})
+        else:
+            cache.delete(cls._get_cache_key(attempt_code))
+
+    @classmethod
+    def on_attempts_retained(cls, history_ids, attempt_codes):
+        """
+        Marks the attempt codes of the archive copies, which the history retention is
+        about to delete, as retained. Entries which point at a live attempt, or at a
+        more recent archive copy, are left alone
+        """
+
+        attempt_codes = set(attempt_codes)
+        cls.objects.filter(
+            Q(history__isnull=True) | Q(history__in=history_ids),
+            attempt_code__in=attempt_codes,
+            attempt__isnull=True
+        ).update(retained=True, modified=datetime.now(pytz.UTC))
+        cache.delete_many([cls._get_cache_key(attempt_code) for attempt_code in attempt_codes])
+
+    @classmethod
+    def locate(cls, attempt_code):
+        """
+        Returns a tuple of (attempt, is_archived_attempt) of the attempt code, or
+        (None, False) if it is not in either table. Usually the location is in the
+        cache, then this only reads the attempt from its table, by id, or for a
+        retained attempt code doesn't touch the database at all
+        """
+
+        location = cache.get(cls._get_cache_key(attempt_code))
+        if location == (True, None):
+            return (None, False)
+        if location is not None:
+            is_archived_attempt, attempt_id = location
+            model = ProctoredExamStudentAttemptHistory if is_archived_attempt else ProctoredExamStudentAttempt
+            # the attempt code is checked as well, in case the id has been reused
+            attempts = list(
+                model.objects.filter(id=attempt_id, attempt_code=attempt_code).select_related('proctored_exam', 'user')
+            )
+            if attempts:
+                return (attempts[0], is_archived_attempt)
+
+        located = cls.locate_many([attempt_code])
+        return located.get(attempt_code, (None, False))
+
+    @classmethod
+    def locate_many(cls, attempt_codes):
+        """
+        Returns a dict of attempt_code -> (attempt, is_archived_attempt), which leaves
+        out the attempt codes that are not in either table. This takes one query,
+        which joins the index entries to the attempts and their archive copies
+        """
+
+        located = {}
+        retained = []
+        unwritten = {}
+        entries = cls.objects.filter(attempt_code__in=set(attempt_codes)).select_related(
+            'attempt__proctored_exam', 'attempt__user', 'history__proctored_exam', 'history__user'
+        )
+        for entry in entries:
+            if entry.attempt_id:
+                located[entry.attempt_code] = (entry.attempt, False)
+            elif entry.history_id:
+                located[entry.attempt_code] = (entry.history, True)
+            elif entry.retained:
+                retained.append(entry.attempt_code)
+            else:
+                unwritten[entry.attempt_code] = entry
+
+        if unwritten:
+            # the archive copies might not have been written yet, make sure that they are
+            history.flush()
+
+            # oldest first, so that the most recent archived attempt wins
+            found = {}
+            for attempt_obj in ProctoredExamStudentAttemptHistory.objects.filter(
+                    attempt_code__in=unwritten.keys()
+            ).select_related('proctored_exam', 'user').order_by('created'):
+                found[attempt_obj.attempt_code] = (attempt_obj, True)
+
+            for attempt_code, (attempt_obj, __) in found.iteritems():
+                cls.objects.filter(attempt_code=attempt_code, attempt__isnull=True).update(history=attempt_obj)
+            located.update(found)
+
+            # not in the history table even after the flush, and archived too long ago for
+            # another process to still hold the copy in its buffer. The history retention
+            # moved these out before it marked the entries, remember that for next time
+            cutoff = datetime.now(pytz.UTC) - timedelta(days=1)
+            lost = [
+                attempt_code for attempt_code, entry in unwritten.iteritems()
+                if attempt_code not in found and entry.modified < cutoff
+            ]
+            if lost:
+                cls.objects.filter(
+                    attempt_code__in=lost, attempt__isnull=True, history__isnull=True
+                ).update(retained=True)
+                retained.extend(lost)
+
+        if located or retained:
+            cls._cache_locations(located, retained)
+        return located
+
+
+@receiver(post_save, sender=ProctoredExamStudentAttempt)
+def on_attempt_saved(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """
+    Add the attempt code of a new attempt to the ProctoredExamAttemptCodeIndex
+    """
+    if created:
+        ProctoredExamAttemptCodeIndex.on_attempt_created(instance)
+
+
+# how many rows to archive/update per statement, this keeps
+# us within the bound parameter limits of all databases
+ARCHIVE_CHUNK_SIZE = 500
+
+# the (exam_id, user_id) allowance bundles changed inside of a managed transaction,
+# of every thread
+_CHANGED_ALLOWANCE_BUNDLES = threading.local()
 
 
 class QuerySetWithUpdateOverride(models.query.QuerySet):
@@ -579,8 +873,37 @@ class QuerySetWithUpdateOverride(models.query.QuerySet):
     every time the object is updated.
     """
     def update(self, **kwargs):
-        super(QuerySetWithUpdateOverride, self).update(**kwargs)
-        _make_archive_copy(self.get())
+        """
+        Archives the current version of all matching allowances, then updates them,
+        in one transaction. Works for any number of rows and returns how many
+        got updated
+        """
+
+        with transaction.commit_on_success(using=self.db):
+            rows = list(self.values_list('id', 'proctored_exam_id', 'user_id', 'key', 'value'))
+
+            updated = 0
+            for index in xrange(0, len(rows), ARCHIVE_CHUNK_SIZE):
+                chunk = rows[index:index + ARCHIVE_CHUNK_SIZE]
+                _archive_allowances(chunk)
+                # go through the plain QuerySet, so we update exactly what we archived
+                updated += self.model._base_manager.using(self.db).filter(
+                    id__in=[allowance_id for allowance_id, __, __, __, __ in chunk]
+                ).update(**kwargs)
+
+        ProctoredExamStudentAllowance.invalidate_allowance_bundles(
+            set((exam_id, user_id) for __, exam_id, user_id, __, __ in rows)
+        )
+        return updated
+
+    def delete(self):
+        """
+        Deletes the matching allowances, then drops their cached bundles again
+        once the deletion has been committed
+        """
+        super(QuerySetWithUpdateOverride, self).delete()
+        if not transaction.is_managed(using=self.db):
+            ProctoredExamStudentAllowance.invalidate_changed_allowance_bundles()
 
 
 class ProctoredExamStudentAllowanceManager(models.Manager):
@@ -592,6 +915,67 @@ class ProctoredExamStudentAllowanceManager(models.Manager):
         return QuerySetWithUpdateOverride(self.model, using=self._db)
 
 
+class ProctoredExamStudentAllowanceBundle(object):
+    """
+    All of the allowances a user has been granted within an exam, as returned
+    by ProctoredExamStudentAllowance.get_allowance_bundle()
+    """
+
+    def __init__(self, exam_id, user_id, allowances):
+        """
+        Initializer, allowances is a list of ProctoredExamStudentAllowance
+        """
+        self.exam_id = exam_id
+        self.user_id = user_id
+        self.allowances = list(allowances)
+        self._values = dict((allowance.key, allowance.value) for allowance in self.allowances)
+
+    def __getstate__(self):
+        """
+        Bundles get cached, but the field trackers of the allowances can't be pickled,
+        so only keep the field values around
+        """
+        state = self.__dict__.copy()
+        state['allowances'] = [
+            dict((field.attname, getattr(allowance, field.attname)) for field in allowance._meta.fields)
+            for allowance in self.allowances
+        ]
+        return state
+
+    def __setstate__(self, state):
+        """
+        Rebuilds the allowances from their field values
+        """
+        self.__dict__.update(state)
+        self.allowances = [
+            ProctoredExamStudentAllowance(**field_values) for field_values in state['allowances']
+        ]
+
+    def get(self, key, default=None):
+        """
+        Returns the value of the allowance with the given key
+        """
+        # see if key is a tuple, if it is, then the first element is the key
+        if isinstance(key, tuple) and len(key) > 0:
+            key = key[0]
+        return self._values.get(key, default)
+
+    @property
+    def additional_time_granted(self):
+        """
+        The additional time granted in minutes, or None
+        """
+        value = self.get(ProctoredExamStudentAllowance.ADDITIONAL_TIME_GRANTED)
+        return int(value) if value else None
+
+    @property
+    def review_policy_exception(self):
+        """
+        The policy exception that reviewers should follow, or None
+        """
+        return self.get(ProctoredExamStudentAllowance.REVIEW_POLICY_EXCEPTION)
+
+
 class ProctoredExamStudentAllowance(TimeStampedModel):
     """
     Information about allowing a student additional time on exam.
@@ -616,6 +1000,9 @@ class ProctoredExamStudentAllowance(TimeStampedModel):
 
     value = models.CharField(max_length=255)
 
+    # remembers the values as loaded, so that we can archive them without a read
+    tracker = FieldTracker(fields=['user_id', 'proctored_exam_id', 'key', 'value'])
+
     class Meta:
         """ Meta class for this Django model """
         unique_together = (('user', 'proctored_exam', 'key'),)
@@ -647,6 +1034,98 @@ class ProctoredExamStudentAllowance(TimeStampedModel):
         """
         return cls.objects.filter(proctored_exam_id=exam_id, user_id=user_id)
 
+    @classmethod
+    def _get_allowance_bundle_cache_key(cls, exam_id, user_id):
+        """
+        Cache key of the allowance bundle of a user within a given exam
+        """
+        return 'edx_proctoring.allowances.{exam_id}.{user_id}'.format(exam_id=exam_id, user_id=user_id)
+
+    @classmethod
+    def get_allowance_bundle(cls, exam_id, user_id):
+        """
+        Returns all the allowances for a user within a given exam as a
+        ProctoredExamStudentAllowanceBundle. These are read in a single query
+        and then cached, until any of the user's allowances in the exam change
+        """
+
+        cache_key = cls._get_allowance_bundle_cache_key(exam_id, user_id)
+        bundle = cache.get(cache_key)
+        if bundle is None:
+            bundle = ProctoredExamStudentAllowanceBundle(
+                exam_id,
+                user_id,
+                cls.get_allowances_for_user(exam_id, user_id)
+            )
+            cache.set(
+                cache_key,
+                bundle,
+                settings.PROCTORING_SETTINGS.get('ALLOWANCE_CACHE_TIMEOUT', 3600)
+            )
+        return bundle
+
+    @classmethod
+    def get_allowance_bundles(cls, exam_id, user_ids):
+        """
+        Returns a dict of the allowance bundles of many users within a given exam,
+        keyed by user_id. The bundles which are not cached are read in a single query
+        """
+
+        cache_keys = dict((cls._get_allowance_bundle_cache_key(exam_id, user_id), user_id) for user_id in user_ids)
+        bundles = dict(
+            (cache_keys[cache_key], bundle)
+            for cache_key, bundle in cache.get_many(cache_keys.keys()).iteritems()
+        )
+
+        missing_user_ids = [user_id for user_id in user_ids if user_id not in bundles]
+        if missing_user_ids:
+            allowances_by_user = defaultdict(list)
+            for allowance in cls.objects.filter(proctored_exam_id=exam_id, user_id__in=missing_user_ids):
+                allowances_by_user[allowance.user_id].append(allowance)
+
+            missing_bundles = dict(
+                (user_id, ProctoredExamStudentAllowanceBundle(exam_id, user_id, allowances_by_user[user_id]))
+                for user_id in missing_user_ids
+            )
+            cache.set_many(
+                dict((cls._get_allowance_bundle_cache_key(exam_id, user_id), bundle)
+                     for user_id, bundle in missing_bundles.iteritems()),
+                settings.PROCTORING_SETTINGS.get('ALLOWANCE_CACHE_TIMEOUT', 3600)
+            )
+            bundles.update(missing_bundles)
+        return bundles
+
+    @classmethod
+    def invalidate_allowance_bundles(cls, exam_user_ids):
+        """
+        Drops the cached allowance bundles, given a list of (exam_id, user_id) tuples
+        """
+        cache.delete_many([
+            cls._get_allowance_bundle_cache_key(exam_id, user_id)
+            for exam_id, user_id in exam_user_ids
+        ])
+
+    @classmethod
+    def invalidate_changed_allowance_bundles(cls):
+        """
+        Drops the cached allowance bundles which were changed inside of a managed
+        transaction of this thread once more, after it has been committed (or rolled
+        back). In between, a concurrent reader could have cached them as they were
+        """
+        exam_user_ids = getattr(_CHANGED_ALLOWANCE_BUNDLES, 'exam_user_ids', None)
+        if exam_user_ids:
+            _CHANGED_ALLOWANCE_BUNDLES.exam_user_ids = set()
+            cls.invalidate_allowance_bundles(exam_user_ids)
+
+    def delete(self, *args, **kwargs):
+        """
+        Deletes the allowance, then drops its cached bundle again once the deletion
+        has been committed
+        """
+        super(ProctoredExamStudentAllowance, self).delete(*args, **kwargs)
+        if not transaction.is_managed(using=kwargs.get('using')):
+            ProctoredExamStudentAllowance.invalidate_changed_allowance_bundles()
+
     @classmethod
     def add_allowance_for_user(cls, exam_id, user_info, key, value):
         """
@@ -682,16 +1161,163 @@ class ProctoredExamStudentAllowance(TimeStampedModel):
         except cls.DoesNotExist:  # pylint: disable=no-member
             cls.objects.create(proctored_exam_id=exam_id, user_id=user_id, key=key, value=value)
 
+    @classmethod
+    def add_allowances_for_users(cls, allowances):
+        """
+        Add or (Update) many allowances at once. allowances is a list of dictionaries
+        with the same exam_id, user_info, key and value as in add_allowance_for_user.
+        If the same allowance appears more than once, then the last one wins.
+
+        All users are resolved up front in one query (by id, username or email, in
+        that order), the existing allowances are read in one locking query and the
+        changes are written back in bulk within the same transaction, updates being
+        archived in bulk as well.
+
+        Returns a tuple of the number of allowances added, the number updated, and
+        a list of (index, error message) tuples for the allowances which were skipped
+        """
+
+        errors = []
+
+        exam_ids = set()
+        for allowance in allowances:
+            try:
+                exam_ids.add(int(allowance['exam_id']))
+            except (TypeError, ValueError):
+                pass
+        found_exam_ids = set(
+            ProctoredExam.objects.filter(id__in=exam_ids).values_list('id', flat=True)
+        ) if exam_ids else set()
+
+        # resolve all user_infos at once, PKs have to exist and usernames take
+        # precedence over emails
+        user_pks = set()
+        user_infos = set()
+        for allowance in allowances:
+            if isinstance(allowance['user_info'], (int, long)):
+                user_pks.add(allowance['user_info'])
+            else:
+                user_infos.add(allowance['user_info'])
+        found_user_pks = set()
+        user_ids = {}
+        if user_pks or user_infos:
+            emails = {}
+            for user_id, username, email in User.objects.filter(
+                    Q(id__in=user_pks) | Q(username__in=user_infos) | Q(email__in=user_infos)
+            ).order_by('id').values_list('id', 'username', 'email'):
+                found_user_pks.add(user_id)
+                user_ids[username] = user_id
+                emails.setdefault(email, user_id)
+            for email, user_id in emails.iteritems():
+                user_ids.setdefault(email, user_id)
+
+        desired = {}
+        for index, allowance in enumerate(allowances):
+            user_info = allowance['user_info']
+            key = allowance['key']
+
+            # see if key is a tuple, if it is, then the first element is the key
+            if isinstance(key, tuple) and len(key) > 0:
+                key = key[0]
+
+            try:
+                exam_id = int(allowance['exam_id'])
+            except (TypeError, ValueError):
+                exam_id = allowance['exam_id']
+
+            if exam_id not in found_exam_ids:
+                errors.append((index, 'Cannot find exam against {exam_id}'.format(exam_id=exam_id)))
+                continue
+
+            if isinstance(user_info, (int, long)):
+                if user_info not in found_user_pks:
+                    errors.append((index, 'Cannot find user against {user_info}'.format(user_info=user_info)))
+                    continue
+                user_id = user_info
+            elif user_info in user_ids:
+                user_id = user_ids[user_info]
+            else:
+                errors.append((index, 'Cannot find user against {user_info}'.format(user_info=user_info)))
+                continue
+
+            desired[(exam_id, user_id, key)] = allowance['value']
+
+        if not desired:
+            return 0, 0, errors
+
+        with transaction.commit_on_success():
+            new_allowances, archived, updates = cls._plan_bulk_changes(desired)
+            if new_allowances:
+                savepoint_id = transaction.savepoint()
+                try:
+                    cls.objects.bulk_create(new_allowances)
+                except IntegrityError:
+                    # a concurrent import added some of the same allowances since we read
+                    # them, read them again so that those are updated instead
+                    transaction.savepoint_rollback(savepoint_id)
+                    new_allowances, archived, updates = cls._plan_bulk_changes(desired)
+                    if new_allowances:
+                        cls.objects.bulk_create(new_allowances)
+                else:
+                    transaction.savepoint_commit(savepoint_id)
+            history.archive_many(archived)
+
+            # the _base_manager doesn't archive on update(), we did that above
+            now = datetime.now(pytz.UTC)
+            for value, allowance_ids in updates.iteritems():
+                cls._base_manager.filter(id__in=allowance_ids).update(value=value, modified=now)
+
+        cls.invalidate_allowance_bundles(
+            set((exam_id, user_id) for exam_id, user_id, __ in desired)
+        )
+
+        return len(new_allowances), len(archived), errors
+
+    @classmethod
+    def _plan_bulk_changes(cls, desired):
+        """
+        Reads and locks the existing allowances of the desired (exam_id, user_id, key)
+        values, and returns the allowances to add, the history of the ones to update
+        and the ids of the ones to update grouped by their new value
+        """
+
+        existing = dict(
+            ((allowance.proctored_exam_id, allowance.user_id, allowance.key), allowance)
+            for allowance in cls.objects.select_for_update().filter(
+                proctored_exam_id__in=set(exam_id for exam_id, __, __ in desired),
+                user_id__in=set(user_id for __, user_id, __ in desired)
+            )
+        )
+
+        new_allowances = []
+        archived = []
+        # group the updates by the new value, so every distinct value is a single UPDATE
+        updates = defaultdict(list)
+        for (exam_id, user_id, key), value in desired.iteritems():
+            allowance = existing.get((exam_id, user_id, key))
+            if allowance is None:
+                new_allowances.append(
+                    cls(proctored_exam_id=exam_id, user_id=user_id, key=key, value=value)
+                )
+            elif allowance.value != value:
+                archived.append(
+                    ProctoredExamStudentAllowanceHistory(
+                        allowance_id=allowance.id,
+                        user_id=allowance.user_id,
+                        proctored_exam_id=allowance.proctored_exam_id,
+                        key=allowance.key,
+                        value=allowance.value
+                    )
+                )
+                updates[value].append(allowance.id)
+        return new_allowances, archived, updates
+
     @classmethod
     def get_additional_time_granted(cls, exam_id, user_id):
         """
         Helper method to get the additional time granted
         """
-        allowance = cls.get_allowance_for_user(exam_id, user_id, cls.ADDITIONAL_TIME_GRANTED[0])
-        if allowance:
-            return int(allowance.value)
-
-        return None
+        return cls.get_allowance_bundle(exam_id, user_id).additional_time_granted
 
     @classmethod
     def get_review_policy_exception(cls, exam_id, user_id):
@@ -699,8 +1325,7 @@ class ProctoredExamStudentAllowance(TimeStampedModel):
         Helper method to get the policy exception that reviewers should
         follow
         """
-        allowance = cls.get_allowance_for_user(exam_id, user_id, cls.REVIEW_POLICY_EXCEPTION[0])
-        return allowance.value if allowance else None
+        return cls.get_allowance_bundle(exam_id, user_id).review_policy_exception
 
 
 class ProctoredExamStudentAllowanceHistory(TimeStampedModel):
@@ -720,6 +1345,9 @@ class ProctoredExamStudentAllowanceHistory(TimeStampedModel):
 
     value = models.CharField(max_length=255)
 
+    # which field identifies the versions of the same row, for the delta encoded history
+    history_key = 'allowance_id'
+
     class Meta:
         """ Meta class for this Django model """
         db_table = 'proctoring_proctoredexamstudentallowancehistory'
@@ -735,8 +1363,9 @@ def on_allowance_saved(sender, instance, **kwargs):  # pylint: disable=unused-ar
     """
 
     if instance.id:
-        original = ProctoredExamStudentAllowance.objects.get(id=instance.id)
-        _make_archive_copy(original)
+        original = _get_archivable_original(instance)
+        if original:
+            _make_archive_copy(original)
 
 
 @receiver(pre_delete, sender=ProctoredExamStudentAllowance)
@@ -748,6 +1377,51 @@ def on_allowance_deleted(sender, instance, **kwargs):  # pylint: disable=unused-
     _make_archive_copy(instance)
 
 
+@receiver(post_save, sender=ProctoredExamStudentAllowance)
+@receiver(post_delete, sender=ProctoredExamStudentAllowance)
+def on_allowance_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drop the cached allowance bundle. Inside of a managed transaction the change
+    isn't committed yet, so the bundle is dropped again after the commit, see
+    invalidate_changed_allowance_bundles()
+    """
+
+    exam_user_id = (instance.proctored_exam_id, instance.user_id)
+    ProctoredExamStudentAllowance.invalidate_allowance_bundles([exam_user_id])
+    if transaction.is_managed():
+        if not hasattr(_CHANGED_ALLOWANCE_BUNDLES, 'exam_user_ids'):
+            _CHANGED_ALLOWANCE_BUNDLES.exam_user_ids = set()
+        _CHANGED_ALLOWANCE_BUNDLES.exam_user_ids.add(exam_user_id)
+
+
+def on_request_finished(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    The transaction of the request has been committed or rolled back by now
+    """
+    ProctoredExamStudentAllowance.invalidate_changed_allowance_bundles()
+
+
+request_finished.connect(on_request_finished, dispatch_uid='edx_proctoring.models.allowance_bundles')
+
+
+def _archive_allowances(rows):
+    """
+    Archives the allowances in bulk, given a list of their
+    (id, proctored_exam_id, user_id, key, value) tuples
+    """
+
+    history.archive_many([
+        ProctoredExamStudentAllowanceHistory(
+            allowance_id=allowance_id,
+            user_id=user_id,
+            proctored_exam_id=exam_id,
+            key=key,
+            value=value
+        )
+        for allowance_id, exam_id, user_id, key, value in rows
+    ])
+
+
 def _make_archive_copy(item):
     """
     Make a clone and populate in the History table
@@ -755,15 +1429,76 @@ def _make_archive_copy(item):
 
     archive_object = ProctoredExamStudentAllowanceHistory(
         allowance_id=item.id,
-        user=item.user,
-        proctored_exam=item.proctored_exam,
+        user_id=item.user_id,
+        proctored_exam_id=item.proctored_exam_id,
         key=item.key,
         value=item.value
     )
-    archive_object.save()
+    history.archive(archive_object)
+
+
+def compress_raw_data(raw_data):
+    """
+    Returns the review payload the way it is stored, zlib compressed and base64
+    encoded, as Django 1.4 has no binary model field
+    """
+    if isinstance(raw_data, unicode):
+        raw_data = raw_data.encode('utf-8')
+    return base64.b64encode(zlib.compress(raw_data or ''))
 
 
-class ProctoredExamSoftwareSecureReview(TimeStampedModel):
+def decompress_raw_data(raw_data_compressed):
+    """
+    The reverse of compress_raw_data()
+    """
+    if not raw_data_compressed:
+        return u''
+    return zlib.decompress(base64.b64decode(raw_data_compressed)).decode('utf-8')
+
+
+class CompressedRawDataMixin(object):
+    """
+    The review payloads are rarely looked at, and take up most of the rows of the
+    review tables, so they are stored compressed in the raw_data_compressed column.
+    The raw_data property only decompresses them when it is read. Querysets which
+    don't need the payloads can leave them out with defer('raw_data_compressed',
+    'legacy_raw_data')
+
+    Until the old raw_data column is dropped in 0.11.0, the payloads are also
+    written to it uncompressed, so that the code of the previous release still finds
+    them during a rolling deploy or after a rollback. Once that is no longer needed,
+    PROCTORING_SETTINGS['WRITE_LEGACY_RAW_DATA'] = False stops the second copy. Rows
+    which the previous release wrote without a compressed payload are read from the
+    old column as well
+    """
+
+    @property
+    def raw_data(self):
+        """
+        The review payload, as it was received
+        """
+        raw_data_compressed = self.raw_data_compressed
+        if not raw_data_compressed:
+            return self.legacy_raw_data or u''
+        cached = self.__dict__.get('_raw_data_cache')
+        if cached is None or cached[0] is not raw_data_compressed:
+            cached = (raw_data_compressed, decompress_raw_data(raw_data_compressed))
+            self.__dict__['_raw_data_cache'] = cached
+        return cached[1]
+
+    @raw_data.setter
+    def raw_data(self, value):
+        """
+        Stores the payload compressed, and uncompressed in the old column
+        """
+        self.raw_data_compressed = compress_raw_data(value)
+        if settings.PROCTORING_SETTINGS.get('WRITE_LEGACY_RAW_DATA', True):
+            self.legacy_raw_data = value or u''
+        else:
+            self.legacy_raw_data = u''
+
+
+class ProctoredExamSoftwareSecureReview(CompressedRawDataMixin, TimeStampedModel):
     """
     This is where we store the proctored exam review feedback
     from the exam reviewers
@@ -775,9 +1510,13 @@ class ProctoredExamSoftwareSecureReview(TimeStampedModel):
     # overall status of the review
     review_status = models.CharField(max_length=255)
 
-    # The raw payload that was received back from the
-    # reviewing service
-    raw_data = models.TextField()
+    # The raw payload that was received back from the reviewing
+    # service, compressed, see CompressedRawDataMixin
+    raw_data_compressed = models.TextField(default='')
+
+    # the old uncompressed column of the payload, only kept up to date for the
+    # previous release, see CompressedRawDataMixin
+    legacy_raw_data = models.TextField(default='', db_column='raw_data', editable=False)
 
     # URL for the exam video that had been reviewed
     video_url = models.TextField()
@@ -795,6 +1534,17 @@ class ProctoredExamSoftwareSecureReview(TimeStampedModel):
     # this is null because it is being added after initial production ship
     exam = models.ForeignKey(ProctoredExam, null=True)
 
+    # hash of the payload the review was made from, so that redeliveries of
+    # the same payload can be recognized. Not archived, and None for reviews
+    # which did not come in through the review callback
+    payload_fingerprint = models.CharField(max_length=64, null=True)
+
+    # remembers the values as loaded, so that we can archive them without a read. The
+    # payloads are left out, so that they can be deferred, see on_review_saved()
+    tracker = FieldTracker(
+        fields=['attempt_code', 'review_status', 'video_url', 'reviewed_by_id', 'student_id', 'exam_id']
+    )
+
     class Meta:
         """ Meta class for this Django model """
         db_table = 'proctoring_proctoredexamsoftwaresecurereview'
@@ -803,16 +1553,34 @@ class ProctoredExamSoftwareSecureReview(TimeStampedModel):
     @classmethod
     def get_review_by_attempt_code(cls, attempt_code):
         """
-        Does a lookup by attempt_code
+        Does a lookup by attempt_code. The payload is only loaded when it is read
         """
         try:
-            review = cls.objects.get(attempt_code=attempt_code)
+            review = cls.objects.defer('raw_data_compressed', 'legacy_raw_data').get(attempt_code=attempt_code)
             return review
         except cls.DoesNotExist:  # pylint: disable=no-member
             return None
 
+    @classmethod
+    def is_redelivery(cls, attempt_code, payload_fingerprint):
+        """
+        Returns whether the review of the attempt has already been made from a
+        payload with this fingerprint
+        """
+        return cls.objects.filter(attempt_code=attempt_code, payload_fingerprint=payload_fingerprint).exists()
+
+    @classmethod
+    def get_payload_fingerprints(cls, attempt_codes):
+        """
+        Returns a dict of attempt_code -> payload_fingerprint of the reviews of the
+        given attempts, to recognize many redeliveries at once
+        """
+        return dict(
+            cls.objects.filter(attempt_code__in=attempt_codes).values_list('attempt_code', 'payload_fingerprint')
+        )
+
 
-class ProctoredExamSoftwareSecureReviewHistory(TimeStampedModel):
+class ProctoredExamSoftwareSecureReviewHistory(CompressedRawDataMixin, TimeStampedModel):
     """
     When records get updated, we will archive them here
     """
@@ -823,9 +1591,13 @@ class ProctoredExamSoftwareSecureReviewHistory(TimeStampedModel):
     # overall status of the review
     review_status = models.CharField(max_length=255)
 
-    # The raw payload that was received back from the
-    # reviewing service
-    raw_data = models.TextField()
+    # The raw payload that was received back from the reviewing
+    # service, compressed, see CompressedRawDataMixin
+    raw_data_compressed = models.TextField(default='')
+
+    # the old uncompressed column of the payload, only kept up to date for the
+    # previous release, see CompressedRawDataMixin
+    legacy_raw_data = models.TextField(default='', db_column='raw_data', editable=False)
 
     # URL for the exam video that had been reviewed
     video_url = models.TextField()
@@ -843,6 +1615,9 @@ class ProctoredExamSoftwareSecureReviewHistory(TimeStampedModel):
     # this is null because it is being added after initial production ship
     exam = models.ForeignKey(ProctoredExam, null=True)
 
+    # which field identifies the versions of the same row, for the delta encoded history
+    history_key = 'attempt_code'
+
     class Meta:
         """ Meta class for this Django model """
         db_table = 'proctoring_proctoredexamsoftwaresecurereviewhistory'
@@ -857,10 +1632,28 @@ def on_review_saved(sender, instance, **kwargs):  # pylint: disable=unused-argum
     Will only archive on update, and not on new entries created.
     """
 
-    if instance.id:
+    if not instance.id:
         # only for update cases
-        original = ProctoredExamSoftwareSecureReview.objects.get(id=instance.id)
-        _make_review_archive_copy(original)
+        return
+
+    # the payloads aren't tracked, read them back to see whether they changed, and
+    # to archive them
+    payloads = ProctoredExamSoftwareSecureReview.objects.filter(id=instance.id).values(
+        'raw_data_compressed', 'legacy_raw_data'
+    )
+    if not payloads:
+        return
+    payload = payloads[0]
+
+    original = _get_archivable_original(instance)
+    if original is None:
+        # a deferred payload which hasn't been loaded, hasn't been changed either
+        if all(instance.__dict__.get(field, value) == value for field, value in payload.iteritems()):
+            return
+        original = instance.__class__(id=instance.id, **instance.tracker.saved_data)
+    original.raw_data_compressed = payload['raw_data_compressed']
+    original.legacy_raw_data = payload['legacy_raw_data']
+    _make_review_archive_copy(original)
 
 
 @receiver(pre_delete, sender=ProctoredExamSoftwareSecureReview)
@@ -872,6 +1665,18 @@ def on_review_deleted(sender, instance, **kwargs):  # pylint: disable=unused-arg
     _make_review_archive_copy(instance)
 
 
+@receiver(class_prepared)
+def on_class_prepared(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Django 1.4 sends the save and delete signals of deferred instances with their
+    deferred class as the sender, so connect the archiving of reviews to those too
+    """
+
+    if sender._deferred and issubclass(sender, ProctoredExamSoftwareSecureReview):  # pylint: disable=protected-access
+        pre_save.connect(on_review_saved, sender=sender)
+        pre_delete.connect(on_review_deleted, sender=sender)
+
+
 def _make_review_archive_copy(instance):
     """
     Do the copying into the history table
@@ -880,13 +1685,14 @@ def _make_review_archive_copy(instance):
     archive_object = ProctoredExamSoftwareSecureReviewHistory(
         attempt_code=instance.attempt_code,
         review_status=instance.review_status,
-        raw_data=instance.raw_data,
+        raw_data_compressed=instance.raw_data_compressed,
+        legacy_raw_data=instance.legacy_raw_data,
         video_url=instance.video_url,
-        reviewed_by=instance.reviewed_by,
-        student=instance.student,
-        exam=instance.exam,
+        reviewed_by_id=instance.reviewed_by_id,
+        student_id=instance.student_id,
+        exam_id=instance.exam_id,
     )
-    archive_object.save()
+    history.archive(archive_object)
 
 
 class ProctoredExamSoftwareSecureComment(TimeStampedModel):
@@ -917,3 +1723,235 @@ class ProctoredExamSoftwareSecureComment(TimeStampedModel):
         """ Meta class for this Django model """
         db_table = 'proctoring_proctoredexamstudentattemptcomment'
         verbose_name = 'proctored exam software secure comment'
+
+
+# these fields are kept in the delta rows themselves
+DELTA_UNENCODED_FIELDS = ('id', 'created', 'modified')
+
+DEFAULT_HISTORY_SNAPSHOT_INTERVAL = 10
+
+
+def _get_history_state(history_object):
+    """
+    Returns the fields of the (unsaved) history model instance as a dict, in the
+    form they take in JSON, so that they can be compared with decoded versions
+    """
+
+    state = dict(
+        (field.attname, getattr(history_object, field.attname))
+        for field in history_object._meta.fields  # pylint: disable=protected-access
+        if field.attname not in DELTA_UNENCODED_FIELDS
+    )
+    return json.loads(json.dumps(state, cls=DjangoJSONEncoder))
+
+
+def _encode_history_state(version, previous_state, state, snapshot_interval):
+    """
+    Returns a (is_snapshot, data) tuple, for storing the given version of a row
+    """
+
+    if previous_state is None or version % snapshot_interval == 0:
+        return True, state
+    return False, dict(
+        (name, value) for name, value in state.iteritems() if previous_state.get(name) != value
+    )
+
+
+class ProctoredExamHistoryDelta(TimeStampedModel):
+    """
+    With PROCTORING_SETTINGS['HISTORY_FORMAT'] = 'delta' the archive copies of the
+    history models which have a history_key are stored here, instead of in their
+    own tables. Every HISTORY_SNAPSHOT_INTERVAL versions of a row we store all of
+    its fields, in between just the ones which changed.
+    """
+
+    # the history table this version belongs to
+    history_table = models.CharField(max_length=255)
+
+    # the value of the history_key, e.g. the allowance_id
+    original_key = models.CharField(max_length=255)
+
+    # the versions of a row are numbered from 0, in the order they were archived
+    version = models.IntegerField()
+
+    # whether data holds all of the fields or just the changed ones
+    is_snapshot = models.BooleanField(default=False)
+
+    # JSON dict of field attname -> value
+    data = models.TextField()
+
+    class Meta:
+        """ Meta class for this Django model """
+        unique_together = (('history_table', 'original_key', 'version'),)
+        db_table = 'proctoring_proctoredexamhistorydelta'
+        verbose_name = 'proctored exam history delta'
+
+    @classmethod
+    def get_snapshot_interval(cls):
+        """
+        Returns the configured HISTORY_SNAPSHOT_INTERVAL
+        """
+        return settings.PROCTORING_SETTINGS.get('HISTORY_SNAPSHOT_INTERVAL', DEFAULT_HISTORY_SNAPSHOT_INTERVAL)
+
+    @classmethod
+    def get_original_key(cls, history_object):
+        """
+        Returns the key of the row the history object is a version of, or None
+        if it can't be delta encoded
+        """
+        history_key = getattr(history_object, 'history_key', None)
+        if history_key is None:
+            return None
+        value = getattr(history_object, history_key)
+        return unicode(value) if value is not None else None
+
+    @classmethod
+    def encode(cls, history_objects):
+        """
+        Turns the (unsaved) history model instances into (unsaved) deltas. Instances
+        which can't be delta encoded are passed through as they are
+        """
+
+        snapshot_interval = cls.get_snapshot_interval()
+        # (history_table, original_key) -> (version, state) of the most recent version
+        latest = {}
+        encoded = []
+        for history_object in history_objects:
+            original_key = cls.get_original_key(history_object)
+            if original_key is None:
+                encoded.append(history_object)
+                continue
+
+            history_table = history_object._meta.db_table  # pylint: disable=protected-access
+            if (history_table, original_key) not in latest:
+                latest[(history_table, original_key)] = cls._get_latest_state(history_table, original_key)
+            previous_version, previous_state = latest[(history_table, original_key)]
+
+            version = previous_version + 1
+            state = _get_history_state(history_object)
+            is_snapshot, data = _encode_history_state(version, previous_state, state, snapshot_interval)
+            encoded.append(
+                cls(
+                    created=history_object.created,
+                    history_table=history_table,
+                    original_key=original_key,
+                    version=version,
+                    is_snapshot=is_snapshot,
+                    data=json.dumps(data),
+                )
+            )
+            latest[(history_table, original_key)] = (version, state)
+
+        return encoded
+
+    @classmethod
+    def _get_deltas(cls, history_table, original_key, version=None):
+        """
+        Returns the deltas needed to rebuild the given (or the most recent) version,
+        i.e. the closest snapshot and everything after it, in order
+        """
+
+        deltas = cls.objects.filter(history_table=history_table, original_key=original_key)
+        if version is not None:
+            deltas = deltas.filter(version__lte=version)
+
+        snapshot_versions = deltas.filter(is_snapshot=True).order_by('-version').values_list('version', flat=True)[:1]
+        if not snapshot_versions:
+            return []
+        return list(deltas.filter(version__gte=snapshot_versions[0]).order_by('version'))
+
+    @classmethod
+    def _get_latest_state(cls, history_table, original_key):
+        """
+        Returns a (version, state) tuple of the most recent version of
+        the row, or (-1, None) if there are none yet
+        """
+
+        version, state = -1, None
+        for delta in cls._get_deltas(history_table, original_key):
+            state = dict(state or {}, **json.loads(delta.data))
+            version = delta.version
+        return version, state
+
+    @classmethod
+    def _decode(cls, history_model, delta, state):
+        """
+        Builds an (unsaved) history model instance out of the rebuilt state
+        """
+
+        values = dict(state)
+        for field in history_model._meta.fields:  # pylint: disable=protected-access
+            if isinstance(field, DateTimeField) and values.get(field.attname):
+                values[field.attname] = parse_datetime(values[field.attname])
+        return history_model(created=delta.created, modified=delta.created, **values)
+
+    @classmethod
+    def get_versions(cls, history_model, original_key):
+        """
+        Returns all of the archived versions of a row as (unsaved) instances
+        of the history model, oldest first
+        """
+
+        versions = []
+        state = None
+        deltas = cls.objects.filter(
+            history_table=history_model._meta.db_table,  # pylint: disable=protected-access
+            original_key=unicode(original_key)
+        ).order_by('version')
+        for delta in deltas:
+            state = dict(state or {}, **json.loads(delta.data))
+            versions.append(cls._decode(history_model, delta, state))
+        return versions
+
+    @classmethod
+    def get_version(cls, history_model, original_key, version):
+        """
+        Rebuilds the given version of a row, as an (unsaved) instance of the
+        history model, or returns None if there is no such version
+        """
+
+        state = None
+        delta = None
+        for delta in cls._get_deltas(
+                history_model._meta.db_table,  # pylint: disable=protected-access
+                unicode(original_key),
+                version
+        ):
+            state = dict(state or {}, **json.loads(delta.data))
+
+        if delta is None or delta.version != version:
+            return None
+        return cls._decode(history_model, delta, state)
+
+    @classmethod
+    def estimate_savings(cls, history_model, snapshot_interval=None):
+        """
+        Works out how much space the rows of the history model would take up delta
+        encoded, compared to full copies. Returns a dict with the number of rows,
+        and the JSON encoded size of the full and of the delta encoded rows
+        """
+
+        snapshot_interval = snapshot_interval or cls.get_snapshot_interval()
+        result = {'rows': 0, 'full_bytes': 0, 'delta_bytes': 0}
+
+        # original_key -> (version, state) of the most recent version
+        latest = {}
+        history_objects = history_model.objects.order_by('id').iterator()
+        for history_object in history_objects:
+            state = _get_history_state(history_object)
+            full_size = len(json.dumps(state))
+            result['rows'] += 1
+            result['full_bytes'] += full_size
+
+            original_key = cls.get_original_key(history_object)
+            if original_key is None:
+                result['delta_bytes'] += full_size
+                continue
+
+            previous_version, previous_state = latest.get(original_key, (-1, None))
+            version = previous_version + 1
+            __, data = _encode_history_state(version, previous_state, state, snapshot_interval)
+            result['delta_bytes'] += len(json.dumps(data))
+            latest[original_key] = (version, state)
+
+        return result
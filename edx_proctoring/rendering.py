@@ -0,0 +1,257 @@
+"""
+Helpers for rendering the proctoring views, which are called on every courseware
+page view inside of an exam sequence, so we want to avoid doing repeated work
+"""
+
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template import Context, loader
+from django.core.urlresolvers import get_script_prefix, reverse, NoReverseMatch
+from django.utils.translation import get_language
+
+
+# get_student_view_state refers to templates by their key, e.g. 'seq_timed_exam_entrance'
+STUDENT_VIEW_TEMPLATE_PATH = 'proctoring/{key}.html'
+
+# All of the templates that get_student_view can render
+STUDENT_VIEW_TEMPLATES = (
+    'proctoring/seq_proctored_exam_entrance.html',
+    'proctoring/seq_proctored_exam_error.html',
+    'proctoring/seq_proctored_exam_instructions.html',
+    'proctoring/seq_proctored_exam_ready_to_start.html',
+    'proctoring/seq_proctored_exam_ready_to_submit.html',
+    'proctoring/seq_proctored_exam_rejected.html',
+    'proctoring/seq_proctored_exam_submitted.html',
+    'proctoring/seq_proctored_exam_verified.html',
+    'proctoring/seq_proctored_practice_exam_entrance.html',
+    'proctoring/seq_proctored_practice_exam_error.html',
+    'proctoring/seq_proctored_practice_exam_submitted.html',
+    'proctoring/seq_timed_exam_entrance.html',
+    'proctoring/seq_timed_exam_expired.html',
+    'proctoring/seq_timed_exam_ready_to_submit.html',
+)
+
+# The student view templates which have an underscore counterpart in
+# static/proctoring/templates, so that the proctoring static bundle can render
+# them on the client. The others carry their own inline scripts and are
+# still rendered on the server
+CLIENT_RENDERABLE_TEMPLATES = frozenset([
+    'seq_proctored_exam_error',
+    'seq_proctored_exam_rejected',
+    'seq_proctored_exam_submitted',
+    'seq_proctored_exam_verified',
+    'seq_timed_exam_expired',
+])
+
+# The student view templates whose output only depends on the exam, the locale and
+# the platform/provider configuration, but never on the user or their attempt, so
+# the rendered page can be shared by everybody taking the exam
+FRAGMENT_CACHEABLE_TEMPLATES = frozenset([
+    'seq_proctored_exam_entrance',
+    'seq_proctored_exam_error',
+    'seq_proctored_exam_rejected',
+    'seq_proctored_exam_submitted',
+    'seq_proctored_exam_verified',
+    'seq_proctored_practice_exam_entrance',
+    'seq_proctored_practice_exam_error',
+    'seq_proctored_practice_exam_submitted',
+    'seq_timed_exam_entrance',
+    'seq_timed_exam_expired',
+])
+
+# The state values which can end up in the FRAGMENT_CACHEABLE_TEMPLATES, other than
+# the exam_id. These go into the cache key, so that e.g. switching the proctoring
+# provider of a course (and so the link_urls) doesn't serve stale pages
+FRAGMENT_STATE_KEYS = (
+    'display_name',
+    'total_time',
+    'platform_name',
+    'link_urls',
+)
+FRAGMENT_URL_KEYS = (
+    'progress_page_url',
+    'enter_exam_endpoint',
+)
+
+# upper bound on the number of reversed urls we keep around, since
+# some of them are per attempt
+MAX_CACHED_URLS = 10000
+
+_COMPILED_TEMPLATES = {}
+_REVERSED_URLS = {}
+
+
+def _is_caching_enabled():
+    """
+    When developing templates we want to see changes without a restart
+    """
+    return not getattr(settings, 'TEMPLATE_DEBUG', False)
+
+
+def get_template(template_name):
+    """
+    Returns the compiled template, compiling it only the first time
+    it is asked for
+    """
+
+    if not _is_caching_enabled():
+        return loader.get_template(template_name)
+
+    template = _COMPILED_TEMPLATES.get(template_name)
+    if template is None:
+        template = loader.get_template(template_name)
+        _COMPILED_TEMPLATES[template_name] = template
+
+    return template
+
+
+def precompile_templates():
+    """
+    Compiles all of the student view templates, so that the first
+    students entering an exam don't have to pay for it
+    """
+
+    for template_name in STUDENT_VIEW_TEMPLATES:
+        get_template(template_name)
+
+
+def memoized_reverse(view_name, args=None, fail_silently=False):
+    """
+    Same as Django's reverse(), but remembers the results. The urls depend on the
+    script prefix, which can differ from request to request, so it is part of the
+    key. Failures are not remembered, as the view could still get registered. If
+    fail_silently is set, then an empty string is returned if the view_name can't
+    be resolved, which can happen when we are not running in-proc with the
+    edx-platform LMS (for example unit tests)
+    """
+
+    key = (get_script_prefix(), view_name, tuple(args) if args else ())
+
+    url = _REVERSED_URLS.get(key)
+    if url is None:
+        try:
+            url = reverse(view_name, args=args)
+        except NoReverseMatch:
+            if not fail_silently:
+                raise
+            return ''
+
+        if len(_REVERSED_URLS) >= MAX_CACHED_URLS:
+            _REVERSED_URLS.clear()
+        _REVERSED_URLS[key] = url
+
+    return url
+
+
+def clear_caches():
+    """
+    Drops all compiled templates and reversed urls
+    """
+
+    _COMPILED_TEMPLATES.clear()
+    _REVERSED_URLS.clear()
+
+
+def _get_fragment_cache_timeout():
+    """
+    How long, in seconds, to keep rendered pages around. A timeout of 0 turns
+    the fragment cache off
+    """
+    return settings.PROCTORING_SETTINGS.get('FRAGMENT_CACHE_TIMEOUT', 3600)
+
+
+def _get_exam_fragments_version_key(exam_id):
+    """
+    Cache key of the current version of the rendered pages of an exam
+    """
+    return 'edx_proctoring.fragments.version.{exam_id}'.format(exam_id=exam_id)
+
+
+def _get_exam_fragments_version(exam_id):
+    """
+    Returns the current version of the rendered pages of an exam, starting a
+    new one if there is none
+    """
+
+    key = _get_exam_fragments_version_key(exam_id)
+    version = cache.get(key)
+    if version is None:
+        # add() so that concurrent requests agree on the version
+        cache.add(key, uuid.uuid4().hex, _get_fragment_cache_timeout())
+        version = cache.get(key)
+    return version
+
+
+def invalidate_exam_fragments(exam_id):
+    """
+    Drops all the rendered pages of an exam, e.g. when it has been updated
+    """
+
+    cache.delete(_get_exam_fragments_version_key(exam_id))
+
+
+def _get_fragment_key(state):
+    """
+    Returns the cache key for the rendered page described by the state
+    """
+
+    config = dict((key, state.get(key)) for key in FRAGMENT_STATE_KEYS)
+    config.update((key, state['urls'].get(key)) for key in FRAGMENT_URL_KEYS)
+    config_version = hashlib.md5(
+        json.dumps(config, sort_keys=True, default=unicode).encode('utf-8')
+    ).hexdigest()
+
+    return 'edx_proctoring.fragments.{exam_id}.{version}.{template}.{locale}.{config_version}'.format(
+        exam_id=state['exam_id'],
+        version=_get_exam_fragments_version(state['exam_id']),
+        template=state['template'],
+        locale=get_language(),
+        config_version=config_version,
+    )
+
+
+def render_student_view(state, context=None):
+    """
+    Renders the state returned by api.get_student_view_state on the server side.
+    Any additional context (e.g. what the courseware passed in) is made available
+    to the template as well.
+
+    Pages which are the same for everybody taking the exam are only rendered
+    once and then served out of the cache
+    """
+
+    use_fragment_cache = (
+        state['template'] in FRAGMENT_CACHEABLE_TEMPLATES and
+        _is_caching_enabled() and
+        _get_fragment_cache_timeout()
+    )
+
+    if use_fragment_cache:
+        fragment_key = _get_fragment_key(state)
+        html = cache.get(fragment_key)
+        if html is None:
+            html = _render_student_view(state, context)
+            cache.set(fragment_key, html, _get_fragment_cache_timeout())
+        return html
+
+    return _render_student_view(state, context)
+
+
+def _render_student_view(state, context):
+    """
+    Does the actual rendering for render_student_view
+    """
+
+    template = get_template(STUDENT_VIEW_TEMPLATE_PATH.format(key=state['template']))
+
+    # the templates expect the urls at the top level
+    template_context = dict(state)
+    template_context.update(template_context.pop('urls'))
+
+    django_context = Context(context or {})
+    django_context.update(template_context)
+    return template.render(django_context)
@@ -0,0 +1,379 @@
+"""
+Retention of the history tables, which otherwise only ever grow. Rows older
+than the retention period are moved out of the database into gzipped JSON-lines
+files, one file per table and day the rows were created, e.g.
+
+    <HISTORY_ARCHIVE_DIR>/proctoring_proctoredexamstudentattempthistory/2015-09-01.jsonl.gz
+
+The delta encoded history rows are moved the same way, except for the ones which
+are still needed to rebuild the versions of their row: every row keeps its most
+recent snapshot from before the cutoff, along with all of the later versions.
+
+Archived attempts can still be looked up by their attempt code, through an
+index which is written alongside of the attempt archives. The index is split
+into files by a hash of the attempt code, so a lookup only reads one of them,
+and the results of the lookups (found or not) are cached.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytz
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import DateTimeField, Max
+from django.utils.dateparse import parse_datetime
+
+from edx_proctoring import history
+from edx_proctoring.models import (
+    ProctoredExamAttemptCodeIndex,
+    ProctoredExamHistoryDelta,
+    ProctoredExamReviewPolicyHistory,
+    ProctoredExamSoftwareSecureReviewHistory,
+    ProctoredExamStudentAllowanceHistory,
+    ProctoredExamStudentAttemptHistory,
+)
+
+log = logging.getLogger(__name__)
+
+# all of the tables which the retention applies to
+HISTORY_MODELS = (
+    ProctoredExamStudentAttemptHistory,
+    ProctoredExamStudentAllowanceHistory,
+    ProctoredExamReviewPolicyHistory,
+    ProctoredExamSoftwareSecureReviewHistory,
+    ProctoredExamHistoryDelta,
+)
+
+DEFAULT_HISTORY_RETENTION_DAYS = 365
+
+# how many rows to move per transaction
+RETENTION_CHUNK_SIZE = 500
+
+ARCHIVE_FILE_SUFFIX = '.jsonl.gz'
+
+# maps attempt codes to the archive files of the attempt history table, this
+# directory holds one index file per first two hex digits of the md5 of the code
+ATTEMPT_CODE_INDEX_DIRNAME = 'attempt_code_index'
+
+# the single index file which was written before it was split up
+LEGACY_ATTEMPT_CODE_INDEX_FILENAME = 'attempt_code_index.jsonl'
+
+DEFAULT_ARCHIVED_ATTEMPT_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def get_archive_dir():
+    """
+    Returns the configured HISTORY_ARCHIVE_DIR, or None if archiving is not set up
+    """
+    return settings.PROCTORING_SETTINGS.get('HISTORY_ARCHIVE_DIR')
+
+
+def get_retention_days():
+    """
+    Returns the configured HISTORY_RETENTION_DAYS
+    """
+    return settings.PROCTORING_SETTINGS.get('HISTORY_RETENTION_DAYS', DEFAULT_HISTORY_RETENTION_DAYS)
+
+
+def _get_table_dir(archive_dir, model):
+    """
+    Returns the directory which holds the archives of the given history model
+    """
+    return os.path.join(archive_dir, model._meta.db_table)  # pylint: disable=protected-access
+
+
+def _write_archives(table_dir, rows):
+    """
+    Appends the rows to the archive files of the days they were created on,
+    returns a dict of archive filename -> rows written to it
+    """
+
+    by_filename = defaultdict(list)
+    for row in rows:
+        by_filename[row['created'].strftime('%Y-%m-%d') + ARCHIVE_FILE_SUFFIX].append(row)
+
+    for filename, file_rows in by_filename.iteritems():
+        # appending adds another gzip member to the file, which gzip reads back as one stream
+        with gzip.open(os.path.join(table_dir, filename), 'ab') as archive_file:
+            for row in file_rows:
+                archive_file.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+
+    return by_filename
+
+
+def _get_index_filename(table_dir, attempt_code):
+    """
+    Returns the name of the index file which holds the given attempt code
+    """
+    digest = hashlib.md5(attempt_code.encode('utf-8')).hexdigest()
+    return os.path.join(table_dir, ATTEMPT_CODE_INDEX_DIRNAME, digest[:2] + '.jsonl')
+
+
+def _get_lookup_cache_key(archive_dir, attempt_code):
+    """
+    Cache key of the archive files of an attempt code
+    """
+    return 'edx_proctoring.retention.archived_attempt.{archive_dir}.{attempt_code}'.format(
+        archive_dir=hashlib.md5(archive_dir.encode('utf-8')).hexdigest(),
+        attempt_code=attempt_code
+    )
+
+
+def _write_attempt_code_index(archive_dir, table_dir, by_filename):
+    """
+    Records which archive files the attempt codes went to
+    """
+
+    entries = defaultdict(list)
+    for filename, rows in by_filename.iteritems():
+        for row in rows:
+            if row['attempt_code']:
+                entries[_get_index_filename(table_dir, row['attempt_code'])].append(
+                    {'attempt_code': row['attempt_code'], 'file': filename}
+                )
+
+    index_dir = os.path.join(table_dir, ATTEMPT_CODE_INDEX_DIRNAME)
+    if not os.path.isdir(index_dir):
+        os.makedirs(index_dir)
+    for index_filename, index_entries in entries.iteritems():
+        with open(index_filename, 'a') as index_file:
+            for entry in index_entries:
+                index_file.write(json.dumps(entry) + '\n')
+
+    # the lookups which found nothing so far would now find something
+    cache.delete_many([
+        _get_lookup_cache_key(archive_dir, entry['attempt_code'])
+        for index_entries in entries.itervalues()
+        for entry in index_entries
+    ])
+
+
+def _split_legacy_attempt_code_index(archive_dir, table_dir):
+    """
+    Moves the entries of the index file which was written before the index
+    was split up into the split index files
+    """
+
+    legacy_filename = os.path.join(table_dir, LEGACY_ATTEMPT_CODE_INDEX_FILENAME)
+    if not os.path.exists(legacy_filename):
+        return
+
+    by_filename = defaultdict(list)
+    with open(legacy_filename) as legacy_file:
+        for line in legacy_file:
+            entry = json.loads(line)
+            by_filename[entry['file']].append({'attempt_code': entry['attempt_code']})
+
+    _write_attempt_code_index(archive_dir, table_dir, by_filename)
+    os.remove(legacy_filename)
+
+
+def _get_superseded_deltas(rows, cutoff):
+    """
+    Leaves out the delta rows which are still needed to rebuild the versions of
+    their row, that is the most recent snapshot created before the cutoff and
+    everything after it
+    """
+
+    original_keys = set((row['history_table'], row['original_key']) for row in rows)
+    snapshot_versions = {}
+    for snapshot in ProctoredExamHistoryDelta.objects.filter(
+            created__lt=cutoff,
+            is_snapshot=True,
+            history_table__in=set(history_table for history_table, __ in original_keys),
+            original_key__in=set(original_key for __, original_key in original_keys)
+    ).values('history_table', 'original_key').annotate(snapshot_version=Max('version')):
+        snapshot_versions[(snapshot['history_table'], snapshot['original_key'])] = snapshot['snapshot_version']
+
+    return [
+        row for row in rows
+        if row['version'] < snapshot_versions.get((row['history_table'], row['original_key']), -1)
+    ]
+
+
+def archive_model_history(model, cutoff, archive_dir, chunk_size=RETENTION_CHUNK_SIZE):
+    """
+    Moves the rows of the history model which were created before the cutoff
+    into the archive files, one chunk at a time. The files are written before
+    the rows get deleted, so an interrupted run never loses any rows (but can
+    archive a chunk twice). Returns the number of rows moved
+    """
+
+    table_dir = _get_table_dir(archive_dir, model)
+    if not os.path.isdir(table_dir):
+        os.makedirs(table_dir)
+    if model is ProctoredExamStudentAttemptHistory:
+        _split_legacy_attempt_code_index(archive_dir, table_dir)
+
+    moved = 0
+    last_id = 0
+    while True:
+        # history rows are append only, so walking the primary key
+        # visits them in the order they were created
+        rows = list(
+            model.objects.filter(id__gt=last_id, created__lt=cutoff).order_by('id').values()[:chunk_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+
+        if model is ProctoredExamHistoryDelta:
+            rows = _get_superseded_deltas(rows, cutoff)
+            if not rows:
+                continue
+
+        by_filename = _write_archives(table_dir, rows)
+        if model is ProctoredExamStudentAttemptHistory:
+            _write_attempt_code_index(archive_dir, table_dir, by_filename)
+
+        row_ids = [row['id'] for row in rows]
+        with transaction.commit_on_success():
+            if model is ProctoredExamStudentAttemptHistory:
+                ProctoredExamAttemptCodeIndex.on_attempts_retained(row_ids, [row['attempt_code'] for row in rows])
+            model.objects.filter(id__in=row_ids).delete()
+
+        moved += len(rows)
+
+    return moved
+
+
+def archive_history(retention_days=None, archive_dir=None, chunk_size=RETENTION_CHUNK_SIZE):
+    """
+    Moves all history rows which are older than the retention period into the
+    archive. Returns a dict of table name -> number of rows moved
+    """
+
+    archive_dir = archive_dir or get_archive_dir()
+    if not archive_dir:
+        raise ValueError('No HISTORY_ARCHIVE_DIR has been configured')
+
+    if retention_days is None:
+        retention_days = get_retention_days()
+    cutoff = datetime.now(pytz.UTC) - timedelta(days=retention_days)
+
+    # make sure that all rows which have been archived so far are in the tables
+    history.flush()
+
+    result = {}
+    for model in HISTORY_MODELS:
+        moved = archive_model_history(model, cutoff, archive_dir, chunk_size=chunk_size)
+        log_msg = (
+            'Moved {moved} rows created before {cutoff} from {table} into {archive_dir}'.format(
+                moved=moved,
+                cutoff=cutoff,
+                table=model._meta.db_table,  # pylint: disable=protected-access
+                archive_dir=archive_dir
+            )
+        )
+        log.info(log_msg)
+        result[model._meta.db_table] = moved  # pylint: disable=protected-access
+    return result
+
+
+def _parse_row(model, row):
+    """
+    Turns the dates of an archived row back into datetimes
+    """
+
+    for field in model._meta.fields:  # pylint: disable=protected-access
+        if isinstance(field, DateTimeField) and row.get(field.attname):
+            row[field.attname] = parse_datetime(row[field.attname])
+    return row
+
+
+def _find_archive_filenames(table_dir, attempt_codes):
+    """
+    Returns a dict of attempt_code -> set of the archive files the attempt code
+    is in, which holds all of the given attempt codes. Each index file is read once
+    """
+
+    filenames = dict((attempt_code, set()) for attempt_code in attempt_codes)
+
+    index_filenames = set(_get_index_filename(table_dir, attempt_code) for attempt_code in attempt_codes)
+    # until the next archive_history() run, the old index file is still around
+    index_filenames.add(os.path.join(table_dir, LEGACY_ATTEMPT_CODE_INDEX_FILENAME))
+
+    for index_filename in index_filenames:
+        if not os.path.exists(index_filename):
+            continue
+        with open(index_filename) as index_file:
+            for line in index_file:
+                entry = json.loads(line)
+                if entry['attempt_code'] in filenames:
+                    filenames[entry['attempt_code']].add(entry['file'])
+    return filenames
+
+
+def find_archived_attempts_by_codes(attempt_codes, archive_dir=None):
+    """
+    Looks the attempts up in the archive files of the attempt history table.
+    Like ProctoredExamStudentAttemptHistory.get_exam_attempt_by_code() this
+    finds the most recently created match of every attempt code. Returns a dict
+    of attempt_code -> attempt, which leaves out the ones which are not archived
+    """
+
+    archive_dir = archive_dir or get_archive_dir()
+    if not archive_dir or not attempt_codes:
+        return {}
+
+    table_dir = _get_table_dir(archive_dir, ProctoredExamStudentAttemptHistory)
+
+    # the archive files of the attempt codes, or an empty list for the ones which are not archived
+    cache_keys = dict(
+        (_get_lookup_cache_key(archive_dir, attempt_code), attempt_code) for attempt_code in set(attempt_codes)
+    )
+    cached = cache.get_many(cache_keys.keys())
+    filenames = dict((cache_keys[cache_key], set(value)) for cache_key, value in cached.iteritems())
+
+    unknown = [attempt_code for attempt_code in cache_keys.itervalues() if attempt_code not in filenames]
+    if unknown:
+        found = _find_archive_filenames(table_dir, unknown)
+        cache.set_many(
+            dict(
+                (_get_lookup_cache_key(archive_dir, attempt_code), sorted(code_filenames))
+                for attempt_code, code_filenames in found.iteritems()
+            ),
+            settings.PROCTORING_SETTINGS.get(
+                'ARCHIVED_ATTEMPT_CACHE_TIMEOUT',
+                DEFAULT_ARCHIVED_ATTEMPT_CACHE_TIMEOUT
+            )
+        )
+        filenames.update(found)
+
+    by_filename = defaultdict(set)
+    for attempt_code, code_filenames in filenames.iteritems():
+        for filename in code_filenames:
+            by_filename[filename].add(attempt_code)
+
+    matches = {}
+    for filename, file_attempt_codes in by_filename.iteritems():
+        with gzip.open(os.path.join(table_dir, filename), 'rb') as archive_file:
+            for line in archive_file:
+                row = json.loads(line)
+                if row['attempt_code'] not in file_attempt_codes:
+                    continue
+                row = _parse_row(ProctoredExamStudentAttemptHistory, row)
+                match = matches.get(row['attempt_code'])
+                if match is None or row['created'] > match['created']:
+                    matches[row['attempt_code']] = row
+
+    # unsaved instances, as they no longer have a row in the table
+    return dict(
+        (attempt_code, ProctoredExamStudentAttemptHistory(**row)) for attempt_code, row in matches.iteritems()
+    )
+
+
+def find_archived_attempt_by_code(attempt_code, archive_dir=None):
+    """
+    Looks the attempt up in the archive files of the attempt history table,
+    returns the most recently created match, or None
+    """
+    return find_archived_attempts_by_codes([attempt_code], archive_dir=archive_dir).get(attempt_code)
@@ -29,8 +29,13 @@ class ProctoringService(object):
         as a direct pass through
         """
         from edx_proctoring import api as edx_proctoring_api
+        from edx_proctoring.rendering import precompile_templates
         self._bind_to_module_functions(edx_proctoring_api)
 
+        # compile the student view templates up front, rather than
+        # on the first courseware page view inside an exam
+        precompile_templates()
+
     def _bind_to_module_functions(self, module):
         """
         bind module functions. Since we use underscores to mean private methods, let's exclude those.
@@ -0,0 +1,242 @@
+"""
+A local stand-in for SoftwareSecure, to load test the proctoring subsystem
+without talking to the real service. It implements the exam registration
+endpoint, with configurable latency and injected errors, and posts generated
+reviews back to the review callbacks of the LMS. It can be run with the
+'software_secure_simulator' management command, e.g.
+
+    ./manage.py software_secure_simulator --port=8088 --latency=0.2 --error-rate=0.05 \\
+        --review-url=http://localhost:8000/api/edx_proctoring/proctoring_review_callback/
+
+and then used by pointing the exam_register_endpoint of the SoftwareSecure
+backend provider at http://localhost:8088/
+"""
+
+import BaseHTTPServer
+import SocketServer
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+
+import requests
+
+log = logging.getLogger(__name__)
+
+
+def build_review_payload(attempt_code, ssi_record_locator, review_status='Clean'):
+    """
+    Returns a review like the ones SoftwareSecure posts to the review callback
+    """
+
+    return {
+        'examDate': time.strftime('%b %d %Y %I:%M%p'),
+        'examProcessingStatus': 'Review Completed',
+        'examTakerEmail': attempt_code,
+        'examTakerFirstName': 'Simulated',
+        'examTakerLastName': 'Student',
+        'keySetVersion': '',
+        'overAllComments': 'Reviewed by the SoftwareSecure simulator',
+        'reviewStatus': review_status,
+        'userPhotoBase64String': '',
+        'videoReviewLink': 'http://localhost/video/{locator}'.format(locator=ssi_record_locator),
+        'examMetaData': {
+            'examCode': attempt_code,
+            'reviewedExam': 'True',
+            'simulatedExam': 'True',
+            'ssiExamToken': unicode(uuid.uuid4()).upper(),
+            'ssiProduct': 'rp-now',
+            'ssiRecordLocator': ssi_record_locator,
+        },
+        'desktopComments': [
+            {
+                'comments': 'Browsing other websites',
+                'duration': 88,
+                'eventFinish': 88,
+                'eventStart': 12,
+                'eventStatus': 'Clean' if review_status == 'Clean' else 'Suspicious',
+            },
+        ],
+        'webCamComments': [
+            {
+                'comments': 'Looking away from computer',
+                'duration': 796,
+                'eventFinish': 796,
+                'eventStart': 107,
+                'eventStatus': 'Clean' if review_status == 'Clean' else review_status,
+            },
+        ],
+    }
+
+
+class _ThreadingHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    Handles every request in a thread of its own, like the real service would
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Passes the registrations on to the simulator of the server
+    """
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """
+        Exam registration
+        """
+        body = self.rfile.read(int(self.headers.getheader('Content-Length') or 0))
+        status, content = self.server.simulator.handle_registration(body, self.headers.getheader('Authorization'))
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """
+        Goes to the log, instead of stderr
+        """
+        log.debug(format, *args)
+
+
+class SoftwareSecureSimulator(object):
+    """
+    The stand-in service. Every registration takes latency seconds plus a random
+    time up to latency_jitter, and with a probability of error_rate it fails with
+    one of the error_statuses instead. The reviews of the registered exams are
+    posted to the review_url one by one, or in lists of bulk_size to the bulk_review_url
+    """
+
+    def __init__(self, host='localhost', port=0, latency=0.0, latency_jitter=0.0,
+                 error_rate=0.0, error_statuses=(503,), review_url=None, bulk_review_url=None,
+                 bulk_size=50, review_status='Clean', seed=None):
+        """
+        Class initializer, port 0 picks a free port
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.review_url = review_url
+        self.bulk_review_url = bulk_review_url
+        self.bulk_size = bulk_size
+        self.review_status = review_status
+
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        # attempt code -> ssiRecordLocator of the registrations which have not been reviewed yet
+        self.unreviewed = {}
+        self.stats = {'registered': 0, 'errors': 0, 'reviewed': 0, 'review_errors': 0}
+
+        self._server = None
+        self._thread = None
+
+    @property
+    def endpoint(self):
+        """
+        The url to register exams at, to be used as the exam_register_endpoint
+        """
+        return 'http://{host}:{port}/'.format(host=self.host, port=self.port)
+
+    def handle_registration(self, body, authorization):
+        """
+        Registers the exam in the (JSON) body, returns the HTTP status and content
+        """
+
+        if not authorization or not authorization.startswith('SSI '):
+            return 401, json.dumps({'error': 'missing signature'})
+
+        delay = self.latency + self.random.uniform(0, self.latency_jitter)
+        if delay:
+            time.sleep(delay)
+
+        if self.random.random() < self.error_rate:
+            with self.lock:
+                self.stats['errors'] += 1
+            return self.random.choice(self.error_statuses), json.dumps({'error': 'injected failure'})
+
+        try:
+            attempt_code = json.loads(body)['examCode']
+        except (ValueError, KeyError, TypeError):
+            return 400, json.dumps({'error': 'not a registration'})
+
+        ssi_record_locator = unicode(uuid.uuid4()).upper()
+        with self.lock:
+            self.unreviewed[attempt_code] = ssi_record_locator
+            self.stats['registered'] += 1
+
+        return 200, json.dumps({'ssiRecordLocator': ssi_record_locator})
+
+    def send_reviews(self, session=None):
+        """
+        Posts the reviews of all of the exams which have been registered since
+        the last time, returns how many of them were accepted
+        """
+
+        if not self.review_url and not self.bulk_review_url:
+            return 0
+
+        with self.lock:
+            unreviewed, self.unreviewed = self.unreviewed, {}
+
+        reviews = [
+            build_review_payload(attempt_code, ssi_record_locator, review_status=self.review_status)
+            for attempt_code, ssi_record_locator in sorted(unreviewed.iteritems())
+        ]
+        session = session or requests.Session()
+
+        if self.bulk_review_url:
+            batches = [
+                (self.bulk_review_url, reviews[index:index + self.bulk_size])
+                for index in xrange(0, len(reviews), self.bulk_size)
+            ]
+        else:
+            batches = [(self.review_url, review) for review in reviews]
+
+        accepted = 0
+        for url, data in batches:
+            count = len(data) if isinstance(data, list) else 1
+            try:
+                response = session.post(url, data=json.dumps(data), headers={'Content-Type': 'application/json'})
+                ok = response.status_code == 200
+            except requests.exceptions.RequestException:
+                log_msg = 'Could not post the reviews to {url}'.format(url=url)
+                log.exception(log_msg)
+                ok = False
+
+            if ok:
+                accepted += count
+            with self.lock:
+                self.stats['reviewed' if ok else 'review_errors'] += count
+
+        return accepted
+
+    def start(self):
+        """
+        Starts serving in a background thread, returns the endpoint
+        """
+        self._server = _ThreadingHTTPServer((self.host, self.port), _RequestHandler)
+        self._server.simulator = self
+        self.port = self._server.server_address[1]
+
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self.endpoint
+
+    def stop(self):
+        """
+        Stops serving
+        """
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
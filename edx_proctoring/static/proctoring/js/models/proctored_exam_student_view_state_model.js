@@ -0,0 +1,36 @@
+var edx = edx || {};
+
+(function(Backbone) {
+
+    'use strict';
+
+    edx.coursware = edx.coursware || {};
+    edx.coursware.proctored_exam = edx.coursware.proctored_exam || {};
+
+    edx.coursware.proctored_exam.ProctoredExamStudentViewStateModel = Backbone.Model.extend({
+        url: '/api/edx_proctoring/v1/proctored_exam/student_view_state',
+
+        defaults: {
+            template: null,
+            client_renderable: false,
+            exam_id: null,
+            display_name: '',
+            attempt_status: null,
+            is_proctored: false,
+            is_practice_exam: false,
+            is_sample_attempt: false,
+            does_time_remain: false,
+            time_limit_mins: 0,
+            total_time: '',
+            platform_name: '',
+            urls: {},
+            link_urls: {}
+        },
+        parse: function (response) {
+            /* an empty response means the courseware renders its own view */
+            return response || {template: null};
+        }
+    });
+    this.edx.coursware.proctored_exam.ProctoredExamStudentViewStateModel =
+        edx.coursware.proctored_exam.ProctoredExamStudentViewStateModel;
+}).call(this, Backbone);
@@ -0,0 +1,68 @@
+var edx = edx || {};
+
+(function (Backbone, $, _) {
+    'use strict';
+
+    edx.coursware = edx.coursware || {};
+    edx.coursware.proctored_exam = edx.coursware.proctored_exam || {};
+
+    /* compiled underscore templates, shared by all instances and keyed by template name */
+    var compiledTemplates = {};
+
+    edx.coursware.proctored_exam.ProctoredExamStudentView = Backbone.View.extend({
+        initialize: function (options) {
+            this.$el = options.el;
+            this.model = options.model;
+            this.course_id = options.course_id;
+            this.content_id = options.content_id;
+
+            /* this should be moved to a 'data' attribute in HTML */
+            this.template_url_root = options.template_url_root || '/static/proctoring/templates/';
+
+            /* re-render if the model changes */
+            this.listenTo(this.model, 'change', this.render);
+
+            /* make the async call to the backend REST API */
+            /* after it loads, the listenTo event will fire and */
+            /* will call into the rendering */
+            if (this.course_id && this.content_id) {
+                this.model.fetch({
+                    data: {
+                        course_id: this.course_id,
+                        content_id: this.content_id
+                    }
+                });
+            }
+        },
+        loadTemplate: function (name, callback) {
+            if (_.has(compiledTemplates, name)) {
+                callback(compiledTemplates[name]);
+                return;
+            }
+            $.ajax({url: this.template_url_root + name + '.underscore', dataType: "html"})
+                .done(function (template_data) {
+                    compiledTemplates[name] = _.template(template_data);
+                    callback(compiledTemplates[name]);
+                });
+        },
+        render: function () {
+            var name = this.model.get('template');
+            if (name === null) {
+                return this;
+            }
+            if (!this.model.get('client_renderable')) {
+                /* let the page fall back to the server rendered view */
+                this.trigger('server_render', this.model);
+                return this;
+            }
+
+            var self = this;
+            this.loadTemplate(name, function (template) {
+                self.$el.html(template(self.model.toJSON()));
+                self.$el.show();
+            });
+            return this;
+        }
+    });
+    this.edx.coursware.proctored_exam.ProctoredExamStudentView = edx.coursware.proctored_exam.ProctoredExamStudentView;
+}).call(this, Backbone, $, _);
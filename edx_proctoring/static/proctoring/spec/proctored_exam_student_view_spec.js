@@ -0,0 +1,87 @@
+describe('ProctoredExamStudentView', function () {
+    var expectedState = {
+        template: 'seq_proctored_exam_verified',
+        client_renderable: true,
+        exam_id: 17,
+        display_name: 'Midterm',
+        attempt_status: 'verified',
+        is_proctored: true,
+        is_practice_exam: false,
+        is_sample_attempt: false,
+        does_time_remain: false,
+        time_limit_mins: 90,
+        total_time: '1 hour and 30 minutes',
+        platform_name: 'Open edX',
+        urls: {
+            progress_page_url: '/courses/edX/DemoX/Demo_Course/progress',
+            enter_exam_endpoint: '/api/edx_proctoring/v1/proctored_exam/attempt',
+            exam_started_poll_url: '/api/edx_proctoring/v1/proctored_exam/attempt/2',
+            change_state_url: '/api/edx_proctoring/v1/proctored_exam/attempt/2'
+        },
+        link_urls: {
+            faq: '/faq'
+        }
+    };
+    var templateHtml = '<div class="sequence proctored-exam" data-exam-id="<%- exam_id %>">' +
+        '<a href="<%- urls.progress_page_url %>"><%- gettext("Progress") %></a>' +
+        '</div>';
+
+    beforeEach(function () {
+        this.server = sinon.fakeServer.create();
+        this.server.autoRespond = true;
+        setFixtures('<div class="proctored-exam-student-view"></div>');
+
+        this.server.respondWith(
+            'GET',
+            /\/api\/edx_proctoring\/v1\/proctored_exam\/student_view_state\?.*/,
+            [
+                200,
+                {'Content-Type': 'application/json'},
+                JSON.stringify(expectedState)
+            ]
+        );
+        this.server.respondWith(
+            'GET',
+            '/static/proctoring/templates/seq_proctored_exam_verified.underscore',
+            [
+                200,
+                {'Content-Type': 'text/html'},
+                templateHtml
+            ]
+        );
+
+        this.model = new edx.coursware.proctored_exam.ProctoredExamStudentViewStateModel();
+    });
+
+    afterEach(function () {
+        this.server.restore();
+    });
+
+    it('renders the state on the client', function () {
+        this.view = new edx.coursware.proctored_exam.ProctoredExamStudentView({
+            el: $('.proctored-exam-student-view'),
+            model: this.model,
+            course_id: 'edX/DemoX/Demo_Course',
+            content_id: 'i4x://edX/DemoX/sequential/9f5e9b018a244ea38e5d157e0019e60c'
+        });
+        this.server.respond();
+        this.server.respond();
+
+        expect(this.view.$el.find('.proctored-exam')).toHaveAttr('data-exam-id', '17');
+        expect(this.view.$el.find('a')).toHaveAttr('href', expectedState.urls.progress_page_url);
+    });
+
+    it('falls back to server rendering', function () {
+        this.view = new edx.coursware.proctored_exam.ProctoredExamStudentView({
+            el: $('.proctored-exam-student-view'),
+            model: this.model
+        });
+        var serverRender = jasmine.createSpy('serverRender');
+        this.view.on('server_render', serverRender);
+
+        this.model.set({template: 'seq_proctored_exam_instructions', client_renderable: false});
+
+        expect(serverRender).toHaveBeenCalled();
+        expect(this.view.$el).toBeEmpty();
+    });
+});
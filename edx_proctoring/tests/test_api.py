@@ -5,8 +5,11 @@
 All tests for the api.py
 """
 import ddt
+import json
 from datetime import datetime, timedelta
+from django.contrib.auth.models import User
 from django.core import mail
+from django.core.urlresolvers import reverse
 from mock import patch
 import pytz
 from freezegun import freeze_time
@@ -14,6 +17,7 @@ from freezegun import freeze_time
 from edx_proctoring.api import (
     create_exam,
     update_exam,
+    sync_exams_for_course,
     get_exam_by_id,
     get_exam_by_content_id,
     add_allowance_for_user,
@@ -25,6 +29,7 @@ from edx_proctoring.api import (
     get_exam_attempt,
     create_exam_attempt,
     get_student_view,
+    get_student_view_state,
     get_allowances_for_course,
     get_all_exams_for_course,
     get_exam_attempt_by_id,
@@ -36,10 +41,16 @@ from edx_proctoring.api import (
     mark_exam_attempt_as_ready,
     update_attempt_status,
     get_attempt_status_summary,
+    get_attempt_status_summaries,
     update_exam_attempt,
+    register_pending_exam_attempt,
+    register_pending_exam_attempts,
+    preprovision_exam_attempts,
     _check_for_attempt_timeout
 )
 from edx_proctoring.exceptions import (
+    BackendProvideCannotRegisterAttempt,
+    BackendProviderUnavailable,
     ProctoredExamAlreadyExists,
     ProctoredExamNotFoundException,
     StudentExamAttemptAlreadyExistsException,
@@ -271,6 +282,94 @@ class ProctoredExamApiTests(LoggedInTestCase):
         self.assertEqual(update_proctored_exam.course_id, 'test_course')
         self.assertEqual(update_proctored_exam.content_id, 'test_content_id')
 
+    def test_update_exam_invalidates_fragments(self):
+        """
+        Updating an exam drops the pages rendered for it
+        """
+        with patch('edx_proctoring.rendering.invalidate_exam_fragments') as mock_invalidate:
+            update_exam(self.proctored_exam_id, exam_name='Updated Exam Name')
+        mock_invalidate.assert_called_once_with(self.proctored_exam_id)
+
+    def test_sync_exams_for_course(self):
+        """
+        Test syncing the exams of a course with the course structure
+        """
+        course_id = 'sync/course/id'
+        create_exam(course_id, 'unchanged', 'Unchanged', 90)
+        create_exam(course_id, 'renamed', 'Old Name', 90, external_id='external')
+        create_exam(course_id, 'removed', 'Removed', 90)
+
+        with patch('edx_proctoring.rendering.invalidate_exam_fragments') as mock_invalidate:
+            result = sync_exams_for_course(course_id, [
+                {'content_id': 'unchanged', 'exam_name': 'Unchanged', 'time_limit_mins': 90},
+                {'content_id': 'renamed', 'exam_name': 'New Name', 'time_limit_mins': 90},
+                {'content_id': 'added', 'exam_name': 'Added', 'time_limit_mins': 30, 'is_proctored': False},
+            ])
+
+        self.assertEqual(result, {
+            'created': ['added'],
+            'updated': ['renamed'],
+            'deactivated': ['removed'],
+        })
+        self.assertEqual(mock_invalidate.call_count, 2)
+
+        renamed = get_exam_by_content_id(course_id, 'renamed')
+        self.assertEqual(renamed['exam_name'], 'New Name')
+        # fields which are not in the spec are left alone
+        self.assertEqual(renamed['external_id'], 'external')
+
+        added = get_exam_by_content_id(course_id, 'added')
+        self.assertEqual(added['time_limit_mins'], 30)
+        self.assertFalse(added['is_proctored'])
+        self.assertTrue(added['is_active'])
+
+        self.assertFalse(get_exam_by_content_id(course_id, 'removed')['is_active'])
+        self.assertTrue(get_exam_by_content_id(course_id, 'unchanged')['is_active'])
+
+    def test_sync_exams_reactivates(self):
+        """
+        An exam which an earlier sync deactivated is active again once it reappears
+        """
+        course_id = 'sync/course/id'
+        spec = {'content_id': 'exam', 'exam_name': 'Exam', 'time_limit_mins': 90}
+        sync_exams_for_course(course_id, [spec])
+
+        self.assertEqual(sync_exams_for_course(course_id, [])['deactivated'], ['exam'])
+        self.assertFalse(get_exam_by_content_id(course_id, 'exam')['is_active'])
+
+        self.assertEqual(sync_exams_for_course(course_id, [spec])['updated'], ['exam'])
+        self.assertTrue(get_exam_by_content_id(course_id, 'exam')['is_active'])
+
+        # unless the spec says otherwise
+        sync_exams_for_course(course_id, [dict(spec, is_active=False)])
+        self.assertFalse(get_exam_by_content_id(course_id, 'exam')['is_active'])
+
+    def test_sync_exams_for_course_queries(self):
+        """
+        Syncing is a single read, a single insert and one update per distinct change
+        """
+        course_id = 'sync/course/id'
+        for index in range(5):
+            create_exam(course_id, 'exam{0}'.format(index), 'Exam', 90)
+
+        exam_specs = [
+            {'content_id': 'exam{0}'.format(index), 'exam_name': 'Exam', 'time_limit_mins': 60}
+            for index in range(5)
+        ] + [
+            {'content_id': 'new{0}'.format(index), 'exam_name': 'New Exam', 'time_limit_mins': 60}
+            for index in range(5)
+        ]
+
+        with self.assertNumQueries(3):
+            result = sync_exams_for_course(course_id, exam_specs)
+        self.assertEqual(len(result['created']), 5)
+        self.assertEqual(len(result['updated']), 5)
+
+        # nothing to do the second time around
+        with self.assertNumQueries(1):
+            result = sync_exams_for_course(course_id, exam_specs)
+        self.assertEqual(result, {'created': [], 'updated': [], 'deactivated': []})
+
     def test_update_non_existing_exam(self):
         """
         test to update the non-existing proctored exam
@@ -832,6 +931,50 @@ class ProctoredExamApiTests(LoggedInTestCase):
             )
         )
 
+    @patch.dict('django.conf.settings.PROCTORING_SETTINGS', {'CREATE_EXAMS_ON_VIEW': False})
+    def test_student_view_no_lazy_creation(self):
+        """
+        Exams can be provisioned up front only, so that the student view never writes
+        """
+        self.assertIsNone(
+            get_student_view(
+                user_id=self.user_id,
+                course_id=self.course_id,
+                content_id='not_synced',
+                context={
+                    'is_proctored': True,
+                    'display_name': self.exam_name,
+                    'default_time_limit_mins': 90
+                }
+            )
+        )
+        self.assertIsNone(ProctoredExam.get_exam_by_content_id(self.course_id, 'not_synced'))
+
+    @patch('edx_proctoring.api.get_provider_name_by_course_id', return_value="TEST")
+    def test_student_view_lazy_creation_race(self, provider):
+        """
+        Two students loading a new exam at the same time
+        """
+        def _create_exam(**kwargs):
+            """
+            Somebody else creates the exam first
+            """
+            ProctoredExam.objects.create(is_active=True, **kwargs)
+            raise ProctoredExamAlreadyExists
+
+        with patch('edx_proctoring.api.create_exam', side_effect=_create_exam):
+            rendered_response = get_student_view(
+                user_id=self.user_id,
+                course_id=self.course_id,
+                content_id='raced',
+                context={
+                    'is_proctored': True,
+                    'display_name': self.exam_name,
+                    'default_time_limit_mins': 90
+                }
+            )
+        self.assertIn(self.start_an_exam_msg, rendered_response)
+
     @patch('edx_proctoring.api.get_provider_name_by_course_id', return_value="TEST")
     def test_declined_attempt(self, provider):
         """
@@ -1000,6 +1143,60 @@ class ProctoredExamApiTests(LoggedInTestCase):
         )
         self.assertIn(self.proctored_exam_verified_msg, rendered_response)
 
+    @patch('edx_proctoring.api.get_provider_name_by_course_id', return_value="TEST")
+    def test_get_student_view_state(self, provider):
+        """
+        Test that get_student_view_state describes what get_student_view renders
+        """
+        exam_attempt = self._create_started_exam_attempt()
+        exam_attempt.status = ProctoredExamStudentAttemptStatus.verified
+        exam_attempt.save()
+
+        state = get_student_view_state(
+            user_id=self.user_id,
+            course_id=self.course_id,
+            content_id=self.content_id,
+            context={
+                'is_proctored': True,
+                'display_name': self.exam_name,
+                'default_time_limit_mins': 90
+            }
+        )
+        self.assertEqual(state['template'], 'seq_proctored_exam_verified')
+        self.assertTrue(state['client_renderable'])
+        self.assertEqual(state['exam_id'], self.proctored_exam_id)
+        self.assertEqual(state['attempt_status'], ProctoredExamStudentAttemptStatus.verified)
+        self.assertEqual(state['display_name'], self.exam_name)
+        self.assertEqual(
+            state['urls']['change_state_url'],
+            reverse('edx_proctoring.proctored_exam.attempt', args=[exam_attempt.id])
+        )
+
+        # make sure it is JSON serializable
+        json.dumps(state)
+
+    @patch('edx_proctoring.api.get_provider_name_by_course_id', return_value="TEST")
+    def test_get_student_view_state_instructions(self, provider):  # pylint: disable=invalid-name
+        """
+        The instructions page carries its own scripts, so is only rendered on the server
+        """
+        attempt_id = create_exam_attempt(self.proctored_exam_id, self.user_id)
+        attempt = get_exam_attempt_by_id(attempt_id)
+
+        state = get_student_view_state(
+            user_id=self.user_id,
+            course_id=self.course_id,
+            content_id=self.content_id,
+            context={
+                'is_proctored': True,
+                'display_name': self.exam_name,
+                'default_time_limit_mins': 90
+            }
+        )
+        self.assertEqual(state['template'], 'seq_proctored_exam_instructions')
+        self.assertFalse(state['client_renderable'])
+        self.assertEqual(state['exam_code'], attempt['attempt_code'])
+
     @patch('edx_proctoring.api.get_provider_name_by_course_id', return_value="TEST")
     def test_get_studentview_completed_status(self, provider):  # pylint: disable=invalid-name
         """
@@ -1639,6 +1836,81 @@ class ProctoredExamApiTests(LoggedInTestCase):
 
         self.assertIsNone(summary)
 
+    @patch('edx_proctoring.api.get_provider_name_by_course_id', return_value="TEST")
+    def test_attempt_status_summaries(self, provider):
+        """
+        Assert that the bulk status summaries match the per-exam summaries
+        """
+
+        exam_attempt = self._create_started_exam_attempt()
+        update_attempt_status(
+            exam_attempt.proctored_exam_id,
+            self.user.id,
+            ProctoredExamStudentAttemptStatus.submitted
+        )
+
+        content_ids = [
+            self.content_id,
+            self.content_id_timed,
+            self.content_id_practice,
+            'does_not_exist',
+        ]
+
+        summaries = get_attempt_status_summaries(self.user.id, self.course_id, content_ids)
+
+        self.assertEqual(sorted(summaries.keys()), sorted(content_ids))
+        self.assertIsNone(summaries['does_not_exist'])
+        for content_id in content_ids[:3]:
+            self.assertEqual(
+                summaries[content_id],
+                get_attempt_status_summary(self.user.id, self.course_id, content_id)
+            )
+        self.assertEqual(summaries[self.content_id]['status'], ProctoredExamStudentAttemptStatus.submitted)
+
+    def test_attempt_status_summaries_queries(self):
+        """
+        Make sure that the bulk status summaries use a constant number
+        of queries and only call into the credit service once
+        """
+
+        for index in range(10):
+            create_exam(
+                course_id=self.course_id,
+                content_id='bulk_content_{index}'.format(index=index),
+                exam_name=self.exam_name,
+                time_limit_mins=self.default_time_limit
+            )
+        content_ids = ['bulk_content_{index}'.format(index=index) for index in range(10)]
+
+        credit_service = get_runtime_service('credit')
+        with patch.object(credit_service, 'get_credit_state', wraps=credit_service.get_credit_state) as credit_state:
+            with self.assertNumQueries(2):
+                summaries = get_attempt_status_summaries(self.user.id, self.course_id, content_ids)
+            self.assertEqual(credit_state.call_count, 1)
+
+        for content_id in content_ids:
+            self.assertEqual(summaries[content_id]['status'], ProctoredExamStudentAttemptStatus.eligible)
+
+    @ddt.data(
+        'honor', 'staff'
+    )
+    def test_status_summaries_honor(self, enrollment_mode):
+        """
+        Make sure bulk status summaries are None for a non-verified person,
+        except for practice exams
+        """
+
+        set_runtime_service('credit', MockCreditService(enrollment_mode=enrollment_mode))
+
+        summaries = get_attempt_status_summaries(
+            self.user.id,
+            self.course_id,
+            [self.content_id, self.content_id_practice]
+        )
+
+        self.assertIsNone(summaries[self.content_id])
+        self.assertEqual(summaries[self.content_id_practice]['status'], ProctoredExamStudentAttemptStatus.eligible)
+
     def test_update_exam_attempt(self):
         """
         Make sure we restrict which fields we can update
@@ -1781,3 +2053,184 @@ class ProctoredExamApiTests(LoggedInTestCase):
             status
         )
         self.assertEquals(len(mail.outbox), 0)
+
+    @patch.dict('django.conf.settings.PROCTORING_SETTINGS', {'DEFER_ATTEMPT_REGISTRATION': True})
+    @patch('edx_proctoring.api._register_exam_attempt_with_provider', return_value='ssi-locator')
+    def test_deferred_registration(self, mock_register):
+        """
+        With DEFER_ATTEMPT_REGISTRATION the attempt is created right away, and
+        registered with the provider later on
+        """
+        attempt_id = create_exam_attempt(self.proctored_exam_id, self.user_id, taking_as_proctored=True)
+        self.assertFalse(mock_register.called)
+
+        attempt = get_exam_attempt_by_id(attempt_id)
+        self.assertTrue(attempt['registration_pending'])
+        self.assertIsNone(attempt['external_id'])
+
+        self.assertEqual(register_pending_exam_attempts(), {'registered': [attempt_id], 'failed': []})
+
+        attempt = get_exam_attempt_by_id(attempt_id)
+        self.assertFalse(attempt['registration_pending'])
+        self.assertEqual(attempt['external_id'], 'ssi-locator')
+
+        # nothing left to do
+        self.assertIsNone(register_pending_exam_attempt(attempt_id))
+        self.assertEqual(mock_register.call_count, 1)
+
+    @patch.dict(
+        'django.conf.settings.PROCTORING_SETTINGS',
+        {'DEFER_ATTEMPT_REGISTRATION': True, 'MAX_REGISTRATION_FAILURES': 2}
+    )
+    @patch('edx_proctoring.api.get_provider_name_by_course_id', return_value="TEST")
+    @patch('edx_proctoring.api._register_exam_attempt_with_provider')
+    def test_deferred_registration_failures(self, mock_register, provider):  # pylint: disable=unused-argument
+        """
+        Failed registrations are retried, until there have been too many of them
+        """
+        mock_register.side_effect = BackendProvideCannotRegisterAttempt('failed')
+        attempt_id = create_exam_attempt(self.proctored_exam_id, self.user_id, taking_as_proctored=True)
+
+        self.assertEqual(register_pending_exam_attempts(), {'registered': [], 'failed': [attempt_id]})
+        attempt = get_exam_attempt_by_id(attempt_id)
+        self.assertTrue(attempt['registration_pending'])
+        self.assertEqual(attempt['status'], ProctoredExamStudentAttemptStatus.created)
+
+        self.assertEqual(register_pending_exam_attempts(), {'registered': [], 'failed': [attempt_id]})
+        attempt = get_exam_attempt_by_id(attempt_id)
+        self.assertFalse(attempt['registration_pending'])
+        self.assertEqual(attempt['status'], ProctoredExamStudentAttemptStatus.error)
+
+        # and it is no longer picked up
+        self.assertEqual(register_pending_exam_attempts(), {'registered': [], 'failed': []})
+
+    @patch('edx_proctoring.api._register_exam_attempt_with_provider')
+    def test_registration_unavailable(self, mock_register):
+        """
+        While the provider is unavailable the registration fails, or with
+        DEFER_REGISTRATION_WHEN_UNAVAILABLE is deferred
+        """
+        mock_register.side_effect = BackendProviderUnavailable('open')
+        with self.assertRaises(BackendProviderUnavailable):
+            create_exam_attempt(self.proctored_exam_id, self.user_id, taking_as_proctored=True)
+
+        with patch.dict('django.conf.settings.PROCTORING_SETTINGS', {'DEFER_REGISTRATION_WHEN_UNAVAILABLE': True}):
+            attempt_id = create_exam_attempt(self.proctored_exam_id, self.user_id, taking_as_proctored=True)
+        self.assertTrue(get_exam_attempt_by_id(attempt_id)['registration_pending'])
+
+        # the pending registration doesn't count it as a failure either
+        self.assertEqual(register_pending_exam_attempts(), {'registered': [], 'failed': [attempt_id]})
+        attempt = ProctoredExamStudentAttempt.objects.get(id=attempt_id)
+        self.assertTrue(attempt.registration_pending)
+        self.assertEqual(attempt.registration_failures, 0)
+        self.assertIsNone(attempt.registration_claimed_until)
+
+    @patch.dict('django.conf.settings.PROCTORING_SETTINGS', {'DEFER_ATTEMPT_REGISTRATION': True})
+    @patch('edx_proctoring.api._register_exam_attempt_with_provider', return_value='ssi-locator')
+    def test_claimed_registration(self, mock_register):
+        """
+        An attempt which another worker is registering is left alone, until its claim runs out
+        """
+        attempt_id = create_exam_attempt(self.proctored_exam_id, self.user_id, taking_as_proctored=True)
+        ProctoredExamStudentAttempt.objects.filter(id=attempt_id).update(
+            registration_claimed_until=datetime.now(pytz.UTC) + timedelta(seconds=60)
+        )
+
+        self.assertIsNone(register_pending_exam_attempt(attempt_id))
+        self.assertFalse(mock_register.called)
+        self.assertTrue(get_exam_attempt_by_id(attempt_id)['registration_pending'])
+
+        ProctoredExamStudentAttempt.objects.filter(id=attempt_id).update(
+            registration_claimed_until=datetime.now(pytz.UTC) - timedelta(seconds=1)
+        )
+        self.assertEqual(register_pending_exam_attempt(attempt_id), 'ssi-locator')
+        attempt = ProctoredExamStudentAttempt.objects.get(id=attempt_id)
+        self.assertFalse(attempt.registration_pending)
+        self.assertIsNone(attempt.registration_claimed_until)
+
+    @patch('edx_proctoring.api.get_provider_name_by_course_id', return_value="TEST")
+    def test_registration_pending_view(self, provider):  # pylint: disable=unused-argument
+        """
+        The instructions wait for the exam code while the attempt is being registered
+        """
+        attempt = ProctoredExamStudentAttempt.create_exam_attempt(
+            self.proctored_exam_id,
+            self.user_id,
+            '',
+            self.default_time_limit,
+            'ABCDEF',
+            True,
+            False,
+            None,
+            registration_pending=True
+        )
+
+        rendered_response = get_student_view(
+            user_id=self.user_id,
+            course_id=self.course_id,
+            content_id=self.content_id,
+            context={
+                'is_proctored': True,
+                'display_name': self.exam_name,
+                'default_time_limit_mins': 90
+            }
+        )
+        self.assertIn('Your proctored exam is being set up', rendered_response)
+        self.assertNotIn(attempt.attempt_code, rendered_response)
+
+    @patch('edx_proctoring.api.get_provider_name_by_course_id', return_value="TEST")
+    @patch('edx_proctoring.api._register_exam_attempt_with_provider')
+    def test_preprovision_exam_attempts(self, mock_register, provider):  # pylint: disable=unused-argument
+        """
+        The attempts of a roster can be created and registered ahead of the exam
+        """
+        users = [
+            User.objects.create(
+                username='roster{index}'.format(index=index),
+                email='roster{index}@test.com'.format(index=index)
+            )
+            for index in range(4)
+        ]
+        user_ids = [user.id for user in users]
+        failing_user_id = user_ids[2]
+        mock_register.side_effect = lambda exam, user, *args: (
+            self._fail_registration() if user.id == failing_user_id else 'ext-{user_id}'.format(user_id=user.id)
+        )
+
+        # somebody who already has an attempt is left alone
+        existing_attempt_id = create_exam_attempt(self.proctored_exam_id, user_ids[0])
+        ProctoredExamStudentAllowance.add_allowance_for_user(
+            self.proctored_exam_id, user_ids[1], ProctoredExamStudentAllowance.ADDITIONAL_TIME_GRANTED, '30'
+        )
+
+        result = preprovision_exam_attempts(self.proctored_exam_id, user_ids + [user_ids[1], 9999], workers=2)
+
+        self.assertEqual(sorted(result['registered']), [user_ids[1], user_ids[3]])
+        self.assertEqual(result['skipped'], [user_ids[0], user_ids[1]])
+        self.assertEqual(sorted(result['failed']), [failing_user_id, 9999])
+        self.assertGreater(result['elapsed'], 0)
+        self.assertEqual(mock_register.call_count, 3)
+
+        self.assertEqual(get_exam_attempt(self.proctored_exam_id, user_ids[0])['id'], existing_attempt_id)
+        for user_id in (user_ids[1], user_ids[3]):
+            attempt = get_exam_attempt(self.proctored_exam_id, user_id)
+            self.assertEqual(attempt['external_id'], 'ext-{user_id}'.format(user_id=user_id))
+            self.assertFalse(attempt['registration_pending'])
+            self.assertEqual(attempt['status'], ProctoredExamStudentAttemptStatus.created)
+        self.assertEqual(
+            get_exam_attempt(self.proctored_exam_id, user_ids[1])['allowed_time_limit_mins'],
+            self.default_time_limit + 30
+        )
+
+        # the failed registration is left to register_pending_exam_attempts()
+        attempt = get_exam_attempt(self.proctored_exam_id, failing_user_id)
+        self.assertTrue(attempt['registration_pending'])
+        attempt_obj = ProctoredExamStudentAttempt.objects.get(id=attempt['id'])
+        self.assertEqual(attempt_obj.registration_failures, 1)
+        self.assertIsNone(attempt_obj.registration_claimed_until)
+
+    def _fail_registration(self):
+        """
+        Stands in for a provider which can't register the attempt
+        """
+        raise BackendProvideCannotRegisterAttempt('failed')
@@ -0,0 +1,111 @@
+"""
+Tests for the circuit_breaker.py file
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+from mock import patch
+
+from edx_proctoring.circuit_breaker import (
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    CircuitBreaker,
+)
+
+
+@patch('edx_proctoring.circuit_breaker.time')
+class CircuitBreakerTests(TestCase):
+    """
+    Coverage of the circuit breaker
+    """
+
+    def setUp(self):
+        """
+        Start out closed
+        """
+        super(CircuitBreakerTests, self).setUp()
+        cache.clear()
+        self.breaker = CircuitBreaker('http://test', failure_threshold=3, recovery_timeout=30)
+
+    def _fail(self, count):
+        """
+        Records the given number of failures
+        """
+        for __ in range(count):
+            self.breaker.record_failure()
+
+    def test_opens(self, mock_time):
+        """
+        Enough failures in a row open the breaker
+        """
+        mock_time.time.return_value = 1000
+        self._fail(2)
+        self.breaker.record_success()
+        self._fail(2)
+        self.assertEqual(self.breaker.state, CIRCUIT_CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+
+        self._fail(1)
+        self.assertEqual(self.breaker.state, CIRCUIT_OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+        # the state is shared
+        self.assertFalse(CircuitBreaker('http://test').allow_request())
+        self.assertTrue(CircuitBreaker('http://other').allow_request())
+
+    def test_half_open(self, mock_time):
+        """
+        After the recovery timeout one probe gets through, which closes the breaker
+        """
+        mock_time.time.return_value = 1000
+        self._fail(3)
+
+        mock_time.time.return_value = 1031
+        self.assertEqual(self.breaker.state, CIRCUIT_HALF_OPEN)
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CIRCUIT_CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_failed_probe(self, mock_time):
+        """
+        A failed probe opens the breaker for another recovery timeout
+        """
+        mock_time.time.return_value = 1000
+        self._fail(3)
+
+        mock_time.time.return_value = 1031
+        self.assertTrue(self.breaker.allow_request())
+        self._fail(1)
+        self.assertEqual(self.breaker.state, CIRCUIT_OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+        mock_time.time.return_value = 1062
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_metrics(self, mock_time):
+        """
+        The calls are counted
+        """
+        mock_time.time.return_value = 1000
+        self.breaker.record_success()
+        self._fail(3)
+        self.breaker.allow_request()
+
+        metrics = self.breaker.get_metrics()
+        self.assertEqual(metrics['state'], CIRCUIT_OPEN)
+        self.assertEqual(metrics['opened_at'], 1000)
+        self.assertEqual(metrics['consecutive_failures'], 3)
+        self.assertEqual(metrics['successes'], 1)
+        self.assertEqual(metrics['failures'], 3)
+        self.assertEqual(metrics['rejections'], 1)
+        self.assertEqual(metrics['trips'], 1)
+
+        self.breaker.reset()
+        metrics = self.breaker.get_metrics()
+        self.assertEqual(metrics['state'], CIRCUIT_CLOSED)
+        self.assertEqual(metrics['failures'], 0)
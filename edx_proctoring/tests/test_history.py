@@ -0,0 +1,181 @@
+"""
+Tests for the history.py file
+"""
+import threading
+
+from django.core.signals import request_finished, got_request_exception
+from mock import patch
+
+from edx_proctoring import history
+from edx_proctoring.models import (
+    ProctoredExam,
+    ProctoredExamStudentAllowance,
+    ProctoredExamStudentAllowanceHistory,
+    ProctoredExamStudentAttempt,
+    ProctoredExamStudentAttemptHistory,
+)
+
+from .utils import LoggedInTestCase
+
+
+@patch.dict('django.conf.settings.PROCTORING_SETTINGS', {'HISTORY_WRITE_MODE': 'buffered', 'HISTORY_BATCH_SIZE': 3})
+class BufferedHistoryTests(LoggedInTestCase):
+    """
+    Coverage of the buffered history writes
+    """
+
+    def setUp(self):
+        """
+        Build out test harnessing
+        """
+        super(BufferedHistoryTests, self).setUp()
+        self.proctored_exam = ProctoredExam.objects.create(
+            course_id='test_course',
+            content_id='test_content',
+            exam_name='Test Exam',
+            external_id='123aXqe3',
+            time_limit_mins=90
+        )
+
+    def tearDown(self):
+        """
+        Don't leak staged rows into other tests
+        """
+        super(BufferedHistoryTests, self).tearDown()
+        history._take_pending()  # pylint: disable=protected-access
+
+    def _delete_allowances(self, count):
+        """
+        Creates and then deletes the given number of allowances, which archives them
+        """
+        for index in range(count):
+            ProctoredExamStudentAllowance.objects.create(
+                user_id=self.user.id,
+                proctored_exam=self.proctored_exam,
+                key='key_{index}'.format(index=index),
+                value='value'
+            ).delete()
+
+    def test_flush(self):
+        """
+        Rows are only written when flushed
+        """
+        self._delete_allowances(2)
+        self.assertEqual(ProctoredExamStudentAllowanceHistory.objects.count(), 0)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(history.flush(), 2)
+        self.assertEqual(ProctoredExamStudentAllowanceHistory.objects.count(), 2)
+
+        # nothing left to do
+        with self.assertNumQueries(0):
+            self.assertEqual(history.flush(), 0)
+
+    def test_batch_size(self):
+        """
+        A full batch gets written right away, outside of a managed transaction
+        """
+        with patch('edx_proctoring.history.transaction.is_managed', return_value=False):
+            with patch('edx_proctoring.history.transaction.commit_on_success'):
+                self._delete_allowances(4)
+        self.assertEqual(ProctoredExamStudentAllowanceHistory.objects.count(), 3)
+
+    def test_batch_size_managed(self):
+        """
+        Inside of a managed transaction, which could still roll back, a full batch waits
+        """
+        self._delete_allowances(4)
+        self.assertEqual(ProctoredExamStudentAllowanceHistory.objects.count(), 0)
+        self.assertEqual(history.flush(), 4)
+
+    def test_write_failure(self):
+        """
+        Rows which could not be written stay staged
+        """
+        self._delete_allowances(2)
+        with patch('edx_proctoring.history._insert', side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                history.flush()
+        self.assertEqual(ProctoredExamStudentAllowanceHistory.objects.count(), 0)
+
+        self.assertEqual(history.flush(), 2)
+        self.assertEqual(ProctoredExamStudentAllowanceHistory.objects.count(), 2)
+
+    def test_request_finished(self):
+        """
+        The rows get written once the request has been handled
+        """
+        self._delete_allowances(1)
+        request_finished.send(sender=self.__class__)
+        self.assertEqual(ProctoredExamStudentAllowanceHistory.objects.count(), 1)
+
+    def test_request_exception(self):
+        """
+        The rows of a failed request are written along with its changes
+        """
+        self._delete_allowances(1)
+        got_request_exception.send(sender=self.__class__, request=None)
+        self.assertEqual(ProctoredExamStudentAllowanceHistory.objects.count(), 1)
+
+    def test_signal_handlers_dont_raise(self):
+        """
+        A failed write is logged, and doesn't get in the way of the request handling
+        """
+        self._delete_allowances(1)
+        with patch('edx_proctoring.history._insert', side_effect=ValueError):
+            got_request_exception.send(sender=self.__class__, request=None)
+            request_finished.send(sender=self.__class__)
+        self.assertEqual(history.flush(), 1)
+
+    def test_other_threads(self):
+        """
+        Every thread has a buffer of its own, flushing doesn't write the rows of the others
+        """
+        staged = []
+
+        def stage():
+            """
+            Stages a row in another thread
+            """
+            history.archive(
+                ProctoredExamStudentAllowanceHistory(
+                    allowance_id=1,
+                    user=self.user,
+                    proctored_exam=self.proctored_exam,
+                    key='key',
+                    value='value'
+                )
+            )
+            staged.extend(history._take_pending())  # pylint: disable=protected-access
+
+        thread = threading.Thread(target=stage)
+        thread.start()
+        thread.join()
+
+        self.assertEqual(history.flush(), 0)
+        self.assertEqual(len(staged), 1)
+
+    def test_attempt_lookup_flushes(self):
+        """
+        Deleted attempts can still be found by their attempt code right away
+        """
+        attempt = ProctoredExamStudentAttempt.objects.create(
+            proctored_exam=self.proctored_exam,
+            user=self.user,
+            attempt_code='123456',
+            external_id='abc',
+            allowed_time_limit_mins=90
+        )
+        attempt_id = attempt.id
+        attempt.delete_exam_attempt()
+
+        archived = ProctoredExamStudentAttemptHistory.get_exam_attempt_by_code('123456')
+        self.assertEqual(archived.attempt_id, attempt_id)
+
+    @patch.dict('django.conf.settings.PROCTORING_SETTINGS', {'HISTORY_WRITE_MODE': 'sync'})
+    def test_sync(self):
+        """
+        In the sync mode the rows are written right away
+        """
+        self._delete_allowances(1)
+        self.assertEqual(ProctoredExamStudentAllowanceHistory.objects.count(), 1)
@@ -1,14 +1,27 @@
 """
 All tests for the models.py
 """
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from mock import patch
+
+from edx_proctoring.benchmarks import run_benchmark
 from edx_proctoring.models import (
     ProctoredExam,
+    ProctoredExamAttemptCodeIndex,
+    ProctoredExamHistoryDelta,
     ProctoredExamStudentAllowance,
+    ProctoredExamStudentAllowanceBundle,
     ProctoredExamStudentAllowanceHistory,
     ProctoredExamStudentAttempt,
     ProctoredExamStudentAttemptHistory,
     ProctoredExamReviewPolicy,
     ProctoredExamReviewPolicyHistory,
+    ProctoredExamSoftwareSecureReview,
+    ProctoredExamSoftwareSecureReviewHistory,
+    on_request_finished,
 )
 
 from .utils import (
@@ -113,6 +126,72 @@ class ProctoredExamModelTests(LoggedInTestCase):
         proctored_exam_student_history = ProctoredExamStudentAllowanceHistory.objects.filter(user_id=1)
         self.assertEqual(len(proctored_exam_student_history), 1)
 
+    def test_archive_without_read(self):
+        """
+        Saving an allowance archives the values it was loaded with, without reading
+        it back from the database, and only when something has actually changed
+        """
+        proctored_exam = ProctoredExam.objects.create(
+            course_id='test_course',
+            content_id='test_content',
+            exam_name='Test Exam',
+            external_id='123aXqe3',
+            time_limit_mins=90
+        )
+        allowance = ProctoredExamStudentAllowance.objects.create(
+            user_id=1,
+            proctored_exam=proctored_exam,
+            key='allowance_key',
+            value='20 minutes'
+        )
+
+        # just the save itself
+        with self.assertNumQueries(2):
+            allowance.save()
+        self.assertEqual(ProctoredExamStudentAllowanceHistory.objects.filter(user_id=1).count(), 0)
+
+        # and the INSERT into the history
+        allowance.value = '10 minutes'
+        with self.assertNumQueries(3):
+            allowance.save()
+
+        allowance = ProctoredExamStudentAllowance.objects.get(id=allowance.id)
+        allowance.value = '5 minutes'
+        allowance.save()
+
+        history = ProctoredExamStudentAllowanceHistory.objects.filter(user_id=1).order_by('id')
+        self.assertEqual([item.value for item in history], ['20 minutes', '10 minutes'])
+
+    def test_archive_untracked(self):
+        """
+        Instances which were never loaded from the database are read back
+        """
+        proctored_exam = ProctoredExam.objects.create(
+            course_id='test_course',
+            content_id='test_content',
+            exam_name='Test Exam',
+            external_id='123aXqe3',
+            time_limit_mins=90
+        )
+        allowance = ProctoredExamStudentAllowance.objects.create(
+            user_id=1,
+            proctored_exam=proctored_exam,
+            key='allowance_key',
+            value='20 minutes'
+        )
+
+        replacement = ProctoredExamStudentAllowance(
+            user_id=1,
+            proctored_exam=proctored_exam,
+            key='allowance_key',
+            value='10 minutes'
+        )
+        replacement.id = allowance.id
+        replacement.save()
+
+        history = ProctoredExamStudentAllowanceHistory.objects.filter(user_id=1)
+        self.assertEqual([item.value for item in history], ['20 minutes'])
+
 
 class ProctoredExamStudentAttemptTests(LoggedInTestCase):
     """
@@ -276,3 +355,664 @@ class ProctoredExamStudentAttemptTests(LoggedInTestCase):
         attempts = ProctoredExamStudentAttemptHistory.objects.all()
         self.assertEqual(len(attempts), 1)
         self.assertEqual(attempts[0].review_policy_id, deleted_id)
+
+
+class ProctoredExamStudentAllowanceBulkTests(LoggedInTestCase):
+    """
+    Tests for adding many allowances at once
+    """
+
+    def setUp(self):
+        """
+        Build out test harnessing
+        """
+        super(ProctoredExamStudentAllowanceBulkTests, self).setUp()
+        self.proctored_exam = ProctoredExam.objects.create(
+            course_id='test_course',
+            content_id='test_content',
+            exam_name='Test Exam',
+            external_id='123aXqe3',
+            time_limit_mins=90
+        )
+        self.users = [
+            User.objects.create(username='student{0}'.format(index), email='student{0}@test.com'.format(index))
+            for index in range(4)
+        ]
+
+    def test_add_allowances_for_users(self):
+        """
+        Users are resolved by username or email, existing allowances are updated and archived
+        """
+        ProctoredExamStudentAllowance.objects.create(
+            user=self.users[0],
+            proctored_exam=self.proctored_exam,
+            key='additional_time_granted',
+            value='10'
+        )
+        ProctoredExamStudentAllowance.objects.create(
+            user=self.users[1],
+            proctored_exam=self.proctored_exam,
+            key='additional_time_granted',
+            value='20'
+        )
+
+        allowances = [
+            # updated
+            {'exam_id': self.proctored_exam.id, 'user_info': 'student0', 'key': 'additional_time_granted',
+             'value': '15'},
+            # unchanged
+            {'exam_id': self.proctored_exam.id, 'user_info': 'student1@test.com',
+             'key': ProctoredExamStudentAllowance.ADDITIONAL_TIME_GRANTED, 'value': '20'},
+            # added
+            {'exam_id': self.proctored_exam.id, 'user_info': 'student2@test.com', 'key': 'additional_time_granted',
+             'value': '30'},
+            {'exam_id': str(self.proctored_exam.id), 'user_info': self.users[3].id, 'key': 'additional_time_granted',
+             'value': '30'},
+            # errors
+            {'exam_id': self.proctored_exam.id, 'user_info': 'nobody', 'key': 'additional_time_granted',
+             'value': '30'},
+            {'exam_id': 0, 'user_info': 'student2', 'key': 'additional_time_granted', 'value': '30'},
+            {'exam_id': self.proctored_exam.id, 'user_info': 0, 'key': 'additional_time_granted',
+             'value': '30'},
+        ]
+
+        # exams, users, existing allowances, insert, archive, update
+        with self.assertNumQueries(6):
+            added, updated, errors = ProctoredExamStudentAllowance.add_allowances_for_users(allowances)
+
+        self.assertEqual(added, 2)
+        self.assertEqual(updated, 1)
+        self.assertEqual([index for index, __ in errors], [4, 5, 6])
+
+        for user, value in zip(self.users, ['15', '20', '30', '30']):
+            self.assertEqual(
+                ProctoredExamStudentAllowance.get_allowance_for_user(
+                    self.proctored_exam.id, user.id, 'additional_time_granted'
+                ).value,
+                value
+            )
+
+        history = ProctoredExamStudentAllowanceHistory.objects.all()
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history[0].user_id, self.users[0].id)
+        self.assertEqual(history[0].value, '10')
+
+    def test_added_concurrently(self):
+        """
+        Allowances which somebody else added after they were read are updated instead
+        """
+        ProctoredExamStudentAllowance.objects.create(
+            user=self.users[0],
+            proctored_exam=self.proctored_exam,
+            key='additional_time_granted',
+            value='10'
+        )
+
+        plan_bulk_changes = ProctoredExamStudentAllowance._plan_bulk_changes  # pylint: disable=protected-access
+        stale_read = [True]
+
+        def plan_after_stale_read(desired):
+            """
+            The first read misses the existing allowance
+            """
+            if stale_read:
+                stale_read.pop()
+                return [
+                    ProctoredExamStudentAllowance(proctored_exam_id=exam_id, user_id=user_id, key=key, value=value)
+                    for (exam_id, user_id, key), value in desired.iteritems()
+                ], [], {}
+            return plan_bulk_changes(desired)
+
+        with patch.object(ProctoredExamStudentAllowance, '_plan_bulk_changes', side_effect=plan_after_stale_read):
+            added, updated, errors = ProctoredExamStudentAllowance.add_allowances_for_users([
+                {'exam_id': self.proctored_exam.id, 'user_info': 'student0', 'key': 'additional_time_granted',
+                 'value': '15'},
+                {'exam_id': self.proctored_exam.id, 'user_info': 'student1', 'key': 'additional_time_granted',
+                 'value': '20'},
+            ])
+
+        self.assertEqual((added, updated, errors), (1, 1, []))
+        self.assertEqual(
+            dict(ProctoredExamStudentAllowance.objects.values_list('user_id', 'value')),
+            {self.users[0].id: '15', self.users[1].id: '20'}
+        )
+        self.assertEqual(ProctoredExamStudentAllowanceHistory.objects.get().value, '10')
+
+    def test_nothing_to_add(self):
+        """
+        Only errors, so nothing gets written
+        """
+        added, updated, errors = ProctoredExamStudentAllowance.add_allowances_for_users([
+            {'exam_id': self.proctored_exam.id, 'user_info': 'nobody', 'key': 'additional_time_granted',
+             'value': '30'},
+        ])
+        self.assertEqual((added, updated), (0, 0))
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(ProctoredExamStudentAllowance.objects.count(), 0)
+
+    def test_allowance_bundle(self):
+        """
+        All allowances of a user in an exam are read in one query, and then cached
+        until they change
+        """
+        user = self.users[0]
+        ProctoredExamStudentAllowance.objects.create(
+            user=user,
+            proctored_exam=self.proctored_exam,
+            key=ProctoredExamStudentAllowance.ADDITIONAL_TIME_GRANTED[0],
+            value='10'
+        )
+        ProctoredExamStudentAllowance.objects.create(
+            user=user,
+            proctored_exam=self.proctored_exam,
+            key=ProctoredExamStudentAllowance.REVIEW_POLICY_EXCEPTION[0],
+            value='Allow notes'
+        )
+
+        with self.assertNumQueries(1):
+            bundle = ProctoredExamStudentAllowance.get_allowance_bundle(self.proctored_exam.id, user.id)
+        self.assertEqual(bundle.additional_time_granted, 10)
+        self.assertEqual(bundle.review_policy_exception, 'Allow notes')
+        self.assertEqual(len(bundle.allowances), 2)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                ProctoredExamStudentAllowance.get_additional_time_granted(self.proctored_exam.id, user.id),
+                10
+            )
+            self.assertEqual(
+                ProctoredExamStudentAllowance.get_review_policy_exception(self.proctored_exam.id, user.id),
+                'Allow notes'
+            )
+
+        # saving invalidates
+        ProctoredExamStudentAllowance.add_allowance_for_user(
+            self.proctored_exam.id, user.id, ProctoredExamStudentAllowance.ADDITIONAL_TIME_GRANTED, '20'
+        )
+        self.assertEqual(
+            ProctoredExamStudentAllowance.get_additional_time_granted(self.proctored_exam.id, user.id),
+            20
+        )
+
+        # updating invalidates
+        ProctoredExamStudentAllowance.objects.filter(
+            user=user,
+            proctored_exam=self.proctored_exam,
+            key=ProctoredExamStudentAllowance.ADDITIONAL_TIME_GRANTED[0]
+        ).update(value='25')
+        self.assertEqual(
+            ProctoredExamStudentAllowance.get_additional_time_granted(self.proctored_exam.id, user.id),
+            25
+        )
+
+        # bulk adding invalidates
+        ProctoredExamStudentAllowance.add_allowances_for_users([
+            {'exam_id': self.proctored_exam.id, 'user_info': user.id,
+             'key': ProctoredExamStudentAllowance.ADDITIONAL_TIME_GRANTED, 'value': '30'},
+        ])
+        self.assertEqual(
+            ProctoredExamStudentAllowance.get_additional_time_granted(self.proctored_exam.id, user.id),
+            30
+        )
+
+        # deleting invalidates
+        ProctoredExamStudentAllowance.objects.filter(user=user).delete()
+        bundle = ProctoredExamStudentAllowance.get_allowance_bundle(self.proctored_exam.id, user.id)
+        self.assertIsNone(bundle.additional_time_granted)
+        self.assertIsNone(bundle.review_policy_exception)
+
+        # other users are not affected
+        self.assertEqual(
+            ProctoredExamStudentAllowance.get_allowance_bundle(self.proctored_exam.id, self.users[1].id).allowances,
+            []
+        )
+
+    def test_allowance_bundle_after_commit(self):
+        """
+        Bundles which changed inside of a managed transaction are dropped again when
+        the request has finished, in case somebody cached them before the commit
+        """
+        user = self.users[0]
+        ProctoredExamStudentAllowance.add_allowance_for_user(
+            self.proctored_exam.id, user.id, ProctoredExamStudentAllowance.ADDITIONAL_TIME_GRANTED, '10'
+        )
+
+        # a concurrent reader, who still sees the allowances as they were before
+        stale_bundle = ProctoredExamStudentAllowanceBundle(self.proctored_exam.id, user.id, [])
+        cache.set(
+            'edx_proctoring.allowances.{exam_id}.{user_id}'.format(exam_id=self.proctored_exam.id, user_id=user.id),
+            stale_bundle
+        )
+        self.assertIsNone(
+            ProctoredExamStudentAllowance.get_additional_time_granted(self.proctored_exam.id, user.id)
+        )
+
+        on_request_finished(sender=None)
+        self.assertEqual(
+            ProctoredExamStudentAllowance.get_additional_time_granted(self.proctored_exam.id, user.id),
+            10
+        )
+
+    def test_allowance_bundles(self):
+        """
+        The allowances of many users are read in one query, and shared with get_allowance_bundle()
+        """
+        ProctoredExamStudentAllowance.objects.create(
+            user=self.users[0],
+            proctored_exam=self.proctored_exam,
+            key=ProctoredExamStudentAllowance.ADDITIONAL_TIME_GRANTED[0],
+            value='10'
+        )
+        user_ids = [user.id for user in self.users]
+
+        with self.assertNumQueries(1):
+            bundles = ProctoredExamStudentAllowance.get_allowance_bundles(self.proctored_exam.id, user_ids)
+        self.assertEqual(sorted(bundles.keys()), sorted(user_ids))
+        self.assertEqual(bundles[self.users[0].id].additional_time_granted, 10)
+        self.assertIsNone(bundles[self.users[1].id].additional_time_granted)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                ProctoredExamStudentAllowance.get_allowance_bundles(self.proctored_exam.id, user_ids)[
+                    self.users[0].id
+                ].additional_time_granted,
+                10
+            )
+            self.assertEqual(
+                ProctoredExamStudentAllowance.get_additional_time_granted(self.proctored_exam.id, self.users[0].id),
+                10
+            )
+
+    def test_bulk_update_archives(self):
+        """
+        Updating many allowances at once archives the previous version of every one of them
+        """
+        for index, user in enumerate(self.users):
+            ProctoredExamStudentAllowance.objects.create(
+                user=user,
+                proctored_exam=self.proctored_exam,
+                key='additional_time_granted',
+                value=str(index)
+            )
+
+        # select, archive, update
+        with self.assertNumQueries(3):
+            updated = ProctoredExamStudentAllowance.objects.filter(
+                proctored_exam=self.proctored_exam
+            ).update(value='60')
+        self.assertEqual(updated, len(self.users))
+
+        history = ProctoredExamStudentAllowanceHistory.objects.order_by('user__id')
+        self.assertEqual(
+            [(item.user_id, item.value) for item in history],
+            [(user.id, str(index)) for index, user in enumerate(self.users)]
+        )
+        self.assertEqual(
+            set(ProctoredExamStudentAllowance.objects.values_list('value', flat=True)),
+            set(['60'])
+        )
+
+        # nothing matches, nothing happens
+        with self.assertNumQueries(1):
+            updated = ProctoredExamStudentAllowance.objects.filter(key='foo').update(value='60')
+        self.assertEqual(updated, 0)
+
+    def test_archive_benchmark(self):
+        """
+        Make sure the benchmark scenario runs and cleans up after itself
+        """
+        exam_count = ProctoredExam.objects.count()
+        user_count = User.objects.count()
+
+        results = run_benchmark('allowance_archive', 15)
+        self.assertEqual([label for label, __ in results], ['per_row', 'bulk'])
+
+        self.assertEqual(ProctoredExam.objects.count(), exam_count)
+        self.assertEqual(User.objects.count(), user_count)
+
+
+DELTA_HISTORY_SETTINGS = {'HISTORY_FORMAT': 'delta', 'HISTORY_SNAPSHOT_INTERVAL': 3}
+
+
+@patch.dict('django.conf.settings.PROCTORING_SETTINGS', DELTA_HISTORY_SETTINGS)
+class ProctoredExamHistoryDeltaTests(LoggedInTestCase):
+    """
+    Tests for the delta encoded history
+    """
+
+    def setUp(self):
+        """
+        Build out test harnessing
+        """
+        super(ProctoredExamHistoryDeltaTests, self).setUp()
+        self.proctored_exam = ProctoredExam.objects.create(
+            course_id='test_course',
+            content_id='test_content',
+            exam_name='Test Exam',
+            external_id='123aXqe3',
+            time_limit_mins=90
+        )
+        self.review = ProctoredExamSoftwareSecureReview.objects.create(
+            attempt_code='abc',
+            review_status='Clean',
+            raw_data='x' * 1000,
+            video_url='http://example.com/video'
+        )
+        # archives versions 0 to 4, the class decorator doesn't apply to setUp
+        with patch.dict('django.conf.settings.PROCTORING_SETTINGS', DELTA_HISTORY_SETTINGS):
+            for review_status in ('Suspicious', 'Clean', 'Rules Violation', 'Clean', 'Suspicious'):
+                self.review.review_status = review_status
+                self.review.save()
+
+    def test_stored_as_deltas(self):
+        """
+        The versions go into the delta table, with a snapshot every few versions
+        """
+        self.assertEqual(ProctoredExamSoftwareSecureReviewHistory.objects.count(), 0)
+
+        deltas = ProctoredExamHistoryDelta.objects.order_by('version')
+        self.assertEqual([delta.is_snapshot for delta in deltas], [True, False, False, True, False])
+        self.assertEqual(json.loads(deltas[1].data), {'review_status': 'Suspicious'})
+
+    def test_get_versions(self):
+        """
+        All of the versions can be rebuilt
+        """
+        versions = ProctoredExamHistoryDelta.get_versions(ProctoredExamSoftwareSecureReviewHistory, 'abc')
+        self.assertEqual(
+            [version.review_status for version in versions],
+            ['Clean', 'Suspicious', 'Clean', 'Rules Violation', 'Clean']
+        )
+        self.assertTrue(all(version.raw_data == 'x' * 1000 for version in versions))
+
+    def test_get_version(self):
+        """
+        A single version is rebuilt from the closest snapshot
+        """
+        with self.assertNumQueries(2):
+            version = ProctoredExamHistoryDelta.get_version(ProctoredExamSoftwareSecureReviewHistory, 'abc', 4)
+        self.assertEqual(version.review_status, 'Clean')
+        self.assertEqual(version.attempt_code, 'abc')
+        self.assertEqual(version.video_url, 'http://example.com/video')
+
+        self.assertIsNone(ProctoredExamHistoryDelta.get_version(ProctoredExamSoftwareSecureReviewHistory, 'abc', 5))
+
+    def test_attempts_not_encoded(self):
+        """
+        Attempts are looked up by attempt code, so their history stays as it is
+        """
+        attempt = ProctoredExamStudentAttempt.objects.create(
+            proctored_exam=self.proctored_exam,
+            user=self.user,
+            attempt_code='123456',
+            external_id='abc',
+            allowed_time_limit_mins=90
+        )
+        attempt.delete_exam_attempt()
+        self.assertEqual(ProctoredExamStudentAttemptHistory.objects.count(), 1)
+
+    def test_concurrent_versions(self):
+        """
+        A version which somebody else has written in the meantime is encoded again
+        """
+        get_latest_state = ProctoredExamHistoryDelta._get_latest_state  # pylint: disable=protected-access
+        # the first time, it looks as if the other versions had not been written yet
+        side_effects = [(-1, None)]
+
+        def _get_latest_state(history_table, original_key):
+            """
+            Returns the stale state first
+            """
+            if side_effects:
+                return side_effects.pop()
+            return get_latest_state(history_table, original_key)
+
+        with patch.object(ProctoredExamHistoryDelta, '_get_latest_state', side_effect=_get_latest_state):
+            self.review.review_status = 'Clean'
+            self.review.save()
+
+        versions = ProctoredExamHistoryDelta.get_versions(ProctoredExamSoftwareSecureReviewHistory, 'abc')
+        self.assertEqual(len(versions), 6)
+        self.assertEqual(versions[-1].review_status, 'Suspicious')
+
+    def test_bulk_allowance_archives(self):
+        """
+        The bulk allowance updates are delta encoded like all of the others
+        """
+        allowance = ProctoredExamStudentAllowance.objects.create(
+            user=self.user,
+            proctored_exam=self.proctored_exam,
+            key='additional_time_granted',
+            value='10'
+        )
+        ProctoredExamStudentAllowance.objects.filter(id=allowance.id).update(value='20')
+        ProctoredExamStudentAllowance.add_allowances_for_users([
+            {'exam_id': self.proctored_exam.id, 'user_info': self.user.id, 'key': 'additional_time_granted',
+             'value': '30'},
+        ])
+
+        self.assertEqual(ProctoredExamStudentAllowanceHistory.objects.count(), 0)
+        versions = ProctoredExamHistoryDelta.get_versions(ProctoredExamStudentAllowanceHistory, allowance.id)
+        self.assertEqual([version.value for version in versions], ['10', '20'])
+
+    def test_estimate_savings(self):
+        """
+        Estimate the savings of full history rows
+        """
+        for review_status in ('Clean', 'Suspicious'):
+            ProctoredExamSoftwareSecureReviewHistory.objects.create(
+                attempt_code='def',
+                review_status=review_status,
+                raw_data='x' * 1000,
+                video_url='http://example.com/video'
+            )
+
+        result = ProctoredExamHistoryDelta.estimate_savings(ProctoredExamSoftwareSecureReviewHistory)
+        self.assertEqual(result['rows'], 2)
+        self.assertLess(result['delta_bytes'], result['full_bytes'] * 0.6)
+
+
+class ProctoredExamSoftwareSecureReviewRawDataTests(LoggedInTestCase):
+    """
+    Tests for the compressed storage of the review payloads
+    """
+
+    def setUp(self):
+        """
+        Build out test harnessing
+        """
+        super(ProctoredExamSoftwareSecureReviewRawDataTests, self).setUp()
+        self.raw_data = json.dumps({'reviewStatus': 'Clean', 'comments': [u'caf\xe9'] * 100})
+        self.review = ProctoredExamSoftwareSecureReview.objects.create(
+            attempt_code='abc',
+            review_status='Clean',
+            raw_data=self.raw_data,
+            video_url='http://example.com/video'
+        )
+
+    def test_compressed(self):
+        """
+        The payload is stored compressed and read back as it was
+        """
+        review = ProctoredExamSoftwareSecureReview.objects.get(id=self.review.id)
+        self.assertLess(len(review.raw_data_compressed), len(self.raw_data) / 4)
+        self.assertEqual(review.raw_data, self.raw_data)
+
+        review.raw_data = u'{}'
+        self.assertEqual(review.raw_data, u'{}')
+
+    def test_decompressed_on_access(self):
+        """
+        Loading a review doesn't decompress its payload
+        """
+        with patch('edx_proctoring.models.decompress_raw_data') as mock_decompress:
+            review = ProctoredExamSoftwareSecureReview.get_review_by_attempt_code('abc')
+            self.assertFalse(mock_decompress.called)
+
+            mock_decompress.return_value = self.raw_data
+            self.assertEqual(review.raw_data, self.raw_data)
+            self.assertEqual(review.raw_data, self.raw_data)
+            self.assertEqual(mock_decompress.call_count, 1)
+
+    def test_deferred(self):
+        """
+        The payload can be left out of a query, and is then loaded when it is read
+        """
+        review = ProctoredExamSoftwareSecureReview.objects.defer('raw_data_compressed').get(id=self.review.id)
+        with self.assertNumQueries(1):
+            self.assertEqual(review.raw_data, self.raw_data)
+
+    def test_old_column(self):
+        """
+        The payload is kept in the old raw_data column for the previous release, and rows
+        which that release wrote are read from it
+        """
+        self.assertEqual(
+            ProctoredExamSoftwareSecureReview.objects.filter(id=self.review.id).values_list('legacy_raw_data', flat=True)[0],
+            self.raw_data
+        )
+
+        ProctoredExamSoftwareSecureReview.objects.filter(id=self.review.id).update(raw_data_compressed='')
+        review = ProctoredExamSoftwareSecureReview.objects.get(id=self.review.id)
+        self.assertEqual(review.raw_data, self.raw_data)
+
+    def test_archived_compressed(self):
+        """
+        Updates archive the compressed payload as it was
+        """
+        raw_data_compressed = self.review.raw_data_compressed
+        self.review.raw_data = u'{}'
+        self.review.save()
+
+        archived = ProctoredExamSoftwareSecureReviewHistory.objects.get(attempt_code='abc')
+        self.assertEqual(archived.raw_data_compressed, raw_data_compressed)
+        self.assertEqual(archived.raw_data, self.raw_data)
+
+    def test_looked_up_without_payload(self):
+        """
+        Looking up a review by its attempt code leaves out the payloads, and updating
+        it still archives them
+        """
+        review = ProctoredExamSoftwareSecureReview.get_review_by_attempt_code('abc')
+        self.assertNotIn('raw_data_compressed', review.__dict__)
+        self.assertNotIn('legacy_raw_data', review.__dict__)
+
+        # only the status changed
+        review.review_status = 'Suspicious'
+        review.save()
+        archived = ProctoredExamSoftwareSecureReviewHistory.objects.get(attempt_code='abc')
+        self.assertEqual(archived.review_status, 'Clean')
+        self.assertEqual(archived.raw_data, self.raw_data)
+
+        # only the payload changed
+        review = ProctoredExamSoftwareSecureReview.get_review_by_attempt_code('abc')
+        review.raw_data = u'{}'
+        review.save()
+        archived = ProctoredExamSoftwareSecureReviewHistory.objects.order_by('-id')[0]
+        self.assertEqual(archived.review_status, 'Suspicious')
+        self.assertEqual(archived.raw_data, self.raw_data)
+
+        # nothing changed
+        review = ProctoredExamSoftwareSecureReview.get_review_by_attempt_code('abc')
+        review.save()
+        self.assertEqual(ProctoredExamSoftwareSecureReviewHistory.objects.count(), 2)
+
+    def test_without_old_column(self):
+        """
+        Once the previous release is gone, the payload can be written to the compressed
+        column only
+        """
+        with patch.dict('django.conf.settings.PROCTORING_SETTINGS', {'WRITE_LEGACY_RAW_DATA': False}):
+            self.review.raw_data = u'{}'
+            self.review.save()
+
+        review = ProctoredExamSoftwareSecureReview.objects.get(id=self.review.id)
+        self.assertEqual(review.legacy_raw_data, u'')
+        self.assertEqual(review.raw_data, u'{}')
+
+
+class ProctoredExamAttemptCodeIndexTests(LoggedInTestCase):
+    """
+    Tests for looking up the attempts by their attempt codes, live or archived
+    """
+
+    def setUp(self):
+        """
+        Build out test harnessing
+        """
+        super(ProctoredExamAttemptCodeIndexTests, self).setUp()
+        self.exam = ProctoredExam.objects.create(
+            course_id='test_course',
+            content_id='test_content',
+            exam_name='Test Exam',
+            external_id='123aXqe3',
+            time_limit_mins=90
+        )
+
+    def _create_attempt(self, attempt_code):
+        """
+        Creates an attempt of the test user
+        """
+        return ProctoredExamStudentAttempt.objects.create(
+            proctored_exam=self.exam,
+            user=self.user,
+            attempt_code=attempt_code,
+            allowed_time_limit_mins=90
+        )
+
+    def test_live_attempt(self):
+        """
+        A new attempt is indexed, and then read by its id
+        """
+        attempt = self._create_attempt('abc')
+
+        with self.assertNumQueries(1):
+            attempt_obj, is_archived = ProctoredExamAttemptCodeIndex.locate('abc')
+            self.assertEqual(attempt_obj.proctored_exam.course_id, 'test_course')
+        self.assertEqual(attempt_obj, attempt)
+        self.assertFalse(is_archived)
+
+        self.assertEqual(ProctoredExamAttemptCodeIndex.locate('unknown'), (None, False))
+
+    def test_archived_attempt(self):
+        """
+        Once the attempt is deleted, the code points at its archive copy, also without the cache
+        """
+        attempt = self._create_attempt('abc')
+        attempt_id = attempt.id
+        attempt.delete_exam_attempt()
+
+        entry = ProctoredExamAttemptCodeIndex.objects.get(attempt_code='abc')
+        self.assertIsNone(entry.attempt_id)
+
+        cache.clear()
+        with self.assertNumQueries(1):
+            attempt_obj, is_archived = ProctoredExamAttemptCodeIndex.locate('abc')
+            self.assertEqual(attempt_obj.user.username, self.user.username)
+        self.assertEqual(attempt_obj.id, entry.history_id)
+        self.assertEqual(attempt_obj.attempt_id, attempt_id)
+        self.assertTrue(is_archived)
+
+    @patch.dict('django.conf.settings.PROCTORING_SETTINGS', {'HISTORY_WRITE_MODE': 'buffered'})
+    def test_unwritten_archive_copy(self):
+        """
+        An archive copy which has not been written yet is found by its attempt code
+        """
+        self._create_attempt('abc').delete_exam_attempt()
+        self.assertIsNone(ProctoredExamAttemptCodeIndex.objects.get(attempt_code='abc').history_id)
+
+        attempt_obj, is_archived = ProctoredExamAttemptCodeIndex.locate('abc')
+        self.assertEqual(attempt_obj.attempt_code, 'abc')
+        self.assertTrue(is_archived)
+        # and the index now points at it
+        self.assertEqual(ProctoredExamAttemptCodeIndex.objects.get(attempt_code='abc').history_id, attempt_obj.id)
+
+    def test_reused_attempt_code(self):
+        """
+        The live attempt wins over the archived one with the same attempt code
+        """
+        self._create_attempt('abc').delete_exam_attempt()
+        attempt = self._create_attempt('abc')
+
+        cache.clear()
+        self.assertEqual(ProctoredExamAttemptCodeIndex.locate('abc'), (attempt, False))
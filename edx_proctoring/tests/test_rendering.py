@@ -0,0 +1,222 @@
+"""
+Tests for the rendering.py file
+"""
+
+from django.core.cache import cache
+from django.core.urlresolvers import NoReverseMatch, set_script_prefix
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import translation
+from mock import patch
+
+from edx_proctoring import rendering
+from edx_proctoring.benchmarks import run_benchmark
+
+
+class RenderingTests(TestCase):
+    """
+    Coverage of the template and url caches
+    """
+
+    def setUp(self):
+        """
+        Start every test with empty caches
+        """
+        super(RenderingTests, self).setUp()
+        rendering.clear_caches()
+        cache.clear()
+
+    def tearDown(self):
+        """
+        Don't leak cached state into other tests
+        """
+        super(RenderingTests, self).tearDown()
+        rendering.clear_caches()
+
+    def test_precompile_templates(self):
+        """
+        All student view templates get compiled once
+        """
+        with patch('edx_proctoring.rendering.loader.get_template') as mock_get_template:
+            rendering.precompile_templates()
+            self.assertEqual(mock_get_template.call_count, len(rendering.STUDENT_VIEW_TEMPLATES))
+
+            rendering.get_template(rendering.STUDENT_VIEW_TEMPLATES[0])
+            self.assertEqual(mock_get_template.call_count, len(rendering.STUDENT_VIEW_TEMPLATES))
+
+    @override_settings(TEMPLATE_DEBUG=True)
+    def test_no_template_caching_when_debugging(self):
+        """
+        Templates are reloaded every time when TEMPLATE_DEBUG is set
+        """
+        template_name = rendering.STUDENT_VIEW_TEMPLATES[0]
+        with patch('edx_proctoring.rendering.loader.get_template') as mock_get_template:
+            rendering.get_template(template_name)
+            rendering.get_template(template_name)
+            self.assertEqual(mock_get_template.call_count, 2)
+
+    def test_memoized_reverse(self):
+        """
+        Urls are only reversed once per view name and arguments
+        """
+        with patch('edx_proctoring.rendering.reverse', return_value='/foo/1') as mock_reverse:
+            url = rendering.memoized_reverse('edx_proctoring.proctored_exam.attempt', args=[1])
+            self.assertEqual(url, '/foo/1')
+            rendering.memoized_reverse('edx_proctoring.proctored_exam.attempt', args=[1])
+            self.assertEqual(mock_reverse.call_count, 1)
+
+            rendering.memoized_reverse('edx_proctoring.proctored_exam.attempt', args=[2])
+            self.assertEqual(mock_reverse.call_count, 2)
+
+    def test_memoized_reverse_no_match(self):
+        """
+        Failures are only raised when asked to, and not remembered
+        """
+        self.assertEqual(
+            rendering.memoized_reverse('courseware.views.progress', args=['a/b/c'], fail_silently=True),
+            ''
+        )
+        with self.assertRaises(NoReverseMatch):
+            rendering.memoized_reverse('courseware.views.progress', args=['a/b/c'])
+
+        with patch('edx_proctoring.rendering.reverse', return_value='/courses/a/b/c/progress'):
+            self.assertEqual(
+                rendering.memoized_reverse('courseware.views.progress', args=['a/b/c'], fail_silently=True),
+                '/courses/a/b/c/progress'
+            )
+
+    def test_memoized_reverse_script_prefix(self):
+        """
+        The urls are remembered per script prefix
+        """
+        url = rendering.memoized_reverse('edx_proctoring.proctored_exam.attempt', args=[1])
+        set_script_prefix('/lms/')
+        try:
+            self.assertEqual(
+                rendering.memoized_reverse('edx_proctoring.proctored_exam.attempt', args=[1]),
+                '/lms' + url
+            )
+        finally:
+            set_script_prefix('/')
+        self.assertEqual(rendering.memoized_reverse('edx_proctoring.proctored_exam.attempt', args=[1]), url)
+
+    def test_memoized_reverse_is_bounded(self):
+        """
+        The url cache gets dropped once it is full
+        """
+        with patch('edx_proctoring.rendering.MAX_CACHED_URLS', 2):
+            for attempt_id in range(3):
+                rendering.memoized_reverse('edx_proctoring.proctored_exam.attempt', args=[attempt_id])
+            self.assertEqual(len(rendering._REVERSED_URLS), 1)  # pylint: disable=protected-access
+
+    def test_student_view_benchmark(self):
+        """
+        Make sure the benchmark scenario runs
+        """
+        results = run_benchmark('student_view', 2)
+        self.assertEqual([label for label, __ in results], ['uncached', 'cached'])
+
+    def test_render_student_view(self):
+        """
+        The state is rendered with the urls at the top level, on top of the caller's context
+        """
+        state = {
+            'template': 'seq_proctored_exam_verified',
+            'exam_id': 17,
+            'urls': {
+                'progress_page_url': '/courses/a/b/c/progress',
+            },
+            'link_urls': {
+                'faq': '/faq',
+            },
+        }
+        rendered = rendering.render_student_view(state, {'exam_id': 1})
+        self.assertIn('data-exam-id="17"', rendered)
+        self.assertIn('href="/courses/a/b/c/progress"', rendered)
+        self.assertIn('href="/faq"', rendered)
+
+
+class FragmentCacheTests(TestCase):
+    """
+    Coverage of the rendered page cache
+    """
+
+    def setUp(self):
+        """
+        Start every test with empty caches
+        """
+        super(FragmentCacheTests, self).setUp()
+        cache.clear()
+        self.state = {
+            'template': 'seq_proctored_exam_verified',
+            'exam_id': 17,
+            'display_name': 'Midterm',
+            'total_time': '1 hour',
+            'platform_name': 'Open edX',
+            'urls': {
+                'progress_page_url': '/courses/a/b/c/progress',
+                'exam_started_poll_url': '/attempt/1',
+            },
+            'link_urls': {
+                'faq': '/faq',
+            },
+        }
+
+    def _render(self, state):
+        """
+        Renders the state, returns the number of times the template actually got rendered
+        """
+        with patch('edx_proctoring.rendering._render_student_view', return_value='html') as mock_render:
+            self.assertEqual(rendering.render_student_view(state), 'html')
+        return mock_render.call_count
+
+    def test_rendered_once(self):
+        """
+        Pages which are the same for everybody are only rendered once
+        """
+        self.assertEqual(self._render(self.state), 1)
+        self.assertEqual(self._render(self.state), 0)
+
+        # the attempt specific urls are not used by the page
+        state = dict(self.state, urls=dict(self.state['urls'], exam_started_poll_url='/attempt/2'))
+        self.assertEqual(self._render(state), 0)
+
+    def test_not_cacheable(self):
+        """
+        Pages with user specific content are always rendered
+        """
+        self.state['template'] = 'seq_proctored_exam_instructions'
+        self.assertEqual(self._render(self.state), 1)
+        self.assertEqual(self._render(self.state), 1)
+
+    def test_keyed_by_config(self):
+        """
+        Changing the configuration which ends up in the page busts the cache
+        """
+        self.assertEqual(self._render(self.state), 1)
+        self.state['link_urls'] = {'faq': '/other_faq'}
+        self.assertEqual(self._render(self.state), 1)
+
+    def test_keyed_by_locale(self):
+        """
+        Every language gets its own copy
+        """
+        self.assertEqual(self._render(self.state), 1)
+        with translation.override('eo'):
+            self.assertEqual(self._render(self.state), 1)
+
+    def test_invalidate(self):
+        """
+        Invalidating the exam drops its pages
+        """
+        self.assertEqual(self._render(self.state), 1)
+        rendering.invalidate_exam_fragments(self.state['exam_id'])
+        self.assertEqual(self._render(self.state), 1)
+
+    @patch.dict('django.conf.settings.PROCTORING_SETTINGS', {'FRAGMENT_CACHE_TIMEOUT': 0})
+    def test_disabled(self):
+        """
+        The cache can be turned off
+        """
+        self.assertEqual(self._render(self.state), 1)
+        self.assertEqual(self._render(self.state), 1)
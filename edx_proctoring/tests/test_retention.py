@@ -0,0 +1,269 @@
+"""
+Tests for the retention.py file
+"""
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+import pytz
+from mock import patch
+
+from edx_proctoring import history, retention
+from django.core.cache import cache
+
+from edx_proctoring.models import (
+    ProctoredExam,
+    ProctoredExamAttemptCodeIndex,
+    ProctoredExamHistoryDelta,
+    ProctoredExamStudentAllowanceHistory,
+    ProctoredExamStudentAttemptHistory,
+)
+from edx_proctoring.utils import locate_attempt_by_attempt_code
+
+from .utils import LoggedInTestCase
+
+
+class HistoryRetentionTests(LoggedInTestCase):
+    """
+    Coverage of moving old history rows into the archive files
+    """
+
+    def setUp(self):
+        """
+        Build out test harnessing
+        """
+        super(HistoryRetentionTests, self).setUp()
+        self.archive_dir = tempfile.mkdtemp()
+        self.proctored_exam = ProctoredExam.objects.create(
+            course_id='test_course',
+            content_id='test_content',
+            exam_name='Test Exam',
+            external_id='123aXqe3',
+            time_limit_mins=90
+        )
+        self.long_ago = datetime(2014, 3, 1, 10, 0, tzinfo=pytz.UTC)
+
+        for attempt_code in ('old1', 'old2', 'new'):
+            ProctoredExamStudentAttemptHistory.objects.create(
+                user=self.user,
+                proctored_exam=self.proctored_exam,
+                attempt_id=1,
+                attempt_code=attempt_code,
+                allowed_time_limit_mins=90,
+                status='submitted',
+                taking_as_proctored=True,
+                is_sample_attempt=False,
+                student_name='tester',
+            )
+        ProctoredExamStudentAttemptHistory.objects.exclude(attempt_code='new').update(created=self.long_ago)
+
+        ProctoredExamStudentAllowanceHistory.objects.create(
+            allowance_id=1,
+            user=self.user,
+            proctored_exam=self.proctored_exam,
+            key='additional_time_granted',
+            value='30'
+        )
+
+    def tearDown(self):
+        """
+        Remove the archive files
+        """
+        super(HistoryRetentionTests, self).tearDown()
+        shutil.rmtree(self.archive_dir)
+
+    def test_archive_history(self):
+        """
+        Only the old rows are moved, and they end up in the file of their day
+        """
+        result = retention.archive_history(retention_days=30, archive_dir=self.archive_dir, chunk_size=1)
+
+        self.assertEqual(result['proctoring_proctoredexamstudentattempthistory'], 2)
+        self.assertEqual(result['proctoring_proctoredexamstudentallowancehistory'], 0)
+        self.assertEqual(
+            list(ProctoredExamStudentAttemptHistory.objects.values_list('attempt_code', flat=True)),
+            ['new']
+        )
+        self.assertEqual(ProctoredExamStudentAllowanceHistory.objects.count(), 1)
+
+        archive_filename = os.path.join(
+            self.archive_dir,
+            'proctoring_proctoredexamstudentattempthistory',
+            '2014-03-01.jsonl.gz'
+        )
+        with gzip.open(archive_filename, 'rb') as archive_file:
+            rows = [json.loads(line) for line in archive_file]
+        self.assertEqual([row['attempt_code'] for row in rows], ['old1', 'old2'])
+
+    @patch.dict('django.conf.settings.PROCTORING_SETTINGS', {'HISTORY_FORMAT': 'delta', 'HISTORY_SNAPSHOT_INTERVAL': 2})
+    def test_archive_deltas(self):
+        """
+        Delta encoded versions are moved up to the most recent snapshot before the
+        cutoff, which keeps every version which is left rebuildable
+        """
+        for value in range(6):
+            history.archive(ProctoredExamStudentAllowanceHistory(
+                allowance_id=2,
+                user=self.user,
+                proctored_exam=self.proctored_exam,
+                key='additional_time_granted',
+                value=str(value)
+            ))
+        # all versions are old, but the last one
+        ProctoredExamHistoryDelta.objects.exclude(version=5).update(created=self.long_ago)
+        # another row, which only has a single old snapshot
+        history.archive(ProctoredExamStudentAllowanceHistory(
+            allowance_id=3,
+            user=self.user,
+            proctored_exam=self.proctored_exam,
+            key='additional_time_granted',
+            value='30'
+        ))
+        ProctoredExamHistoryDelta.objects.filter(original_key='3').update(created=self.long_ago)
+
+        result = retention.archive_history(retention_days=30, archive_dir=self.archive_dir, chunk_size=2)
+
+        # versions 0 to 3 are superseded by the snapshot at version 4
+        self.assertEqual(result['proctoring_proctoredexamhistorydelta'], 4)
+        self.assertEqual(
+            sorted(ProctoredExamHistoryDelta.objects.values_list('original_key', 'version')),
+            [(u'2', 4), (u'2', 5), (u'3', 0)]
+        )
+        self.assertEqual(
+            [version.value for version in ProctoredExamHistoryDelta.get_versions(ProctoredExamStudentAllowanceHistory, 2)],
+            ['4', '5']
+        )
+
+        archive_filename = os.path.join(self.archive_dir, 'proctoring_proctoredexamhistorydelta', '2014-03-01.jsonl.gz')
+        with gzip.open(archive_filename, 'rb') as archive_file:
+            self.assertEqual([json.loads(line)['version'] for line in archive_file], [0, 1, 2, 3])
+
+    def test_find_archived_attempt(self):
+        """
+        Attempts which have been moved out of the tables can still be found
+        """
+        retention.archive_history(retention_days=30, archive_dir=self.archive_dir)
+
+        attempt = retention.find_archived_attempt_by_code('old2', archive_dir=self.archive_dir)
+        self.assertEqual(attempt.attempt_code, 'old2')
+        self.assertEqual(attempt.created, self.long_ago)
+        self.assertEqual(attempt.user_id, self.user.id)
+
+        self.assertIsNone(retention.find_archived_attempt_by_code('new', archive_dir=self.archive_dir))
+        self.assertIsNone(retention.find_archived_attempt_by_code('old1', archive_dir=None))
+
+    def test_lookups_cached(self):
+        """
+        Lookups only read the index file of the attempt code once, found or not
+        """
+        retention.archive_history(retention_days=30, archive_dir=self.archive_dir)
+
+        wrapped = patch('edx_proctoring.retention._find_archive_filenames', wraps=retention._find_archive_filenames)
+        with wrapped as mock_find:
+            for __ in range(2):
+                found = retention.find_archived_attempts_by_codes(['old1', 'unknown'], archive_dir=self.archive_dir)
+                self.assertEqual(found.keys(), ['old1'])
+        self.assertEqual(mock_find.call_count, 1)
+
+        # the index files are keyed by the attempt code
+        index_dir = os.path.join(
+            self.archive_dir,
+            'proctoring_proctoredexamstudentattempthistory',
+            retention.ATTEMPT_CODE_INDEX_DIRNAME
+        )
+        self.assertEqual(len(os.listdir(index_dir)), 2)
+
+    def test_archiving_clears_cached_misses(self):
+        """
+        An attempt code which was not found is found once it has been archived
+        """
+        self.assertIsNone(retention.find_archived_attempt_by_code('old1', archive_dir=self.archive_dir))
+        retention.archive_history(retention_days=30, archive_dir=self.archive_dir)
+        self.assertEqual(
+            retention.find_archived_attempt_by_code('old1', archive_dir=self.archive_dir).attempt_code,
+            'old1'
+        )
+
+    def test_legacy_index(self):
+        """
+        The single index file of the earlier archives is still read, and split up by the next run
+        """
+        table_dir = os.path.join(self.archive_dir, 'proctoring_proctoredexamstudentattempthistory')
+        os.makedirs(table_dir)
+        with gzip.open(os.path.join(table_dir, '2014-02-01.jsonl.gz'), 'wb') as archive_file:
+            row = ProctoredExamStudentAttemptHistory.objects.filter(attempt_code='new').values()[0]
+            row.update(id=100, attempt_code='legacy', created=self.long_ago - timedelta(days=28))
+            archive_file.write(json.dumps(row, cls=retention.DjangoJSONEncoder) + '\n')
+        with open(os.path.join(table_dir, retention.LEGACY_ATTEMPT_CODE_INDEX_FILENAME), 'w') as index_file:
+            index_file.write(json.dumps({'attempt_code': 'legacy', 'file': '2014-02-01.jsonl.gz'}) + '\n')
+
+        self.assertEqual(retention.find_archived_attempt_by_code('legacy', archive_dir=self.archive_dir).id, 100)
+
+        retention.archive_history(retention_days=30, archive_dir=self.archive_dir)
+        self.assertFalse(os.path.exists(os.path.join(table_dir, retention.LEGACY_ATTEMPT_CODE_INDEX_FILENAME)))
+        found = retention.find_archived_attempts_by_codes(['legacy', 'old1'], archive_dir=self.archive_dir)
+        self.assertEqual(sorted(found.keys()), ['legacy', 'old1'])
+
+    def test_locate_attempt(self):
+        """
+        locate_attempt_by_attempt_code falls back to the archive files
+        """
+        retention.archive_history(retention_days=30, archive_dir=self.archive_dir)
+
+        with self.settings(PROCTORING_SETTINGS={'HISTORY_ARCHIVE_DIR': self.archive_dir}):
+            attempt, is_archived = locate_attempt_by_attempt_code('old1')
+        self.assertEqual(attempt.attempt_code, 'old1')
+        self.assertTrue(is_archived)
+
+    def test_index_entries_retained(self):
+        """
+        The index entries of the attempts which were moved out are marked, so that
+        looking them up doesn't go through the history table again
+        """
+        for attempt_obj in ProctoredExamStudentAttemptHistory.objects.all():
+            ProctoredExamAttemptCodeIndex.objects.create(attempt_code=attempt_obj.attempt_code, history=attempt_obj)
+
+        retention.archive_history(retention_days=30, archive_dir=self.archive_dir)
+        retained = ProctoredExamAttemptCodeIndex.objects.filter(retained=True)
+        self.assertEqual(sorted(retained.values_list('attempt_code', flat=True)), ['old1', 'old2'])
+        self.assertIsNotNone(ProctoredExamAttemptCodeIndex.objects.get(attempt_code='new').history_id)
+
+        with patch('edx_proctoring.models.history.flush') as mock_flush:
+            with self.assertNumQueries(1):
+                self.assertEqual(ProctoredExamAttemptCodeIndex.locate('old1'), (None, False))
+            with self.assertNumQueries(0):
+                self.assertEqual(ProctoredExamAttemptCodeIndex.locate('old1'), (None, False))
+        self.assertFalse(mock_flush.called)
+
+        with self.settings(PROCTORING_SETTINGS={'HISTORY_ARCHIVE_DIR': self.archive_dir}):
+            attempt, is_archived = locate_attempt_by_attempt_code('old1')
+        self.assertEqual(attempt.attempt_code, 'old1')
+        self.assertTrue(is_archived)
+
+    def test_unmarked_index_entries(self):
+        """
+        Index entries of attempts which were moved out before they got marked are
+        marked once the attempt is not found in the history table
+        """
+        retention.archive_history(retention_days=30, archive_dir=self.archive_dir)
+        entry = ProctoredExamAttemptCodeIndex.objects.create(attempt_code='old1')
+        ProctoredExamAttemptCodeIndex.objects.filter(id=entry.id).update(modified=self.long_ago)
+
+        with patch('edx_proctoring.models.history.flush') as mock_flush:
+            self.assertEqual(ProctoredExamAttemptCodeIndex.locate_many(['old1']), {})
+            self.assertTrue(ProctoredExamAttemptCodeIndex.objects.get(id=entry.id).retained)
+
+            cache.clear()
+            self.assertEqual(ProctoredExamAttemptCodeIndex.locate_many(['old1']), {})
+        self.assertEqual(mock_flush.call_count, 1)
+
+    def test_no_archive_dir(self):
+        """
+        There has to be somewhere to write the archives to
+        """
+        with self.assertRaises(ValueError):
+            retention.archive_history(retention_days=30)
@@ -0,0 +1,163 @@
+"""
+Tests for the simulator.py file
+"""
+
+import json
+
+from django.core.urlresolvers import reverse
+from httmock import all_requests, HTTMock
+from mock import patch
+
+from edx_proctoring.api import create_exam, create_exam_attempt, get_exam_attempt_by_id
+from edx_proctoring.backends import get_backend_provider
+from edx_proctoring.models import ProctoredExamSoftwareSecureReview, ProctoredExamStudentAttemptStatus
+from edx_proctoring.runtime import set_runtime_service
+from edx_proctoring.simulator import SoftwareSecureSimulator, build_review_payload
+from edx_proctoring.tests.test_services import MockCreditService
+
+from .utils import LoggedInTestCase
+
+
+SIMULATED_PROVIDER = {
+    "class": "edx_proctoring.backends.software_secure.SoftwareSecureBackendProvider",
+    "options": {
+        "secret_key_id": "foo",
+        "secret_key": "4B230FA45A6EC5AE8FDE2AFFACFABAA16D8A3D0B",
+        "crypto_key": "123456789123456712345678",
+        "organization": "edx",
+        "exam_sponsor": "edX LMS",
+        "software_download_url": "http://example.com",
+        "max_retries": 0,
+    },
+    "settings": {}
+}
+
+
+class SoftwareSecureSimulatorTests(LoggedInTestCase):
+    """
+    Coverage of the SoftwareSecure simulator
+    """
+
+    def setUp(self):
+        """
+        Build out test harnessing
+        """
+        super(SoftwareSecureSimulatorTests, self).setUp()
+        set_runtime_service('credit', MockCreditService())
+
+    def test_registration(self):
+        """
+        Registrations need a signature and an exam code
+        """
+        simulator = SoftwareSecureSimulator(seed=1)
+        body = json.dumps({'examCode': 'ABC'})
+
+        self.assertEqual(simulator.handle_registration(body, None)[0], 401)
+        self.assertEqual(simulator.handle_registration('{}', 'SSI foo:bar')[0], 400)
+
+        status, content = simulator.handle_registration(body, 'SSI foo:bar')
+        self.assertEqual(status, 200)
+        self.assertEqual(simulator.unreviewed, {'ABC': json.loads(content)['ssiRecordLocator']})
+        self.assertEqual(simulator.stats['registered'], 1)
+
+    @patch('edx_proctoring.simulator.time.sleep')
+    def test_injected_failures(self, mock_sleep):
+        """
+        The configured share of the registrations fail, after the configured latency
+        """
+        simulator = SoftwareSecureSimulator(
+            latency=0.5,
+            latency_jitter=0.1,
+            error_rate=1.0,
+            error_statuses=(502, 504),
+            seed=1
+        )
+        for __ in range(10):
+            status, __ = simulator.handle_registration(json.dumps({'examCode': 'ABC'}), 'SSI foo:bar')
+            self.assertIn(status, (502, 504))
+
+        self.assertEqual(simulator.stats['errors'], 10)
+        self.assertEqual(simulator.unreviewed, {})
+        for call in mock_sleep.call_args_list:
+            self.assertTrue(0.5 <= call[0][0] <= 0.6)
+
+    def test_review_payload(self):
+        """
+        The reviews carry what the review callback looks at
+        """
+        review = build_review_payload('ABC', 'LOCATOR', review_status='Suspicious')
+        self.assertEqual(review['examMetaData']['examCode'], 'ABC')
+        self.assertEqual(review['examMetaData']['ssiRecordLocator'], 'LOCATOR')
+        self.assertEqual(review['reviewStatus'], 'Suspicious')
+
+    def _post_to_callbacks(self):
+        """
+        Hands the requests of the simulator to the callbacks of the test client
+        """
+
+        @all_requests
+        def forward(url, request):
+            """
+            POSTs the request body to the same path
+            """
+            response = self.client.post(url.path, data=request.body, content_type='application/json')
+            return {'status_code': response.status_code, 'content': response.content}
+
+        return HTTMock(forward)
+
+    @patch('edx_proctoring.api.get_provider_name_by_course_id', return_value='SIMULATOR')
+    @patch('edx_proctoring.callbacks.get_provider_name_by_course_id', return_value='SIMULATOR')
+    def _test_end_to_end(self, *args, **kwargs):  # pylint: disable=unused-argument
+        """
+        Registers attempts with a running simulator, which then sends their reviews
+        """
+        simulator = SoftwareSecureSimulator(**kwargs)
+        providers = {'SIMULATOR': dict(SIMULATED_PROVIDER)}
+        providers['SIMULATOR']['options'] = dict(SIMULATED_PROVIDER['options'], exam_register_endpoint=simulator.start())
+
+        exam_id = create_exam(
+            course_id='a/b/c',
+            content_id='test_content',
+            exam_name='Test Exam',
+            time_limit_mins=90
+        )
+        try:
+            with self.settings(PROCTORING_BACKEND_PROVIDERS=providers):
+                with patch('edx_proctoring.api._register_exam_attempt_with_provider') as mock_register:
+                    # the real registration needs the LMS urls, so only the provider call is made here
+                    mock_register.side_effect = lambda exam, user, attempt_code, *args: (
+                        get_backend_provider('SIMULATOR').register_exam_attempt(exam, {
+                            'attempt_code': attempt_code,
+                            'time_limit_mins': 90,
+                            'is_sample_attempt': False,
+                            'callback_url': 'http://localhost',
+                            'full_name': 'John Doe',
+                        })
+                    )
+                    attempt_id = create_exam_attempt(exam_id, self.user.id, taking_as_proctored=True)
+                self.assertEqual(simulator.stats['registered'], 1)
+
+                with self._post_to_callbacks():
+                    self.assertEqual(simulator.send_reviews(), 1)
+        finally:
+            simulator.stop()
+
+        attempt = get_exam_attempt_by_id(attempt_id)
+        self.assertEqual(attempt['status'], ProctoredExamStudentAttemptStatus.verified)
+        review = ProctoredExamSoftwareSecureReview.get_review_by_attempt_code(attempt['attempt_code'])
+        self.assertEqual(review.review_status, 'Clean')
+
+    def test_end_to_end(self):
+        """
+        With the review callback
+        """
+        self._test_end_to_end(review_url='http://testserver' + reverse('edx_proctoring.anonymous.proctoring_review_callback'))
+
+    def test_end_to_end_bulk(self):
+        """
+        With the bulk review callback
+        """
+        self._test_end_to_end(
+            bulk_review_url='http://testserver' + reverse('edx_proctoring.anonymous.proctoring_bulk_review_callback'),
+            bulk_size=10
+        )
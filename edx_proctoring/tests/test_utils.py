@@ -2,7 +2,20 @@
 File that contains tests for the util methods.
 """
 import unittest
-from edx_proctoring.utils import humanized_time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from mock import patch
+
+from edx_proctoring.models import ProctoredExam, ProctoredExamStudentAttempt
+from edx_proctoring.utils import (
+    get_payload_fingerprint,
+    humanized_time,
+    locate_attempts_by_attempt_codes,
+    review_callback_lock,
+)
+
+from .utils import LoggedInTestCase
 
 
 class TestHumanizedTime(unittest.TestCase):
@@ -45,3 +58,90 @@ class TestHumanizedTime(unittest.TestCase):
 
         human_time = humanized_time(-60)
         self.assertEqual(human_time, "error")
+
+
+class TestReviewCallbackHelpers(unittest.TestCase):
+    """
+    Class to test the helpers of the review callbacks
+    """
+
+    def test_payload_fingerprint(self):
+        """
+        The fingerprint doesn't depend on the order of the keys
+        """
+        self.assertEqual(
+            get_payload_fingerprint({'a': 1, 'b': [1, {'c': u'\u0905', 'd': None}]}),
+            get_payload_fingerprint({'b': [1, {'d': None, 'c': u'\u0905'}], 'a': 1})
+        )
+        self.assertNotEqual(
+            get_payload_fingerprint({'a': 1}),
+            get_payload_fingerprint({'a': 2})
+        )
+
+    @patch.dict('django.conf.settings.PROCTORING_SETTINGS', {'REVIEW_CALLBACK_LOCK_TIMEOUT': 0.2})
+    @patch('edx_proctoring.utils.time')
+    def test_review_callback_lock(self, mock_time):
+        """
+        The lock is released afterwards, and waited for while it is held
+        """
+        key = 'edx_proctoring.review_callback_lock.ABC'
+        mock_time.time.return_value = 0
+
+        with review_callback_lock('ABC'):
+            self.assertTrue(cache.get(key))
+
+            # a second delivery waits until the timeout, and then goes ahead anyway
+            mock_time.time.side_effect = [0, 0.1, 0.3]
+            with review_callback_lock('ABC'):
+                pass
+            self.assertEqual(mock_time.sleep.call_count, 1)
+            self.assertTrue(cache.get(key))
+
+        self.assertIsNone(cache.get(key))
+
+        # released, so no waiting
+        mock_time.time.side_effect = None
+        with review_callback_lock('ABC'):
+            pass
+        self.assertEqual(mock_time.sleep.call_count, 1)
+
+
+class TestLocateAttempts(LoggedInTestCase):
+    """
+    Class to test looking up many attempts by their attempt codes
+    """
+
+    def test_locate_attempts(self):
+        """
+        Attempts are found in either table, with one query
+        """
+        exam = ProctoredExam.objects.create(
+            course_id='test_course',
+            content_id='test_content',
+            exam_name='Test Exam',
+            external_id='123aXqe3',
+            time_limit_mins=90
+        )
+        attempt = ProctoredExamStudentAttempt.objects.create(
+            proctored_exam=exam,
+            user=self.user,
+            attempt_code='LIVE',
+            allowed_time_limit_mins=90
+        )
+        archived = ProctoredExamStudentAttempt.objects.create(
+            proctored_exam=exam,
+            user=User.objects.create(username='archived'),
+            attempt_code='ARCHIVED',
+            allowed_time_limit_mins=90
+        )
+        archived_id = archived.id
+        archived.delete_exam_attempt()
+
+        with self.assertNumQueries(1):
+            located = locate_attempts_by_attempt_codes(['LIVE', 'ARCHIVED', 'UNKNOWN'])
+            self.assertEqual(located['ARCHIVED'][0].proctored_exam.course_id, 'test_course')
+
+        self.assertEqual(sorted(located), ['ARCHIVED', 'LIVE'])
+        self.assertEqual(located['LIVE'], (attempt, False))
+        self.assertEqual(located['ARCHIVED'][0].attempt_id, archived_id)
+        self.assertTrue(located['ARCHIVED'][1])
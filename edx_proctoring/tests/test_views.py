@@ -5,7 +5,7 @@ All tests for the proctored_exams.py
 import json
 import pytz
 import ddt
-from mock import Mock
+from mock import Mock, patch
 from freezegun import freeze_time
 from httmock import HTTMock
 from string import Template  # pylint: disable=deprecated-module
@@ -16,11 +16,13 @@ from django.contrib.auth.models import User
 
 from edx_proctoring.models import (
     ProctoredExam,
+    ProctoredExamSoftwareSecureReview,
     ProctoredExamStudentAttempt,
     ProctoredExamStudentAllowance,
     ProctoredExamStudentAttemptStatus,
 )
 from edx_proctoring.views import require_staff
+from edx_proctoring.utils import get_payload_fingerprint
 from edx_proctoring.api import (
     create_exam,
     create_exam_attempt,
@@ -1398,6 +1400,110 @@ class TestStudentProctoredExamAttempt(LoggedInTestCase):
         )
         self.assertEqual(response.status_code, 404)
 
+    def _create_bulk_start_attempts(self, statuses, course_ids=None):
+        """
+        Creates an attempt in each of the given statuses, in exams of the same course
+        unless course_ids are given, returns their attempt codes
+        """
+        attempt_codes = []
+        for index, status in enumerate(statuses):
+            proctored_exam = ProctoredExam.objects.create(
+                course_id=course_ids[index] if course_ids else 'a/b/c',
+                content_id='test_content_{index}'.format(index=index),
+                exam_name='Test Exam',
+                external_id='123aXqe3',
+                time_limit_mins=90,
+                is_proctored=True
+            )
+            attempt = ProctoredExamStudentAttempt.objects.create(
+                proctored_exam_id=proctored_exam.id,
+                user_id=self.user.id,
+                external_id='123aXqe3',
+                attempt_code='{index}-0a1b-{status}'.format(index=index, status=status),
+                allowed_time_limit_mins=90,
+                status=status
+            )
+            attempt_codes.append(attempt.attempt_code)
+        return attempt_codes
+
+    def test_bulk_start_exams_callback(self):
+        """
+        Start all of the exams of a proctoring session at once
+        """
+        attempt_codes = self._create_bulk_start_attempts([
+            ProctoredExamStudentAttemptStatus.created,
+            ProctoredExamStudentAttemptStatus.eligible,
+            ProctoredExamStudentAttemptStatus.started,
+        ])
+
+        # one query to load the attempts, and one to update them
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse(
+                    'edx_proctoring.anonymous.proctoring_launch_callback.bulk_start_exams_callback',
+                    args=[','.join(attempt_codes + ['foo'])]
+                )
+            )
+        self.assertEqual(response.status_code, 200)
+
+        statuses = dict(
+            ProctoredExamStudentAttempt.objects.values_list('attempt_code', 'status')
+        )
+        self.assertEqual(statuses[attempt_codes[0]], ProctoredExamStudentAttemptStatus.ready_to_start)
+        self.assertEqual(statuses[attempt_codes[1]], ProctoredExamStudentAttemptStatus.ready_to_start)
+        # started exams don't go back
+        self.assertEqual(statuses[attempt_codes[2]], ProctoredExamStudentAttemptStatus.started)
+
+        # the skipped codes get reported
+        self.assertIn('{code} (started)'.format(code=attempt_codes[2]), response.content)
+        self.assertIn('foo (not_found)', response.content)
+        self.assertNotIn(attempt_codes[0], response.content)
+
+    def test_bulk_start_exams_callback_repeated(self):
+        """
+        Exams which already are ready to start don't get reported, and the exams of
+        another course than the session's are left alone
+        """
+        attempt_codes = self._create_bulk_start_attempts(
+            [
+                ProctoredExamStudentAttemptStatus.ready_to_start,
+                ProctoredExamStudentAttemptStatus.created,
+                ProctoredExamStudentAttemptStatus.created,
+            ],
+            course_ids=['a/b/c', 'a/b/c', 'd/e/f']
+        )
+
+        response = self.client.get(
+            reverse(
+                'edx_proctoring.anonymous.proctoring_launch_callback.bulk_start_exams_callback',
+                args=[','.join(attempt_codes)]
+            )
+        )
+        self.assertEqual(response.status_code, 200)
+
+        statuses = dict(
+            ProctoredExamStudentAttempt.objects.values_list('attempt_code', 'status')
+        )
+        self.assertEqual(statuses[attempt_codes[0]], ProctoredExamStudentAttemptStatus.ready_to_start)
+        self.assertEqual(statuses[attempt_codes[1]], ProctoredExamStudentAttemptStatus.ready_to_start)
+        self.assertEqual(statuses[attempt_codes[2]], ProctoredExamStudentAttemptStatus.created)
+
+        self.assertNotIn(attempt_codes[0], response.content)
+        self.assertNotIn(attempt_codes[1], response.content)
+        self.assertIn('{code} (other_course)'.format(code=attempt_codes[2]), response.content)
+
+    def test_bulk_start_bad_exam_codes(self):
+        """
+        Assert that we get a 404 when none of the exam codes exist
+        """
+        response = self.client.get(
+            reverse(
+                'edx_proctoring.anonymous.proctoring_launch_callback.bulk_start_exams_callback',
+                args=['foo,bar']
+            )
+        )
+        self.assertEqual(response.status_code, 404)
+
     def test_review_callback(self):
         """
         Simulates a callback from the proctoring service with the
@@ -1547,6 +1653,31 @@ class TestStudentProctoredExamAttempt(LoggedInTestCase):
         )
         self.assertEqual(response.status_code, 400)
 
+    def test_review_redelivery(self):
+        """
+        Simulates SoftwareSecure retrying a callback which we have already handled
+        """
+        test_payload = Template(TEST_REVIEW_PAYLOAD).substitute(
+            attempt_code='ABCDEF',
+            external_id='LOCATOR'
+        )
+        ProctoredExamSoftwareSecureReview.objects.create(
+            attempt_code='ABCDEF',
+            review_status='Clean',
+            raw_data=test_payload,
+            payload_fingerprint=get_payload_fingerprint(json.loads(test_payload))
+        )
+
+        with patch('edx_proctoring.callbacks.locate_attempt_by_attempt_code') as mock_locate:
+            with self.assertNumQueries(1):
+                response = Client().post(
+                    reverse('edx_proctoring.anonymous.proctoring_review_callback'),
+                    data=test_payload,
+                    content_type='application/json'
+                )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(mock_locate.called)
+
     def test_review_callback_get(self):
         """
         We don't support any http METHOD other than GET
@@ -1689,6 +1820,153 @@ class TestExamAllowanceView(LoggedInTestCase):
         self.assertEqual(response_data[0]['key'], allowance_data['key'])
 
 
+class TestBulkExamAllowanceView(LoggedInTestCase):
+    """
+    Tests for the BulkExamAllowanceView
+    """
+    def setUp(self):
+        super(TestBulkExamAllowanceView, self).setUp()
+        self.user.is_staff = True
+        self.user.save()
+        self.client.login_user(self.user)
+        self.student_taking_exam = User(username='student', email='student@test.com')
+        self.student_taking_exam.save()
+        self.proctored_exam = ProctoredExam.objects.create(
+            course_id='a/b/c',
+            content_id='test_content',
+            exam_name='Test Exam',
+            external_id='123aXqe3',
+            time_limit_mins=90
+        )
+
+    def test_add_allowances(self):
+        """
+        Add allowances for many users at once
+        """
+        response = self.client.put(
+            reverse('edx_proctoring.proctored_exam.bulk_allowance'),
+            json.dumps({
+                'allowances': [
+                    {
+                        'exam_id': self.proctored_exam.id,
+                        'user_info': self.student_taking_exam.email,
+                        'key': 'additional_time_granted',
+                        'value': '30'
+                    },
+                    {
+                        'exam_id': self.proctored_exam.id,
+                        'user_info': 'invalid_user',
+                        'key': 'additional_time_granted',
+                        'value': '30'
+                    },
+                ]
+            }),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        response_data = json.loads(response.content)
+        self.assertEqual(response_data['added'], 1)
+        self.assertEqual(response_data['updated'], 0)
+        self.assertEqual(len(response_data['errors']), 1)
+        self.assertEqual(response_data['errors'][0]['index'], 1)
+
+        self.assertEqual(
+            ProctoredExamStudentAllowance.objects.get(user=self.student_taking_exam).value,
+            '30'
+        )
+
+    def test_bad_request(self):
+        """
+        Every allowance needs all of its fields
+        """
+        response = self.client.put(
+            reverse('edx_proctoring.proctored_exam.bulk_allowance'),
+            json.dumps({
+                'allowances': [{'exam_id': self.proctored_exam.id}]
+            }),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_staff(self):
+        """
+        Only staff can import allowances
+        """
+        self.user.is_staff = False
+        self.user.save()
+        response = self.client.put(
+            reverse('edx_proctoring.proctored_exam.bulk_allowance'),
+            json.dumps({'allowances': []}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class TestStudentProctoredExamViewState(LoggedInTestCase):
+    """
+    Tests for the StudentProctoredExamViewState
+    """
+    def setUp(self):
+        super(TestStudentProctoredExamViewState, self).setUp()
+        self.client.login_user(self.user)
+        set_runtime_service('credit', MockCreditService())
+
+        self.proctored_exam = ProctoredExam.objects.create(
+            course_id='a/b/c',
+            content_id='test_content',
+            exam_name='Test Exam',
+            external_id='123aXqe3',
+            time_limit_mins=90,
+            is_proctored=True,
+            is_active=True
+        )
+
+    @patch('edx_proctoring.api.get_provider_name_by_course_id', return_value="TEST")
+    def test_get_state(self, provider):
+        """
+        Test getting the state of the entrance page
+        """
+        response = self.client.get(
+            reverse('edx_proctoring.proctored_exam.student_view_state'),
+            {
+                'course_id': self.proctored_exam.course_id,
+                'content_id': self.proctored_exam.content_id
+            }
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response_data = json.loads(response.content)
+        self.assertEqual(response_data['template'], 'seq_proctored_exam_entrance')
+        self.assertEqual(response_data['exam_id'], self.proctored_exam.id)
+        self.assertEqual(response_data['display_name'], self.proctored_exam.exam_name)
+
+    def test_get_state_missing_exam(self):
+        """
+        The endpoint should never create exams
+        """
+        response = self.client.get(
+            reverse('edx_proctoring.proctored_exam.student_view_state'),
+            {
+                'course_id': self.proctored_exam.course_id,
+                'content_id': 'foo'
+            }
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ProctoredExam.objects.count(), 1)
+
+    def test_get_state_bad_request(self):
+        """
+        Both course_id and content_id are required
+        """
+        response = self.client.get(
+            reverse('edx_proctoring.proctored_exam.student_view_state'),
+            {
+                'course_id': self.proctored_exam.course_id,
+            }
+        )
+        self.assertEqual(response.status_code, 400)
+
+
 class TestActiveExamsForUserView(LoggedInTestCase):
     """
     Tests for the ActiveExamsForUserView
@@ -6,6 +6,7 @@ from importlib import import_module
 
 from django.conf import settings
 from django.contrib.auth import login
+from django.core.cache import cache
 from django.http import HttpRequest
 from django.test.client import Client
 from django.test import TestCase
@@ -60,6 +61,9 @@ class LoggedInTestCase(TestCase):
         Setup for tests
         """
 
+        # don't let e.g. rendered pages leak from one test into another
+        cache.clear()
+
         self.client = TestClient()
         self.user = User(username='tester', email='tester@test.com')
         self.user.save()
@@ -66,11 +66,21 @@ urlpatterns = patterns(  # pylint: disable=invalid-name
         views.ExamAllowanceView.as_view(),
         name='edx_proctoring.proctored_exam.allowance'
     ),
+    url(
+        r'edx_proctoring/v1/proctored_exam/bulk_allowance$',
+        views.BulkExamAllowanceView.as_view(),
+        name='edx_proctoring.proctored_exam.bulk_allowance'
+    ),
     url(
         r'edx_proctoring/v1/proctored_exam/active_exams_for_user$',
         views.ActiveExamsForUserView.as_view(),
         name='edx_proctoring.proctored_exam.active_exams_for_user'
     ),
+    url(
+        r'edx_proctoring/v1/proctored_exam/student_view_state$',
+        views.StudentProctoredExamViewState.as_view(),
+        name='edx_proctoring.proctored_exam.student_view_state'
+    ),
     url(
         r'edx_proctoring/v1/proctoring_services/{}/$'.format(settings.COURSE_ID_PATTERN),
         views.ProctoringServices.as_view(),
@@ -86,7 +96,7 @@ urlpatterns = patterns(  # pylint: disable=invalid-name
         name='edx_proctoring.anonymous.proctoring_launch_callback.start_exam'
     ),
     url(
-        r'edx_proctoring/proctoring_launch_callback/bulk_start_exams/(?P<attempt_codes>[A-z0-9\_\,]+)$',
+        r'edx_proctoring/proctoring_launch_callback/bulk_start_exams/(?P<attempt_codes>[-\w,]+)$',
         callbacks.bulk_start_exams_callback,
         name='edx_proctoring.anonymous.proctoring_launch_callback.bulk_start_exams_callback'
     ),
@@ -2,22 +2,32 @@
 Helpers for the HTTP APIs
 """
 
+import hashlib
+import json
 import pytz
 import logging
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
+from django.conf import settings
+from django.core.cache import cache
 from django.utils.translation import ugettext as _
 from rest_framework.views import APIView
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
 
-from edx_proctoring.models import (
-    ProctoredExamStudentAttempt,
-    ProctoredExamStudentAttemptHistory,
-)
+from edx_proctoring.models import ProctoredExamAttemptCodeIndex
+from edx_proctoring.retention import find_archived_attempt_by_code, find_archived_attempts_by_codes
 
 log = logging.getLogger(__name__)
 
+# how long (in seconds) a review callback may hold on to the lock of its attempt
+DEFAULT_REVIEW_CALLBACK_LOCK_TIMEOUT = 30
+
+# how often (in seconds) to check whether the lock has been released
+REVIEW_CALLBACK_LOCK_POLL_INTERVAL = 0.05
+
 
 class AuthenticatedAPIView(APIView):
     """
@@ -95,15 +105,15 @@ def humanized_time(time_in_minutes):
 def locate_attempt_by_attempt_code(attempt_code):
     """
     Helper method to look up an attempt by attempt_code. This can be either in
-    the ProctoredExamStudentAttempt *OR* ProctoredExamStudentAttemptHistory tables
+    the ProctoredExamStudentAttempt *OR* ProctoredExamStudentAttemptHistory tables,
+    the ProctoredExamAttemptCodeIndex knows which one.
     we will return a tuple of (attempt, is_archived_attempt)
     """
-    attempt_obj = ProctoredExamStudentAttempt.objects.get_exam_attempt_by_code(attempt_code)
+    attempt_obj, is_archived_attempt = ProctoredExamAttemptCodeIndex.locate(attempt_code)
 
-    is_archived_attempt = False
     if not attempt_obj:
-        # try archive table
-        attempt_obj = ProctoredExamStudentAttemptHistory.get_exam_attempt_by_code(attempt_code)
+        # it might have been moved out of the archive table, by the history retention
+        attempt_obj = find_archived_attempt_by_code(attempt_code)
         is_archived_attempt = True
 
         if not attempt_obj:
@@ -114,3 +124,70 @@ def locate_attempt_by_attempt_code(attempt_code):
             log.error(err_msg)
 
     return (attempt_obj, is_archived_attempt)
+
+
+def locate_attempts_by_attempt_codes(attempt_codes):
+    """
+    Like locate_attempt_by_attempt_code(), for many attempt codes at once, with one
+    query. Returns a dict of attempt_code -> (attempt, is_archived_attempt),
+    which leaves out the attempt codes that could not be found
+    """
+
+    attempt_codes = set(attempt_codes)
+    located = ProctoredExamAttemptCodeIndex.locate_many(attempt_codes)
+
+    missing = attempt_codes - set(located)
+    # they might have been moved out of the archive table, by the history retention
+    archived = find_archived_attempts_by_codes(missing)
+    for attempt_code in missing:
+        if attempt_code in archived:
+            located[attempt_code] = (archived[attempt_code], True)
+        else:
+            err_msg = (
+                'Could not locate attempt_code: {attempt_code}'.format(attempt_code=attempt_code)
+            )
+            log.error(err_msg)
+
+    return located
+
+
+def get_payload_fingerprint(payload):
+    """
+    Returns a hash of the canonical JSON of the (parsed) payload, which is the
+    same for every delivery of the same payload
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical).hexdigest()
+
+
+@contextmanager
+def review_callback_lock(attempt_code):
+    """
+    Serializes the handling of the review callbacks of an attempt, across all
+    processes sharing the cache. The lock expires after REVIEW_CALLBACK_LOCK_TIMEOUT
+    seconds, so that a crashed process can't hold on to it, and whoever has been
+    waiting for that long goes ahead anyway
+    """
+
+    key = 'edx_proctoring.review_callback_lock.{attempt_code}'.format(attempt_code=attempt_code)
+    timeout = settings.PROCTORING_SETTINGS.get('REVIEW_CALLBACK_LOCK_TIMEOUT', DEFAULT_REVIEW_CALLBACK_LOCK_TIMEOUT)
+
+    deadline = time.time() + timeout
+    acquired = cache.add(key, True, timeout)
+    while not acquired and time.time() < deadline:
+        time.sleep(REVIEW_CALLBACK_LOCK_POLL_INTERVAL)
+        acquired = cache.add(key, True, timeout)
+
+    if not acquired:
+        log_msg = (
+            'Gave up waiting for the review callback lock of attempt_code {attempt_code}'.format(
+                attempt_code=attempt_code
+            )
+        )
+        log.warning(log_msg)
+
+    try:
+        yield
+    finally:
+        if acquired:
+            cache.delete(key)
@@ -23,6 +23,7 @@ from edx_proctoring.api import (
     start_exam_attempt,
     stop_exam_attempt,
     add_allowance_for_user,
+    add_allowances_for_users,
     remove_allowance_for_user,
     get_active_exams_for_user,
     create_exam_attempt,
@@ -31,7 +32,8 @@ from edx_proctoring.api import (
     get_exam_attempt_by_id,
     get_exam_attempt_by_code,
     remove_exam_attempt,
-    update_attempt_status
+    update_attempt_status,
+    get_student_view_state,
 )
 from edx_proctoring.exceptions import (
     ProctoredBaseException,
@@ -43,6 +45,7 @@ from edx_proctoring.exceptions import (
 )
 from edx_proctoring.serializers import ProctoredExamSerializer, ProctoredExamStudentAttemptSerializer
 from edx_proctoring.models import ProctoredExamStudentAttemptStatus, ProctoredExamStudentAttempt
+from edx_proctoring.runtime import get_runtime_service
 
 from .utils import AuthenticatedAPIView, get_time_remaining_for_attempt, humanized_time
 from xmodule.modulestore.django import modulestore
@@ -701,6 +704,59 @@ class ExamAllowanceView(AuthenticatedAPIView):
         ))
 
 
+class BulkExamAllowanceView(AuthenticatedAPIView):
+    """
+    Endpoint for importing many Exam Allowances at once
+    /edx_proctoring/v1/proctored_exam/bulk_allowance
+
+    Supports:
+        HTTP PUT: Creates or Updates the allowances.
+
+    HTTP PUT
+    Adds or updates the proctored exam allowances.
+    PUT data : {
+        "allowances": [
+            {
+                "exam_id": 533,
+                "user_info": "student1",
+                "key": "additional_time_granted",
+                "value": "10"
+            },
+            ...
+        ]
+    }
+
+    **PUT data Parameters**
+        * allowances: list of allowances, see ExamAllowanceView for the fields
+
+    **Response Values**
+        * added: number of allowances which were created
+        * updated: number of allowances which were changed
+        * errors: list of the allowances which were skipped, with their index and the reason
+    """
+    @method_decorator(require_staff)
+    def put(self, request):
+        """
+        HTTP PUT handler. Adds or updates Allowances
+        """
+        allowances = request.DATA.get('allowances', None)
+        if not isinstance(allowances, list):
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data={"detail": "allowances must be a list."}
+            )
+
+        for allowance in allowances:
+            if not isinstance(allowance, dict) or not all(
+                    field in allowance for field in ('exam_id', 'user_info', 'key', 'value')):
+                return Response(
+                    status=status.HTTP_400_BAD_REQUEST,
+                    data={"detail": "Every allowance needs an exam_id, user_info, key and value."}
+                )
+
+        return Response(add_allowances_for_users(allowances))
+
+
 class ActiveExamsForUserView(AuthenticatedAPIView):
     """
     Endpoint for the Active Exams for a user.
@@ -719,6 +775,57 @@ class ActiveExamsForUserView(AuthenticatedAPIView):
         ))
 
 
+class StudentProctoredExamViewState(AuthenticatedAPIView):
+    """
+    Endpoint for the state of the exam control flow for the current user, which
+    the proctoring static bundle renders client side.
+    /edx_proctoring/v1/proctored_exam/student_view_state?course_id=...&content_id=...
+
+    Supports:
+        HTTP GET: returns the output of get_student_view_state, the response is
+        empty if the courseware should render its own view
+    """
+    def get(self, request):
+        """
+        HTTP GET handler
+        """
+        course_id = request.GET.get('course_id')
+        content_id = request.GET.get('content_id')
+
+        if not course_id or not content_id:
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data={"detail": "course_id and content_id are required."}
+            )
+
+        try:
+            # unlike the courseware, we never create the exam here
+            exam = get_exam_by_content_id(course_id, content_id)
+        except ProctoredExamNotFoundException, ex:
+            LOG.exception(ex)
+            return Response(
+                status=status.HTTP_400_BAD_REQUEST,
+                data={"detail": "The exam with course_id, content_id does not exist."}
+            )
+
+        context = {
+            'display_name': exam['exam_name'],
+        }
+
+        credit_service = get_runtime_service('credit')
+        if credit_service:
+            context['credit_state'] = credit_service.get_credit_state(request.user.id, course_id)
+
+        return Response(
+            get_student_view_state(
+                request.user.id,
+                course_id,
+                content_id,
+                context
+            )
+        )
+
+
 class ProctoringServices(AuthenticatedAPIView):
     def get(self, request, course_id):
         """